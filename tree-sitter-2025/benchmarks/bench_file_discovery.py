@@ -0,0 +1,77 @@
+"""
+对比 原有 os.walk 后过滤 与 scandir 剪枝扫描 的文件发现耗时
+构造包含大量 vendor|node_modules 子目录的项目结构 模拟依赖目录远大于业务代码的场景
+用法: python benchmarks/bench_file_discovery.py --dirs 2000 --files 20
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs_com.files_filter import get_php_files, DEFAULT_SKIP_DIRS
+
+
+def get_php_files_walk(file_path, skip_dirs=DEFAULT_SKIP_DIRS):
+    """原有实现 遍历全部目录后再按关键字跳过"""
+    php_files = []
+    for root, _, files in os.walk(file_path):
+        if any(skip_dir in root.replace('\\', '/') for skip_dir in skip_dirs):
+            continue
+        for file in files:
+            if file.endswith('.php'):
+                php_files.append(os.path.join(root, file))
+    return php_files
+
+
+def build_fake_project(temp_dir, dirs_num, files_num):
+    """构造项目目录 业务代码占十分之一 其余为依赖目录"""
+    for index in range(dirs_num):
+        if index % 10 == 0:
+            dir_path = os.path.join(temp_dir, "src", f"module_{index}")
+        else:
+            dir_path = os.path.join(temp_dir, "vendor", f"package_{index % 50}", "src", f"sub_{index}")
+        os.makedirs(dir_path, exist_ok=True)
+        for file_index in range(files_num):
+            open(os.path.join(dir_path, f"file_{file_index}.php"), "w").close()
+
+
+def timeit(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文件发现性能对比')
+    parser.add_argument('--dirs', type=int, default=2000, help='构造的目录数量')
+    parser.add_argument('--files', type=int, default=20, help='每个目录的文件数量')
+    parser.add_argument('--workers', type=int, default=8, help='并行扫描的线程数')
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="php_discovery_bench_")
+    try:
+        build_fake_project(temp_dir, args.dirs, args.files)
+        walk_time, walk_files = timeit(lambda: get_php_files_walk(temp_dir))
+        scan_time, scan_files = timeit(lambda: get_php_files(temp_dir))
+        parallel_time, parallel_files = timeit(lambda: get_php_files(temp_dir, workers=args.workers))
+        assert walk_files == scan_files == parallel_files
+
+        print(f"目录数: {args.dirs}  文件数: {args.dirs * args.files}  命中PHP文件: {len(scan_files)}")
+        print("\n方式                    耗时(秒)")
+        print(f"{'os.walk 后过滤':<20} {walk_time:.3f}")
+        print(f"{'scandir 剪枝':<20} {scan_time:.3f}")
+        print(f"{'scandir 剪枝+并行':<18} {parallel_time:.3f}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+对比 旧版JSON缓存(indent=2) 与 二进制缓存 的文件大小、加载耗时和常驻内存增量
+每种加载方式在独立子进程中运行 以保证内存统计互不影响
+用法: python benchmarks/bench_parse_cache_load.py --copies 100
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs_com.files_filter import get_php_files
+from libs_com.utils_json import dump_json
+from php_enums import CacheKeys, FileInfoKeys
+from php_parse_cache import get_parser_version, create_cache_entry, save_parse_cache, load_parse_cache, \
+    get_entry_parsed_info
+from php_parser import PHPParser
+from php_scheduler import get_current_rss, get_peak_rss
+from tree_sitter_uitls import init_php_parser
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "php_demo")
+
+LOAD_MODES = {
+    "json": "旧版JSON 全部加载",
+    "binary": "二进制 全部加载",
+    "binary-index": "二进制 仅加载索引",
+    "binary-section": "二进制 仅加载METHOD_INFOS",
+}
+
+
+def get_rss():
+    """获取当前进程的常驻内存字节数 linux 下读取 /proc 其他平台使用峰值RSS近似 都无法获取时为 None"""
+    current_rss = get_current_rss()
+    return current_rss if current_rss is not None else get_peak_rss()
+
+
+def format_rss_mb(rss_bytes):
+    """子进程输出的内存值 无法获取时输出 -"""
+    return f"{rss_bytes / 1024 / 1024:.1f}" if rss_bytes is not None else "-"
+
+
+def parse_rss_mb(text):
+    return float(text) if text != "-" else None
+
+
+def build_cache_files(temp_dir, copies):
+    """解析复制后的 php_demo 语料 分别保存为JSON缓存和二进制缓存"""
+    for index in range(copies):
+        shutil.copytree(DEMO_DIR, os.path.join(temp_dir, f"copy_{index}"))
+    php_files = get_php_files(temp_dir)
+    php_parser = PHPParser(project_name="bench", project_path=temp_dir)
+    parsed_infos = php_parser.parse_php_files_single(php_files)
+
+    cache_entries = {}
+    for abspath_path in php_files:
+        relative_path = os.path.relpath(abspath_path, temp_dir).replace("\\", "/")
+        if relative_path in parsed_infos:
+            cache_entries[relative_path] = create_cache_entry(abspath_path, parsed_infos[relative_path])
+
+    parser_version = get_parser_version(php_parser.LANGUAGE)
+    json_path = os.path.join(temp_dir, "bench.json.cache")
+    binary_path = os.path.join(temp_dir, "bench.binary.cache")
+    dump_json(json_path, {CacheKeys.VERSION.value: parser_version, CacheKeys.FILES.value: cache_entries},
+              encoding='utf-8', indent=2, mode="w+")
+    save_parse_cache(binary_path, cache_entries, parser_version)
+    return json_path, binary_path, len(cache_entries)
+
+
+def run_mode(mode, cache_path):
+    """子进程内执行 输出: 加载前RSS 加载后RSS 耗时"""
+    _, language = init_php_parser()
+    parser_version = get_parser_version(language)
+    before_rss = get_rss()
+    start_time = time.perf_counter()
+    if mode == "json":
+        with open(cache_path, "r", encoding="utf-8") as f:
+            loaded = json.load(f)[CacheKeys.FILES.value]
+    else:
+        cache_entries = load_parse_cache(cache_path, parser_version)
+        if mode == "binary":
+            loaded = [get_entry_parsed_info(entry) for entry in cache_entries.values()]
+        elif mode == "binary-section":
+            loaded = [get_entry_parsed_info(entry, [FileInfoKeys.METHOD_INFOS.value]) for entry in cache_entries.values()]
+        else:
+            loaded = cache_entries
+    elapsed = time.perf_counter() - start_time
+    print(f"{format_rss_mb(before_rss)} {format_rss_mb(get_rss())} {elapsed:.3f} {len(loaded)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析缓存加载性能对比')
+    parser.add_argument('--copies', type=int, default=100, help='php_demo 复制份数')
+    parser.add_argument('--mode', choices=list(LOAD_MODES), default=None, help='内部使用 指定子进程的加载方式')
+    parser.add_argument('--cache', default=None, help='内部使用 指定子进程加载的缓存文件')
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.cache)
+        return
+
+    temp_dir = tempfile.mkdtemp(prefix="php_cache_bench_")
+    try:
+        json_path, binary_path, files_num = build_cache_files(temp_dir, args.copies)
+        print(f"\n\n缓存文件数: {files_num}")
+        print(f"JSON缓存大小: {os.path.getsize(json_path) / 1024 / 1024:.1f} MB  "
+              f"二进制缓存大小: {os.path.getsize(binary_path) / 1024 / 1024:.1f} MB")
+
+        print("\n加载方式                      耗时(秒)   RSS增量(MB)")
+        for mode, mode_name in LOAD_MODES.items():
+            cache_path = json_path if mode == "json" else binary_path
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--mode", mode, "--cache", cache_path],
+                                    capture_output=True, text=True, check=True).stdout.split()
+            before_rss, after_rss, elapsed = parse_rss_mb(output[0]), parse_rss_mb(output[1]), float(output[2])
+            rss_delta = f"{after_rss - before_rss:.1f}" if before_rss is not None and after_rss is not None else "-"
+            print(f"{mode_name:<24} {elapsed:<10.3f} {rss_delta}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+对比 单线程|线程池|进程池 三种解析模式的耗时和加速比
+用法: python benchmarks/bench_parse_executor.py --copies 50 --workers 1 2 4 8
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs_com.files_filter import get_php_files
+from php_parser import PHPParser
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "php_demo")
+
+
+def build_copied_corpus(target_dir, copies):
+    """将 php_demo 复制多份 构造足够大的测试语料"""
+    for index in range(copies):
+        shutil.copytree(DEMO_DIR, os.path.join(target_dir, f"copy_{index}"))
+    return get_php_files(target_dir)
+
+
+def time_parse(php_parser, php_files, mode, workers):
+    start_time = time.perf_counter()
+    if mode == "single":
+        parsed_infos = php_parser.parse_php_files_single(php_files)
+    elif mode == "thread":
+        parsed_infos = php_parser.parse_php_files_threads(php_files, workers=workers)
+    else:
+        parsed_infos = php_parser.parse_php_files_process(php_files, workers=workers)
+    elapsed = time.perf_counter() - start_time
+    assert len(parsed_infos) == len(php_files), "解析结果数量与文件数量不一致"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析模式性能对比')
+    parser.add_argument('--copies', type=int, default=20, help='php_demo 复制份数')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, os.cpu_count()], help='并发数列表')
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="php_bench_")
+    try:
+        php_files = build_copied_corpus(temp_dir, args.copies)
+        php_parser = PHPParser(project_name="bench", project_path=temp_dir)
+        print(f"语料文件数: {len(php_files)}  CPU核心数: {os.cpu_count()}")
+
+        base_time = time_parse(php_parser, php_files, "single", 1)
+        results = [("single", 1, base_time)]
+        for workers in args.workers:
+            for mode in ("thread", "process"):
+                results.append((mode, workers, time_parse(php_parser, php_files, mode, workers)))
+
+        print("\n\n模式      并发数    耗时(秒)   加速比")
+        for mode, workers, elapsed in results:
+            print(f"{mode:<9} {workers:<8} {elapsed:<10.2f} {base_time / elapsed:.2f}x")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
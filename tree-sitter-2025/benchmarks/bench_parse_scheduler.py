@@ -0,0 +1,111 @@
+"""
+对比 并发解析时 收集全部结果|结果立即交给 sink|内存上限触发背压 三种方式的耗时和峰值内存
+语料为 php_demo 的多份副本 加上大量极小文件和一个大文件 用于观察小文件合并和大文件优先调度
+每种方式在独立子进程中运行 以保证峰值RSS互不影响
+用法: python benchmarks/bench_parse_scheduler.py --copies 20 --tiny 2000 --workers 4
+"""
+import argparse
+import marshal
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs_com.files_filter import get_php_files
+from php_parse_cache import to_marshal_data
+from php_parser import PHPParser
+from php_scheduler import get_peak_rss
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "php_demo")
+
+
+def build_skewed_corpus(target_dir, copies, tiny_num, large_repeat):
+    """php_demo 复制多份 再生成大量极小文件和一个由示例文件拼接而成的大文件"""
+    for index in range(copies):
+        shutil.copytree(DEMO_DIR, os.path.join(target_dir, f"copy_{index}"))
+    tiny_dir = os.path.join(target_dir, "tiny")
+    os.makedirs(tiny_dir)
+    for index in range(tiny_num):
+        with open(os.path.join(tiny_dir, f"tiny_{index}.php"), "w", encoding="utf-8") as f:
+            f.write(f"<?php\nfunction tiny_{index}($a) {{ return strlen($a); }}\n")
+
+    demo_bodies = []
+    for demo_file in get_php_files(DEMO_DIR):
+        with open(demo_file, "r", encoding="utf-8", errors="ignore") as f:
+            demo_bodies.append(f.read().replace("<?php", "").replace("?>", ""))
+    with open(os.path.join(target_dir, "large.php"), "w", encoding="utf-8") as f:
+        f.write("<?php\n")
+        for index in range(large_repeat):
+            # 按序号重命名函数和类 避免重复定义
+            f.write("\n".join(demo_bodies).replace("function ", f"function r{index}_").replace("class ", f"class R{index}_"))
+
+
+def format_rss_mb(rss_bytes):
+    """子进程输出的内存值 无法获取时输出 -"""
+    return f"{rss_bytes / 1024 / 1024:.1f}" if rss_bytes is not None else "-"
+
+
+def parse_rss_mb(text):
+    return float(text) if text != "-" else None
+
+
+def run_mode(mode, corpus_dir, workers, executor):
+    """子进程内执行 输出: 耗时 峰值RSS 文件数 任务块数 背压次数 最小窗口"""
+    php_files = get_php_files(corpus_dir)
+    memory_limit = 1024 * 1024 if mode == "throttled" else None
+    php_parser = PHPParser(project_name="bench", project_path=corpus_dir, memory_limit=memory_limit)
+    php_parser.instrument.sinks = []
+    parsed_num = 0
+
+    def write_parsed_info(relative_path, parsed_info, source_state):
+        # 模拟写入缓存|索引 结果序列化后即释放
+        nonlocal parsed_num
+        marshal.dumps(to_marshal_data(parsed_info))
+        parsed_num += 1
+
+    start_time = time.perf_counter()
+    sink = None if mode == "collect" else write_parsed_info
+    parsed_infos = php_parser.parse_php_files(php_files, workers=workers, executor=executor, sink=sink)
+    elapsed = time.perf_counter() - start_time
+    stats = php_parser.schedule_stats or {}
+    print(f"{elapsed:.3f} {format_rss_mb(get_peak_rss())} {len(parsed_infos) or parsed_num} {stats.get('tasks')} "
+          f"{stats.get('throttled')} {stats.get('min_window')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并发解析调度对比')
+    parser.add_argument('--copies', type=int, default=20, help='php_demo 复制份数')
+    parser.add_argument('--tiny', type=int, default=2000, help='极小文件数量')
+    parser.add_argument('--large-repeat', type=int, default=20, help='大文件由全部示例文件重复拼接的次数')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='并发数')
+    parser.add_argument('--executor', default='thread', choices=['thread', 'process'], help='并发解析模式')
+    parser.add_argument('--mode', choices=['collect', 'sink', 'throttled'], default=None, help='内部使用 指定子进程的运行模式')
+    parser.add_argument('--corpus', default=None, help='内部使用 子进程的语料目录')
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.corpus, args.workers, args.executor)
+        return
+
+    temp_dir = tempfile.mkdtemp(prefix="php_bench_")
+    try:
+        build_skewed_corpus(temp_dir, args.copies, args.tiny, args.large_repeat)
+        print(f"语料文件数: {len(get_php_files(temp_dir))}  并发数: {args.workers}  模式: {args.executor}")
+        print("\n方式        耗时(秒)   峰值RSS(MB)  文件数   任务块数  背压次数  最小窗口")
+        for mode in ("collect", "sink", "throttled"):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--mode", mode, "--corpus", temp_dir,
+                                     "--workers", str(args.workers), "--executor", args.executor],
+                                    capture_output=True, text=True, check=True).stdout.split()
+            elapsed, peak_rss, files_num, tasks_num, throttled, min_window = output[-6:]
+            print(f"{mode:<11} {float(elapsed):<10.2f} {peak_rss:<12} {files_num:<8} {tasks_num:<9} "
+                  f"{throttled:<9} {min_window}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
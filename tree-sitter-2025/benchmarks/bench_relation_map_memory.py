@@ -0,0 +1,134 @@
+"""
+对比 关系映射构建时 deepcopy 字典 与 只读投影(MethodBrief|ClassBrief) 两种方式的峰值内存和耗时
+每种方式在独立子进程中运行 以保证峰值RSS互不影响
+用法: python benchmarks/bench_relation_map_memory.py --methods 50000
+"""
+import argparse
+import copy
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from php_enums import ClassKeys, MethodKeys, FileInfoKeys, ParameterKeys
+from php_map_called import build_method_relation_map, GLOBAL_METHOD_ID_METHOD_INFO_MAP, CLASS_ID_CLASS_INFO_MAP
+from php_map_build import get_all_global_methods, get_all_class_infos
+from php_scheduler import get_peak_rss
+
+
+def create_fake_method(file_path, class_name, index, called_num):
+    """构造与解析结果结构一致的方法信息"""
+    method_name = f"method_{index}"
+    params = [{ParameterKeys.NAME.value: f"$p{i}", ParameterKeys.TYPE.value: None, ParameterKeys.DEFAULT.value: None,
+               ParameterKeys.VALUE.value: None, ParameterKeys.INDEX.value: i} for i in range(3)]
+    called_methods = [{
+        MethodKeys.NAME.value: f"called_{i}", MethodKeys.FULLNAME.value: f"Called->called_{i}",
+        MethodKeys.START.value: i, MethodKeys.END.value: i, MethodKeys.PARAMS.value: copy.deepcopy(params),
+        MethodKeys.MAY_FILES.value: [f"includes/lib_{i}.php"], MethodKeys.MAY_NAMESPACES.value: [],
+    } for i in range(called_num)]
+    return {
+        MethodKeys.UNIQ_ID.value: f"method_{file_path}_{class_name}_{index}",
+        MethodKeys.FILE.value: file_path,
+        MethodKeys.NAMESPACE.value: "App\\Bench",
+        MethodKeys.NAME.value: method_name,
+        MethodKeys.FULLNAME.value: f"{class_name}->{method_name}" if class_name else method_name,
+        MethodKeys.START.value: index * 10,
+        MethodKeys.END.value: index * 10 + 9,
+        MethodKeys.VISIBILITY.value: "public" if class_name else None,
+        MethodKeys.MODIFIERS.value: [],
+        MethodKeys.RETURNS.value: [],
+        MethodKeys.PARAMS.value: params,
+        MethodKeys.CLASS.value: class_name,
+        MethodKeys.CALLED_METHODS.value: called_methods,
+    }
+
+
+def build_fake_parsed_infos(methods_num, called_num, methods_per_file=20):
+    """构造指定方法数量的解析结果 每个文件一半全局方法一半类方法"""
+    parsed_infos = {}
+    for file_index in range(max(1, methods_num // methods_per_file)):
+        file_path = f"src/module_{file_index % 50}/file_{file_index}.php"
+        half = methods_per_file // 2
+        global_methods = [create_fake_method(file_path, None, i, called_num) for i in range(half)]
+        class_name = f"Class{file_index}"
+        class_info = {
+            ClassKeys.UNIQ_ID.value: f"class_{file_path}_{class_name}",
+            ClassKeys.FILE.value: file_path,
+            ClassKeys.NAME.value: class_name,
+            ClassKeys.NAMESPACE.value: "App\\Bench",
+            ClassKeys.METHODS.value: [create_fake_method(file_path, class_name, i, called_num) for i in range(half)],
+        }
+        parsed_infos[file_path] = {
+            FileInfoKeys.METHOD_INFOS.value: global_methods,
+            FileInfoKeys.CLASS_INFOS.value: [class_info],
+        }
+    return parsed_infos
+
+
+def build_deepcopy_maps(parsed_infos):
+    """原有实现 深拷贝全部方法和类字典后删除 CALLED_METHODS"""
+    method_map = {}
+    for method_info in get_all_global_methods(parsed_infos):
+        copy_method_info = copy.deepcopy(method_info)
+        copy_method_info.pop(MethodKeys.CALLED_METHODS.value)
+        method_map[method_info.get(MethodKeys.UNIQ_ID.value)] = copy_method_info
+
+    class_map = {}
+    for class_info in get_all_class_infos(parsed_infos):
+        copy_class_info = copy.deepcopy(class_info)
+        for copy_method_info in copy_class_info.get(ClassKeys.METHODS.value, []):
+            copy_method_info.pop(MethodKeys.CALLED_METHODS.value)
+        class_map[class_info.get(ClassKeys.UNIQ_ID.value)] = copy_class_info
+    return {GLOBAL_METHOD_ID_METHOD_INFO_MAP: method_map, CLASS_ID_CLASS_INFO_MAP: class_map}
+
+
+def format_rss_mb(rss_bytes):
+    """子进程输出的内存值 无法获取时输出 -"""
+    return f"{rss_bytes / 1024 / 1024:.1f}" if rss_bytes is not None else "-"
+
+
+def parse_rss_mb(text):
+    return float(text) if text != "-" else None
+
+
+def run_mode(mode, methods_num, called_num):
+    """子进程内执行 输出: 构建前RSS 构建后峰值RSS 耗时"""
+    parsed_infos = build_fake_parsed_infos(methods_num, called_num)
+    before_rss = get_peak_rss()
+    start_time = time.perf_counter()
+    if mode == "deepcopy":
+        relation_map = build_deepcopy_maps(parsed_infos)
+    else:
+        relation_map = build_method_relation_map(parsed_infos)
+    elapsed = time.perf_counter() - start_time
+    print(f"{format_rss_mb(before_rss)} {format_rss_mb(get_peak_rss())} {elapsed:.3f} {len(relation_map)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='关系映射构建内存对比')
+    parser.add_argument('--methods', type=int, default=50000, help='构造的方法总数')
+    parser.add_argument('--called', type=int, default=8, help='每个方法内的调用数量')
+    parser.add_argument('--mode', choices=['deepcopy', 'brief'], default=None, help='内部使用 指定子进程的运行模式')
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.methods, args.called)
+        return
+
+    print(f"方法总数: {args.methods}  每个方法调用数: {args.called}")
+    print("\n方式       构建前RSS(MB)  峰值RSS(MB)  增量(MB)  耗时(秒)")
+    for mode in ("deepcopy", "brief"):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--mode", mode,
+                                 "--methods", str(args.methods), "--called", str(args.called)],
+                                capture_output=True, text=True, check=True).stdout.split()
+        before_rss, peak_rss, elapsed = parse_rss_mb(output[0]), parse_rss_mb(output[1]), float(output[2])
+        if before_rss is None or peak_rss is None:
+            print(f"{mode:<10} {'-':<14} {'-':<12} {'-':<9} {elapsed:.2f}")
+            continue
+        print(f"{mode:<10} {before_rss:<14.1f} {peak_rss:<12.1f} {peak_rss - before_rss:<9.1f} {elapsed:.2f}")
+
+
+if __name__ == '__main__':
+    main()
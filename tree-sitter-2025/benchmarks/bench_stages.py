@@ -0,0 +1,238 @@
+"""
+分阶段性能测试 生成合成PHP项目(或指定已有项目) 单线程依次执行各个分析阶段并分别计时
+结果写入 JSON 文件 可与之前版本的结果对比 超过阈值的阶段视为性能回退
+用法:
+  python benchmarks/bench_stages.py --files 2000 --output stages.json
+  python benchmarks/bench_stages.py --files 2000 --output new.json --compare stages.json
+  python benchmarks/bench_stages.py --project /path/to/php/project --repeat 3
+  python benchmarks/bench_stages.py --files 2000 --profile symbols --output symbols.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gen_php_corpus import add_corpus_shape_args, get_corpus_shape, generate_php_corpus
+from libs_com.file_path import get_root_dir, get_relative_path
+from libs_com.files_filter import get_php_files
+from php_enums import AnalysisProfile, MethodKeys
+from php_map_basic import repair_parsed_infos_basic_info
+from php_map_called import build_method_relation_map, repair_parsed_infos_called_info, iter_method_called_infos
+from php_pipeline import resolve_stages, run_pipeline
+from php_scheduler import get_peak_rss
+from php_tree_visitor import use_node_index
+from tree_sitter_uitls import init_php_parser, read_file_to_source, use_source_view
+
+# 结果文件格式版本 字段变化时递增
+RESULT_VERSION = 2
+
+# 各阶段按执行顺序排列
+STAGES = [
+    "discovery",
+    "read_parse",
+    "node_index",
+    "dependent_infos",
+    "global_code",
+    "method_infos",
+    "class_infos",
+    "called_methods",
+    "variable_infos",
+    "basic_info",
+    "relation_map_build",
+    "called_resolve",
+]
+
+
+class StageTimer:
+    """累计各阶段耗时 文件级阶段在所有文件上累加"""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.last_time = time.perf_counter()
+
+    def measure(self, stage, func, *args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.seconds[stage] += time.perf_counter() - start_time
+        return result
+
+    def start_lap(self):
+        self.last_time = time.perf_counter()
+
+    def lap(self, stage):
+        """记录距离上一次的耗时 与 FileTimer.lap 一致 供 run_pipeline 按分析阶段计时"""
+        now_time = time.perf_counter()
+        self.seconds[stage] += now_time - self.last_time
+        self.last_time = now_time
+
+
+def parse_file_by_stages(timer: StageTimer, abspath_path, parser, language, stages):
+    """与 PHPParser.parse_php_file 的执行步骤一致 分析阶段通过 run_pipeline 执行 每个阶段单独计时"""
+    root_node, source_view = timer.measure("read_parse", read_file_to_source, parser, abspath_path)
+    with use_source_view(source_view):
+        timer.start_lap()
+        with use_node_index(root_node):
+            timer.lap("node_index")
+            return run_pipeline(parser, language, root_node, stages, timer)
+
+
+def run_stages(project_path, imports_filter=True, profile=AnalysisProfile.FULL.value):
+    """按分析配置执行一次完整的分析流程 返回 (各阶段耗时, 结果统计)"""
+    timer = StageTimer()
+    stages = resolve_stages(profile)
+    parser, language = init_php_parser()
+    project_root = get_root_dir(project_path)
+
+    php_files = timer.measure("discovery", get_php_files, project_path)
+    parsed_infos = {}
+    for abspath_path in php_files:
+        parsed_infos[get_relative_path(abspath_path, project_root)] = parse_file_by_stages(
+            timer, abspath_path, parser, language, stages)
+
+    parsed_infos = timer.measure("basic_info", repair_parsed_infos_basic_info, parsed_infos)
+    method_relation_map = timer.measure("relation_map_build", build_method_relation_map, parsed_infos)
+    parsed_infos = timer.measure("called_resolve", repair_parsed_infos_called_info, parsed_infos,
+                                 method_relation_map, imports_filter, 1)
+
+    called_num = resolved_num = 0
+    for parsed_info in parsed_infos.values():
+        for _, called_method_info in iter_method_called_infos(parsed_info):
+            called_num += 1
+            resolved_num += 1 if called_method_info.get(MethodKeys.MAY_SOURCE.value) else 0
+    counts = {"files": len(php_files), "called": called_num, "resolved": resolved_num}
+    return dict(timer.seconds), counts
+
+
+def get_git_revision():
+    """当前代码版本 非 git 仓库时返回 None"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_tree_sitter_version():
+    try:
+        from importlib.metadata import version
+        return version("tree-sitter")
+    except Exception:
+        return None
+
+
+def compare_results(current: dict, baseline: dict, threshold: float, min_seconds: float):
+    """对比两次结果 返回性能回退的阶段列表 [(阶段, 之前耗时, 当前耗时)] 耗时过短的阶段不参与判断"""
+    regressions = []
+    for stage in STAGES:
+        old_seconds = baseline.get("stages", {}).get(stage, {}).get("seconds")
+        new_seconds = current["stages"].get(stage, {}).get("seconds")
+        if old_seconds is None or new_seconds is None or max(old_seconds, new_seconds) < min_seconds:
+            continue
+        if new_seconds > old_seconds * threshold:
+            regressions.append((stage, old_seconds, new_seconds))
+    return regressions
+
+
+def print_results(result: dict, baseline: dict = None):
+    files_num = result["counts"]["files"] or 1
+    print(f"\n{'阶段':<20}{'耗时(秒)':>10}{'每文件(毫秒)':>14}{'占比':>8}" + (f"{'对比':>10}" if baseline else ""))
+    total_seconds = result["total_seconds"] or 1
+    for stage in STAGES:
+        seconds = result["stages"][stage]["seconds"]
+        line = f"{stage:<20}{seconds:>10.3f}{seconds / files_num * 1000:>14.3f}{seconds / total_seconds:>8.1%}"
+        old_seconds = (baseline or {}).get("stages", {}).get(stage, {}).get("seconds")
+        if old_seconds:
+            line += f"{seconds / old_seconds:>9.2f}x"
+        print(line)
+    print(f"{'total':<20}{result['total_seconds']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PHP分析流程分阶段性能测试')
+    parser.add_argument('--project', default=None, help='使用已有的PHP项目 (默认: 生成合成项目)')
+    parser.add_argument('--corpus-dir', default=None, help='合成项目的生成目录 (默认: 临时目录)')
+    parser.add_argument('--force', action='store_true', default=False, help='合成项目目录非空且不是生成的项目时也清空')
+    parser.add_argument('--repeat', type=int, default=1, help='重复执行次数 每个阶段取最小耗时')
+    parser.add_argument('--output', default='bench_stages.json', help='结果JSON文件路径')
+    parser.add_argument('--compare', default=None, help='用于对比的历史结果JSON文件')
+    parser.add_argument('--threshold', type=float, default=1.2, help='耗时超过历史结果的倍数时视为回退')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='耗时低于该值的阶段不参与回退判断')
+    parser.add_argument('--profile', default='full', choices=['symbols', 'calls', 'full'],
+                        help='分析配置 未执行的阶段耗时记为 0 (默认: full)')
+    add_corpus_shape_args(parser)
+    args = parser.parse_args()
+
+    corpus_info = None
+    project_path = args.project
+    if not project_path:
+        project_path = args.corpus_dir or os.path.join(tempfile.mkdtemp(prefix="php_corpus_"), "project")
+        start_time = time.perf_counter()
+        try:
+            corpus_info = generate_php_corpus(project_path, get_corpus_shape(args), force=args.force)
+        except ValueError as error:
+            print(f"[!] {error}")
+            sys.exit(1)
+        print(f"生成合成项目:{project_path} 文件:{corpus_info['files']} 大小:{corpus_info['bytes'] / 1024 / 1024:.1f} MB "
+              f"用时:{time.perf_counter() - start_time:.1f} 秒")
+
+    stage_runs = defaultdict(list)
+    counts = None
+    for _ in range(args.repeat):
+        seconds, counts = run_stages(project_path, profile=args.profile)
+        for stage in STAGES:
+            stage_runs[stage].append(seconds.get(stage, 0.0))
+
+    stages = {stage: {"seconds": min(runs), "runs": runs} for stage, runs in stage_runs.items()}
+    peak_rss = get_peak_rss()
+    result = {
+        "version": RESULT_VERSION,
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "git_revision": get_git_revision(),
+            "python": platform.python_version(),
+            "tree_sitter": get_tree_sitter_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "profile": args.profile,
+        },
+        "project": args.project,
+        "corpus": corpus_info,
+        "counts": counts,
+        "stages": stages,
+        "total_seconds": sum(stage["seconds"] for stage in stages.values()),
+        # 无法获取峰值内存(windows)时为 None
+        "max_rss_kb": peak_rss // 1024 if peak_rss is not None else None,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        baseline_profile = baseline.get("meta", {}).get("profile", AnalysisProfile.FULL.value)
+        if baseline_profile != args.profile:
+            print(f"[!] 对比结果的分析配置不一致: {baseline_profile} -> {args.profile}")
+    print_results(result, baseline)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入:->{args.output}")
+
+    if baseline:
+        regressions = compare_results(result, baseline, args.threshold, args.min_seconds)
+        for stage, old_seconds, new_seconds in regressions:
+            print(f"[!] 性能回退 {stage}: {old_seconds:.3f} -> {new_seconds:.3f} 秒")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+单次遍历引擎与原有多次查询路径的差异对比 同时统计两种路径的节点遍历数量
+用法: python benchmarks/diff_single_pass.py [项目路径]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs_com.files_filter import get_php_files
+from php_parser import PHPParser
+from php_tree_visitor import pop_visit_count
+from tree_sitter_uitls import init_php_parser
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "php_demo")
+
+
+def parse_to_json(php_file, parser, language, single_pass):
+    """解析单个文件 返回 (序列化结果, 节点遍历数, 耗时)"""
+    pop_visit_count()
+    start_time = time.perf_counter()
+    _, parsed_info = PHPParser.parse_php_file(php_file, parser, language, single_pass=single_pass)
+    elapsed = time.perf_counter() - start_time
+    return json.dumps(parsed_info, ensure_ascii=False, sort_keys=False), pop_visit_count(), elapsed
+
+
+def main():
+    project_path = sys.argv[1] if len(sys.argv) > 1 else DEMO_DIR
+    parser, language = init_php_parser()
+    php_files = get_php_files(project_path)
+
+    diff_files = []
+    total = {True: [0, 0.0], False: [0, 0.0]}
+    for php_file in php_files:
+        outputs = {}
+        for single_pass in (False, True):
+            output, visits, elapsed = parse_to_json(php_file, parser, language, single_pass)
+            outputs[single_pass] = output
+            total[single_pass][0] += visits
+            total[single_pass][1] += elapsed
+        if outputs[True] != outputs[False]:
+            diff_files.append(php_file)
+
+    print(f"文件数: {len(php_files)}  结果不一致: {len(diff_files)}")
+    for php_file in diff_files:
+        print(f"  [!] {php_file}")
+    print(f"多次查询路径: 遍历节点 {total[False][0]}  耗时 {total[False][1]:.2f} 秒")
+    print(f"单次遍历路径: 遍历节点 {total[True][0]}  耗时 {total[True][1]:.2f} 秒")
+    if total[True][0]:
+        print(f"节点遍历减少: {total[False][0] / total[True][0]:.1f}x")
+    return 1 if diff_files else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
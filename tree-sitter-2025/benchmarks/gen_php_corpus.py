@@ -0,0 +1,236 @@
+"""
+生成可配置规模和形态的合成PHP项目 用于各阶段性能测试
+可调整 文件数|每文件类数|每类方法数|调用密度|命名空间数|包含链长度|嵌套深度
+相同参数和随机种子生成的项目内容完全一致
+用法: python benchmarks/gen_php_corpus.py /tmp/php_corpus --files 2000 --classes 2 --methods 8
+输出目录已存在且非空时 只有其中包含本生成器写入的标记文件才会被清空 否则需要指定 --force
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+
+# 生成的项目根目录中的标记文件 用于判断目录是否可以安全清空
+CORPUS_MARKER = ".php_corpus_generated"
+
+# 内置函数 生成的调用中混入一部分 模拟真实代码
+BUILTIN_CALLS = ["strlen($x)", "count($items)", "array_merge($items, [$x])", "trim((string)$x)", "is_array($items)"]
+# 嵌套语句块模板 {cond} 为条件表达式 {body} 为内部语句
+NESTED_BLOCKS = [
+    "if ({cond}) {{\n{body}\n{indent}}}",
+    "foreach ($items as $key => $x) {{\n{body}\n{indent}}}",
+    "while ({cond}) {{\n{body}\n{indent}    break;\n{indent}}}",
+    "try {{\n{body}\n{indent}}} catch (\\Exception $e) {{\n{indent}    $x = $e->getMessage();\n{indent}}}",
+]
+
+
+class CorpusShape:
+    """合成项目的形态参数"""
+
+    def __init__(self, files=500, classes=2, methods=6, functions=2, calls=4, namespaces=20, include_chain=4,
+                 nest_depth=3, dirs=20, seed=7):
+        self.files = files
+        self.classes = classes
+        self.methods = methods
+        self.functions = functions
+        self.calls = calls
+        self.namespaces = namespaces
+        self.include_chain = include_chain
+        self.nest_depth = nest_depth
+        self.dirs = dirs
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def get_file_path(shape: CorpusShape, file_index):
+    """文件的相对路径 按目录数平均分布"""
+    return f"src/module_{file_index % shape.dirs}/file_{file_index}.php"
+
+
+def get_namespace(shape: CorpusShape, file_index):
+    """命名空间数为 0 时所有文件都在全局空间"""
+    if not shape.namespaces:
+        return None
+    return f"App\\Ns{file_index % shape.namespaces}"
+
+
+def get_class_name(file_index, class_index):
+    return f"Class_{file_index}_{class_index}"
+
+
+def get_function_name(file_index, func_index):
+    return f"func_{file_index}_{func_index}"
+
+
+def get_full_class_name(shape: CorpusShape, file_index, class_index):
+    namespace = get_namespace(shape, file_index)
+    class_name = get_class_name(file_index, class_index)
+    return f"\\{namespace}\\{class_name}" if namespace else class_name
+
+
+def get_full_function_name(shape: CorpusShape, file_index, func_index):
+    namespace = get_namespace(shape, file_index)
+    func_name = get_function_name(file_index, func_index)
+    return f"\\{namespace}\\{func_name}" if namespace else func_name
+
+
+def build_call_statement(shape: CorpusShape, rand: random.Random, file_index, class_index):
+    """随机生成一条调用语句 被调用方偏向邻近文件 模拟模块内调用多于跨模块调用"""
+    kind = rand.random()
+    if rand.random() < 0.7:
+        target_file = max(0, min(shape.files - 1, file_index + rand.randint(-5, 5)))
+    else:
+        target_file = rand.randrange(shape.files)
+    target_method = f"method_{rand.randrange(shape.methods)}" if shape.methods else None
+
+    if kind < 0.15:
+        return f"$x = {rand.choice(BUILTIN_CALLS)};"
+    if kind < 0.35 and shape.functions:
+        return f"$x = {get_full_function_name(shape, target_file, rand.randrange(shape.functions))}($x);"
+    if kind < 0.55 and class_index is not None and target_method:
+        return f"$x = $this->{target_method}($x);"
+    if kind < 0.7 and shape.classes and target_method:
+        full_class_name = get_full_class_name(shape, target_file, rand.randrange(shape.classes))
+        return f"$x = {full_class_name}::{target_method}($x);"
+    if shape.classes and target_method:
+        full_class_name = get_full_class_name(shape, target_file, rand.randrange(shape.classes))
+        return f"$obj = new {full_class_name}($x);\n$x = $obj->{target_method}($x);"
+    return f"$x = {rand.choice(BUILTIN_CALLS)};"
+
+
+def build_method_body(shape: CorpusShape, rand: random.Random, file_index, class_index, indent):
+    """生成方法体 调用语句分布在多层嵌套的语句块中"""
+    statements = [build_call_statement(shape, rand, file_index, class_index) for _ in range(shape.calls)]
+    # 从最内层开始包裹 每层放入一部分调用语句
+    depth = shape.nest_depth
+    inner_indent = indent + "    " * depth
+    body = "\n".join(inner_indent + line for statement in statements[:max(1, len(statements) // 2)]
+                     for line in statement.split("\n"))
+    for level in range(depth - 1, -1, -1):
+        level_indent = indent + "    " * level
+        block = rand.choice(NESTED_BLOCKS).format(cond=f"$x > {level}", body=body, indent=level_indent)
+        body = level_indent + block
+    rest = statements[max(1, len(statements) // 2):]
+    rest_text = "\n".join(indent + line for statement in rest for line in statement.split("\n"))
+    return body + ("\n" + rest_text if rest_text else "") + f"\n{indent}return $x;"
+
+
+def build_php_file(shape: CorpusShape, rand: random.Random, file_index):
+    """生成单个PHP文件内容"""
+    lines = ["<?php"]
+    namespace = get_namespace(shape, file_index)
+    if namespace:
+        lines.append(f"namespace {namespace};\n")
+
+    # 每个文件包含同一条链上的前一个文件 形成指定长度的包含链
+    if shape.include_chain and file_index % shape.include_chain:
+        previous_path = get_file_path(shape, file_index - 1)
+        lines.append(f"require_once __DIR__ . '/../../{previous_path}';")
+    # 导入其他命名空间中的类
+    if namespace and shape.classes and shape.files > 1:
+        import_file = rand.randrange(shape.files)
+        if get_namespace(shape, import_file) != namespace:
+            lines.append(f"use {get_full_class_name(shape, import_file, 0).lstrip(chr(92))};")
+    lines.append("")
+
+    for func_index in range(shape.functions):
+        lines.append(f"function {get_function_name(file_index, func_index)}($x, $items = [])\n{{")
+        lines.append(build_method_body(shape, rand, file_index, None, "    "))
+        lines.append("}\n")
+
+    for class_index in range(shape.classes):
+        extends = ""
+        if class_index:
+            extends = f" extends {get_class_name(file_index, class_index - 1)}"
+        lines.append(f"class {get_class_name(file_index, class_index)}{extends}\n{{")
+        lines.append(f"    const VERSION = {class_index};")
+        lines.append("    public $items = [];")
+        lines.append("    protected static $count = 0;\n")
+        lines.append("    public function __construct($x = null)\n    {\n        $this->items = [$x];\n    }\n")
+        for method_index in range(shape.methods):
+            modifier = "public static" if method_index % 4 == 3 else "public"
+            lines.append(f"    {modifier} function method_{method_index}($x, $items = [])\n    {{")
+            lines.append(build_method_body(shape, rand, file_index, class_index, "        "))
+            lines.append("    }\n")
+        lines.append("}\n")
+
+    # 全局代码
+    lines.append("$x = 1;")
+    lines.append(build_call_statement(shape, rand, file_index, None))
+    return "\n".join(lines) + "\n"
+
+
+def is_generated_corpus(target_dir: str):
+    """目录不存在|为空|包含生成器标记文件时 可以安全清空"""
+    if not os.path.isdir(target_dir) or not os.listdir(target_dir):
+        return True
+    return os.path.isfile(os.path.join(target_dir, CORPUS_MARKER))
+
+
+def generate_php_corpus(target_dir: str, shape: CorpusShape, clean=True, force=False):
+    """
+    生成合成PHP项目 返回项目统计信息
+    clean 为 True 时先清空输出目录 非本生成器创建的非空目录需要 force=True 才会清空 避免路径输错时删除真实数据
+    """
+    if clean and os.path.isdir(target_dir):
+        if not force and not is_generated_corpus(target_dir):
+            raise ValueError(f"输出目录非空且不是生成的合成项目:{target_dir} 确认需要清空时请使用 --force")
+        shutil.rmtree(target_dir)
+    os.makedirs(target_dir, exist_ok=True)
+    with open(os.path.join(target_dir, CORPUS_MARKER), "w", encoding="utf-8") as f:
+        json.dump(shape.to_dict(), f)
+    rand = random.Random(shape.seed)
+    total_bytes = 0
+    for file_index in range(shape.files):
+        file_path = os.path.join(target_dir, get_file_path(shape, file_index))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        php_code = build_php_file(shape, rand, file_index).encode("utf-8")
+        with open(file_path, "wb") as f:
+            f.write(php_code)
+        total_bytes += len(php_code)
+
+    return {
+        "shape": shape.to_dict(),
+        "files": shape.files,
+        "bytes": total_bytes,
+        "classes": shape.files * shape.classes,
+        "methods": shape.files * (shape.classes * (shape.methods + 1) + shape.functions),
+    }
+
+
+def add_corpus_shape_args(parser: argparse.ArgumentParser):
+    """添加项目形态参数 供生成器和性能测试脚本共用"""
+    defaults = CorpusShape()
+    parser.add_argument('--files', type=int, default=defaults.files, help='文件数量')
+    parser.add_argument('--classes', type=int, default=defaults.classes, help='每个文件的类数量')
+    parser.add_argument('--methods', type=int, default=defaults.methods, help='每个类的方法数量')
+    parser.add_argument('--functions', type=int, default=defaults.functions, help='每个文件的全局函数数量')
+    parser.add_argument('--calls', type=int, default=defaults.calls, help='每个方法中的调用语句数量')
+    parser.add_argument('--namespaces', type=int, default=defaults.namespaces, help='命名空间数量 0 表示不使用命名空间')
+    parser.add_argument('--include-chain', type=int, default=defaults.include_chain, help='require_once 包含链长度')
+    parser.add_argument('--nest-depth', type=int, default=defaults.nest_depth, help='方法体中语句块的嵌套深度')
+    parser.add_argument('--dirs', type=int, default=defaults.dirs, help='目录数量')
+    parser.add_argument('--seed', type=int, default=defaults.seed, help='随机种子')
+
+
+def get_corpus_shape(args):
+    return CorpusShape(files=args.files, classes=args.classes, methods=args.methods, functions=args.functions,
+                       calls=args.calls, namespaces=args.namespaces, include_chain=args.include_chain,
+                       nest_depth=args.nest_depth, dirs=args.dirs, seed=args.seed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='生成合成PHP项目')
+    parser.add_argument('target_dir', help='输出目录 已存在的合成项目会被清空')
+    parser.add_argument('--force', action='store_true', default=False, help='输出目录不是生成的合成项目时也清空')
+    add_corpus_shape_args(parser)
+    args = parser.parse_args()
+    try:
+        corpus_info = generate_php_corpus(args.target_dir, get_corpus_shape(args), force=args.force)
+    except ValueError as error:
+        print(f"[!] {error}")
+        exit(1)
+    print(json.dumps(corpus_info, ensure_ascii=False, indent=2))
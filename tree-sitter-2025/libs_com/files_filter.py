@@ -1,25 +1,275 @@
+import fnmatch
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
+# 默认跳过的目录关键字 与历史行为保持一致
+DEFAULT_SKIP_DIRS = ['temp/compiled', 'vendor', 'node_modules']
+# 默认扫描的PHP文件后缀 可选追加 .phtml .inc 等
+DEFAULT_PHP_EXTENSIONS = ('.php',)
 
-def get_php_files(file_path, skip_dirs=['temp/compiled', 'vendor', 'node_modules']):
-    """获取指定目录下的PHP文件"""
-    php_files = []
 
+def _format_path(path: str):
+    return str(path).replace("\\", "/")
+
+
+def translate_gitignore_pattern(pattern: str):
+    """将单条 .gitignore 规则转换为正则 返回 (正则, 是否取反, 是否仅匹配目录) 空行和注释返回 None"""
+    pattern = pattern.rstrip("\r\n")
+    if not pattern.strip() or pattern.startswith("#"):
+        return None
+    pattern = pattern.rstrip(" ")
+    negate = pattern.startswith("!")
+    if negate:
+        pattern = pattern[1:]
+    if pattern.startswith("\\"):
+        pattern = pattern[1:]
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+    # 规则中间或开头包含 / 时 相对于 .gitignore 所在目录匹配 否则匹配任意层级的名称
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    regex, index = "", 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            regex += "(?:.*/)?"
+            index += 3
+            continue
+        if pattern.startswith("/**", index) and index + 3 == len(pattern):
+            regex += "/.*"
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            regex += ".*"
+            index += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            close_index = pattern.find("]", index + 1)
+            if close_index == -1:
+                regex += re.escape(char)
+            else:
+                char_class = pattern[index + 1:close_index]
+                if char_class.startswith("!"):
+                    char_class = "^" + char_class[1:]
+                regex += f"[{char_class}]"
+                index = close_index
+        else:
+            regex += re.escape(char)
+        index += 1
+
+    regex = ("^" if anchored else "^(?:.*/)?") + regex + "$"
+    return re.compile(regex), negate, dir_only
+
+
+def load_gitignore_rules(gitignore_path: str):
+    """读取 .gitignore 文件中的规则列表"""
+    rules = []
+    try:
+        with open(gitignore_path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                rule = translate_gitignore_pattern(line)
+                if rule:
+                    rules.append(rule)
+    except OSError:
+        pass
+    return rules
+
+
+def is_gitignored(relative_path: str, is_dir: bool, gitignore_chain):
+    """
+    判断相对项目根目录的路径是否被忽略 gitignore_chain 为 [(规则所在目录相对路径, 规则列表)]
+    按从上到下的顺序匹配 后匹配的规则优先 与 git 一致
+    """
+    ignored = False
+    for base_path, rules in gitignore_chain:
+        if base_path:
+            if not relative_path.startswith(base_path + "/"):
+                continue
+            sub_path = relative_path[len(base_path) + 1:]
+        else:
+            sub_path = relative_path
+        for regex, negate, dir_only in rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(sub_path):
+                ignored = not negate
+    return ignored
+
+
+class FileDiscoveryRules:
+    """文件发现的过滤规则 目录在进入前即被剪枝 不再遍历其子目录"""
+
+    def __init__(self, root_path, skip_dirs=None, exclude_dirs=None, exclude_globs=None, extensions=None,
+                 use_gitignore=False):
+        self.root_path = _format_path(os.path.abspath(root_path)).rstrip("/")
+        self.extensions = tuple(ext.lower() if ext.startswith(".") else f".{ext.lower()}"
+                                for ext in (extensions or DEFAULT_PHP_EXTENSIONS))
+        self.use_gitignore = use_gitignore
+        # 目录关键字 绝对路径按前缀匹配 其他按 /相对路径/ 中的片段匹配
+        self.absolute_dirs = []
+        self.keyword_dirs = []
+        for dir_key in list(skip_dirs or []) + list(exclude_dirs or []):
+            dir_key = _format_path(dir_key).strip()
+            if not dir_key:
+                continue
+            if os.path.isabs(dir_key):
+                self.absolute_dirs.append(_format_path(os.path.abspath(dir_key)).rstrip("/") + "/")
+            else:
+                self.keyword_dirs.append(dir_key)
+        self.exclude_globs = [_format_path(glob).strip("/") for glob in (exclude_globs or []) if glob]
+        self.gitignore_chains = {}
+
+    def get_gitignore_chain(self, relative_dir: str):
+        """按目录层级加载 .gitignore 规则链 用于单独判断某个路径 结果按目录缓存"""
+        if not self.use_gitignore:
+            return []
+        if relative_dir in self.gitignore_chains:
+            return self.gitignore_chains[relative_dir]
+        parent_chain = self.get_gitignore_chain(relative_dir.rpartition("/")[0]) if relative_dir else []
+        dir_path = f"{self.root_path}/{relative_dir}" if relative_dir else self.root_path
+        gitignore_rules = load_gitignore_rules(os.path.join(dir_path, ".gitignore"))
+        chain = parent_chain + [(relative_dir, gitignore_rules)] if gitignore_rules else parent_chain
+        self.gitignore_chains[relative_dir] = chain
+        return chain
+
+    def accept_path(self, relative_path: str):
+        """判断单个文件路径是否属于扫描结果 逐级检查上级目录是否被剪枝 用于文件变更事件"""
+        relative_path = _format_path(relative_path).strip("/")
+        parts = relative_path.split("/")
+        for index in range(1, len(parts)):
+            relative_dir = "/".join(parts[:index])
+            parent_chain = self.get_gitignore_chain("/".join(parts[:index - 1]))
+            if self.skip_dir(relative_dir, parts[index - 1], parent_chain):
+                return False
+        return self.accept_file(relative_path, parts[-1], self.get_gitignore_chain("/".join(parts[:-1])))
+
+    def match_globs(self, relative_path: str, name: str):
+        return any(fnmatch.fnmatchcase(relative_path, glob) or fnmatch.fnmatchcase(name, glob)
+                   for glob in self.exclude_globs)
+
+    def skip_dir(self, relative_path: str, name: str, gitignore_chain):
+        """判断目录是否需要剪枝"""
+        if self.keyword_dirs:
+            # 前后补 / 保证 "vendor" 与 "/vendor/" 写法都能匹配完整目录 也兼容 "test/" 等部分路径
+            wrapped_path = f"/{relative_path}/"
+            if any(dir_key in wrapped_path for dir_key in self.keyword_dirs):
+                return True
+        if self.absolute_dirs:
+            absolute_path = f"{self.root_path}/{relative_path}/"
+            if any(absolute_path.startswith(dir_key) for dir_key in self.absolute_dirs):
+                return True
+        if self.exclude_globs and self.match_globs(relative_path, name):
+            return True
+        return bool(gitignore_chain) and is_gitignored(relative_path, True, gitignore_chain)
+
+    def accept_file(self, relative_path: str, name: str, gitignore_chain):
+        """判断文件是否需要返回"""
+        if not name.lower().endswith(self.extensions):
+            return False
+        if self.exclude_globs and self.match_globs(relative_path, name):
+            return False
+        return not (gitignore_chain and is_gitignored(relative_path, False, gitignore_chain))
+
+
+def scan_discovery_dir(dir_path: str, relative_dir: str, gitignore_chain, rules: FileDiscoveryRules):
+    """
+    扫描单个目录 返回 (匹配的文件列表, 需要继续扫描的子目录列表[(路径, 相对路径, 规则链)])
+    使用 scandir 的 d_type 判断类型 仅在文件系统不提供类型时才会触发 stat
+    """
+    try:
+        with os.scandir(dir_path) as iterator:
+            entries = list(iterator)
+    except OSError:
+        return [], []
+
+    if rules.use_gitignore and any(entry.name == ".gitignore" for entry in entries):
+        gitignore_rules = load_gitignore_rules(os.path.join(dir_path, ".gitignore"))
+        if gitignore_rules:
+            gitignore_chain = gitignore_chain + [(relative_dir, gitignore_rules)]
+
+    files, sub_dirs = [], []
+    for entry in entries:
+        relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            # 与 os.walk 一致 不进入符号链接目录
+            try:
+                is_symlink = entry.is_symlink()
+            except OSError:
+                is_symlink = False
+            if not is_symlink and not rules.skip_dir(relative_path, entry.name, gitignore_chain):
+                sub_dirs.append((entry.path, relative_path, gitignore_chain))
+        elif rules.accept_file(relative_path, entry.name, gitignore_chain):
+            files.append(entry.path)
+    return files, sub_dirs
+
+
+def scan_discovery_tree(root_path: str, rules: FileDiscoveryRules, workers=1):
+    """
+    按目录层级扫描项目 workers>1 时同一层级的目录并行扫描 适用于 NFS 等高延迟文件系统
+    返回 {目录路径: (匹配的文件列表, 子目录路径列表)} 仅包含未被剪枝的目录
+    """
+    scanned = {}
+    level = [(root_path, "", [])]
+    executor = ThreadPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    try:
+        while level:
+            if executor and len(level) > 1:
+                results = list(executor.map(lambda item: scan_discovery_dir(*item, rules), level))
+            else:
+                results = [scan_discovery_dir(*item, rules) for item in level]
+            next_level = []
+            for (dir_path, _, _), (files, sub_dirs) in zip(level, results):
+                scanned[dir_path] = (files, [sub_dir[0] for sub_dir in sub_dirs])
+                next_level.extend(sub_dirs)
+            level = next_level
+    finally:
+        if executor:
+            executor.shutdown()
+    return scanned
+
+
+def discover_files(root_path: str, rules: FileDiscoveryRules, workers=1):
+    """扫描项目文件 返回顺序与 os.walk 自顶向下遍历一致"""
+    scanned = scan_discovery_tree(root_path, rules, workers=workers)
+    # 按深度优先顺序还原文件列表
+    all_files, stack = [], [root_path]
+    while stack:
+        files, sub_dirs = scanned.pop(stack.pop())
+        all_files.extend(files)
+        stack.extend(reversed(sub_dirs))
+    return all_files
+
+
+def get_php_files(file_path, skip_dirs=DEFAULT_SKIP_DIRS, exclude_dirs=None, exclude_globs=None, extensions=None,
+                  use_gitignore=False, workers=1):
+    """
+    获取指定目录下的PHP文件
+    skip_dirs|exclude_dirs: 排除目录关键字 支持部分路径和完整路径 命中的目录不再进入
+    exclude_globs: 排除的通配符规则 同时匹配相对路径和文件名(目录名)
+    extensions: 扫描的文件后缀 默认仅 .php
+    use_gitignore: 是否遵循项目中的 .gitignore 规则
+    workers: 并行扫描目录的线程数
+    """
     # 如果指定了单个文件
     if os.path.isfile(file_path):
         return [file_path]
 
-    # 递归扫描目录
-    for root, _, files in os.walk(file_path):
-        # 跳过特定目录
-        if any(skip_dir in root.replace('\\', '/') for skip_dir in skip_dirs):
-            continue
-
-        for file in files:
-            if file.endswith('.php'):
-                php_files.append(os.path.join(root, file))
-    return php_files
+    rules = FileDiscoveryRules(file_path, skip_dirs=skip_dirs, exclude_dirs=exclude_dirs, exclude_globs=exclude_globs,
+                               extensions=extensions, use_gitignore=use_gitignore)
+    return discover_files(file_path, rules, workers=workers)
 
 
 def get_files_with_filter(directory: str, exclude_suffixes: List[str], exclude_keys: List[str] = None) -> List[str]:
@@ -2,6 +2,8 @@ from tree_sitter._binding import Node
 
 from php_enums import MethodKeys
 from tree_sitter_uitls import find_first_child_by_field, get_node_text, get_node_filed_text
+from php_queries import PARAMS_NAMED_TYPE_QUERY, CREATE_OBJECT_QUERY
+from php_tree_visitor import get_php_query
 
 
 def query_class_object_infos(language: object, tree_node: Node) -> list[dict]:
@@ -14,13 +16,7 @@ def query_class_object_infos(language: object, tree_node: Node) -> list[dict]:
 def query_params_named_type_infos(language, tree_node):
     object_class_dicts = []
     # 定义查询语句
-    parameters_query = language.query("""
-        ; 查询参数传递 部分情况下类对象走的是参数传递
-        (simple_parameter
-            type: (named_type)
-            name: (variable_name)
-        )@parameters
-    """)
+    parameters_query = get_php_query(language, PARAMS_NAMED_TYPE_QUERY)
     # 遍历匹配结果
     for match in parameters_query.matches(tree_node):
         match_dict = match[1]
@@ -48,13 +44,7 @@ def query_create_object_infos(language, tree_node):
     # 存储结果的列表
     object_class_dicts = []
     # 定义查询语句
-    new_object_query = language.query("""
-        ; 查询对象方法创建 同时获取返回值
-        (assignment_expression
-            left: (variable_name)
-            right: ((object_creation_expression))
-        ) @assignment_expr
-    """)
+    new_object_query = get_php_query(language, CREATE_OBJECT_QUERY)
     # 遍历匹配结果
     for match in new_object_query.matches(tree_node):
         match_dict = match[1]
@@ -1,23 +1,15 @@
 from typing import Tuple
 
 from php_enums import DefineKeys
-from tree_sitter_uitls import find_first_child_by_field, get_strs_hash, custom_format_path
+from tree_sitter_uitls import find_first_child_by_field, get_strs_hash, custom_format_path, decode_node_text
+from php_queries import CLASS_DEFINE_QUERY, FUNCTION_DEFINE_QUERY, NAMESPACE_DEFINE_QUERY
+from php_tree_visitor import get_php_query
 
 
 def query_classes_define_infos(language, tree_node) -> Tuple[set[str], set[Tuple[int, int]]]:
     """获取所有类定义的类名及其代码行范围。 """
     # 定义查询语句，匹配类型定义
-    class_def_query = language.query("""
-        ;匹配普通|抽象|final类定义信息
-        (class_declaration
-            name: (name) @class.name
-        ) @class.def
-
-        ;匹配接口类定义信息
-        (interface_declaration
-            name: (name) @class.name
-        ) @class.def
-    """)
+    class_def_query = get_php_query(language, CLASS_DEFINE_QUERY)
 
     class_define_infos = extract_define_node_simple_infos(tree_node, class_def_query, 'class.def', need_node_field='name')
     return class_define_infos
@@ -26,11 +18,7 @@ def query_classes_define_infos(language, tree_node) -> Tuple[set[str], set[Tuple
 def query_methods_define_infos(language, tree_node):
     """ 获取所有本地普通函数（全局函数）的名称及其范围。"""
     # 定义查询语句
-    function_query = language.query("""
-        (function_definition
-            name: (name) @function.name
-        ) @function.def
-    """)
+    function_query = get_php_query(language, FUNCTION_DEFINE_QUERY)
 
     function_define_infos = extract_define_node_simple_infos(tree_node, function_query, 'function.def', need_node_field='name')
     return function_define_infos
@@ -46,7 +34,7 @@ def extract_define_node_simple_infos(root_node, query, node_field, need_node_fie
             if total_node:
                 # 通过 child_by_field_name 提取命名空间名称
                 need_node = find_first_child_by_field(total_node, need_node_field)
-                need_text = need_node.text.decode('utf8')
+                need_text = decode_node_text(need_node)
                 start_point = total_node.start_point[0]
                 end_point = total_node.end_point[0]
                 node_info = {
@@ -61,12 +49,7 @@ def extract_define_node_simple_infos(root_node, query, node_field, need_node_fie
 
 def query_namespace_define_infos(language, root_node):
     """获取所有本地命名空间的定义 返回node字典格式"""
-    namespace_define_query = language.query("""
-    ;匹配命名空间定义信息
-    (namespace_definition
-        name: (namespace_name) @namespace_name
-    ) @namespace.def
-    """)
+    namespace_define_query = get_php_query(language, NAMESPACE_DEFINE_QUERY)
     # 提取命名空间信息
     namespace_infos = extract_namespace_node_define_infos(root_node, namespace_define_query, 'namespace.def', need_node_field='name')
     return namespace_infos
@@ -82,7 +65,7 @@ def extract_namespace_node_define_infos(root_node, query, node_field, need_node_
             if total_node:
                 # 提取命名空间名称
                 need_node = find_first_child_by_field(total_node, need_node_field)
-                need_text = need_node.text.decode('utf8')
+                need_text = decode_node_text(need_node)
 
                 # 获取命名空间的起始行号
                 start_point = total_node.start_point[0]
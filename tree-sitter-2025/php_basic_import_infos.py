@@ -1,6 +1,8 @@
 from php_enums import ImportType, ImportKey
 from tree_sitter_uitls import get_node_text, find_first_child_by_field, custom_format_path, \
     get_node_first_valid_child_node_text, get_node_first_valid_child_node
+from php_queries import USE_DECLARATION_QUERY, INCLUDE_REQUIRE_QUERY
+from php_tree_visitor import get_php_query
 
 
 def create_import_result(import_type, start_line, end_line, namespace, file_path, use_from, alias, full_text):
@@ -31,7 +33,7 @@ def get_use_declarations(root_node, language):
             return ImportType.USE_CLASS.value, item_text.strip()
 
     use_infos = []
-    use_query = language.query("(namespace_use_declaration) @use_declaration")
+    use_query = get_php_query(language, USE_DECLARATION_QUERY)
     for match, match_dict in use_query.matches(root_node):
         use_node = match_dict['use_declaration'][0]
         full_text = get_node_text(use_node)
@@ -83,15 +85,7 @@ def get_include_require_info(root_node, language):
                 break
         return import_type
 
-    include_query = language.query("""
-        (include_expression) @import_expression
-        
-        (include_once_expression) @import_expression
-        
-        (require_expression) @import_expression
-        
-        (require_once_expression) @import_expression
-    """)
+    include_query = get_php_query(language, INCLUDE_REQUIRE_QUERY)
     
     import_infos = []
     matches = include_query.matches(root_node)
@@ -118,9 +112,10 @@ def get_include_require_info(root_node, language):
                     file_path = get_node_text(first_valid_child_node)
             else:
                 # (require_once_expression (string (string_content))))
-                string_node = find_first_child_by_field(import_expression_node, 'string')
-                if string_node:
-                    file_path = get_node_text(string_node)
+                # (include_expression (encapsed_string)) | (include_expression (binary_expression)) 取第一个具名子节点 不能取到 include 关键字
+                path_node = next((child for child in import_expression_node.named_children if child.type != 'comment'), None)
+                if path_node:
+                    file_path = get_node_text(path_node)
                 else:
                     file_path = get_node_first_valid_child_node_text(import_expression_node)
 
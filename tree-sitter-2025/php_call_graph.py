@@ -0,0 +1,334 @@
+import argparse
+import marshal
+import os
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict, deque
+
+from php_enums import FileInfoKeys, ClassKeys, MethodKeys
+
+# 压缩调用图文件格式
+GRAPH_MAGIC = "PHPGRAPH"
+GRAPH_FORMAT = "1"
+SQLITE_MAGIC = b"SQLite format 3\0"
+
+
+def iter_parsed_methods(parsed_infos: dict):
+    """遍历解析结果中的全局方法和类方法"""
+    for parsed_info in parsed_infos.values():
+        yield from parsed_info.get(FileInfoKeys.METHOD_INFOS.value) or []
+        for class_info in parsed_info.get(FileInfoKeys.CLASS_INFOS.value) or []:
+            yield from class_info.get(ClassKeys.METHODS.value) or []
+
+
+def iter_resolved_edges(parsed_infos: dict):
+    """遍历补充函数关系后的调用边 返回 (调用方ID, 被调用方ID, 调用行号)"""
+    for method_info in iter_parsed_methods(parsed_infos):
+        caller_id = method_info.get(MethodKeys.UNIQ_ID.value)
+        for called_info in method_info.get(MethodKeys.CALLED_METHODS.value) or []:
+            for callee_id in called_info.get(MethodKeys.MAY_SOURCE.value) or {}:
+                yield caller_id, callee_id, called_info.get(MethodKeys.START.value)
+
+
+def build_csr(nodes_num: int, edges: list):
+    """由 (起点序号, 终点序号) 列表构建 CSR 邻接 返回 (偏移数组, 目标数组) 每个节点的目标按序号排序"""
+    offsets = array("q", [0]) * (nodes_num + 1)
+    for source, _ in edges:
+        offsets[source + 1] += 1
+    for index in range(nodes_num):
+        offsets[index + 1] += offsets[index]
+
+    targets = array("i", [0]) * len(edges)
+    positions = array("q", offsets[:-1])
+    for source, target in sorted(edges):
+        targets[positions[source]] = target
+        positions[source] += 1
+    return offsets, targets
+
+
+def bitset_to_indexes(bitset: bytes):
+    """将位图转换为节点序号列表"""
+    indexes = []
+    for byte_index, byte in enumerate(bitset):
+        if byte:
+            base = byte_index << 3
+            indexes.extend(base + bit for bit in range(8) if byte >> bit & 1)
+    return indexes
+
+
+class CompactCallGraph:
+    """
+    整数序号的压缩调用图 正向和反向邻接均以 CSR 形式存储在 array 中
+    同一调用方对同一被调用方的多个调用点合并为一条边
+    """
+
+    def __init__(self, node_ids: list, node_labels: list, node_files: list, forward, reverse, closure_cache_size=256):
+        self.node_ids = node_ids
+        self.node_labels = node_labels
+        self.node_files = node_files
+        self.node_index = {node_id: index for index, node_id in enumerate(node_ids)}
+        self.forward_offsets, self.forward_targets = forward
+        self.reverse_offsets, self.reverse_targets = reverse
+        # 热点起点的闭包位图缓存 (起点序号, 是否反向) -> 位图
+        self.closure_cache_size = closure_cache_size
+        self.closure_cache = OrderedDict()
+
+    @classmethod
+    def from_edges(cls, nodes, edges, closure_cache_size=256):
+        """nodes 为 [(方法ID, 名称, 文件)] edges 为 [(调用方ID, 被调用方ID)] 不在 nodes 中的端点自动补充"""
+        node_ids, node_labels, node_files = [], [], []
+        node_index = {}
+        for node_id, label, file_path in nodes:
+            if node_id not in node_index:
+                node_index[node_id] = len(node_ids)
+                node_ids.append(node_id)
+                node_labels.append(label)
+                node_files.append(file_path)
+
+        index_edges = set()
+        for caller_id, callee_id in edges:
+            for node_id in (caller_id, callee_id):
+                if node_id not in node_index:
+                    node_index[node_id] = len(node_ids)
+                    node_ids.append(node_id)
+                    node_labels.append(None)
+                    node_files.append(None)
+            index_edges.add((node_index[caller_id], node_index[callee_id]))
+
+        index_edges = list(index_edges)
+        forward = build_csr(len(node_ids), index_edges)
+        reverse = build_csr(len(node_ids), [(target, source) for source, target in index_edges])
+        return cls(node_ids, node_labels, node_files, forward, reverse, closure_cache_size)
+
+    @classmethod
+    def from_parsed_infos(cls, parsed_infos: dict, closure_cache_size=256):
+        """从补充函数关系后的解析结果构建"""
+        nodes = ((method_info.get(MethodKeys.UNIQ_ID.value), method_info.get(MethodKeys.FULLNAME.value),
+                  method_info.get(MethodKeys.FILE.value)) for method_info in iter_parsed_methods(parsed_infos))
+        edges = ((caller_id, callee_id) for caller_id, callee_id, _ in iter_resolved_edges(parsed_infos))
+        return cls.from_edges(nodes, edges, closure_cache_size)
+
+    @classmethod
+    def from_sqlite(cls, db_path: str, closure_cache_size=256):
+        """从 SQLite 项目索引构建"""
+        with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+            nodes = conn.execute("SELECT uniq_id, fullname, file FROM methods").fetchall()
+            edges = conn.execute("SELECT caller_id, callee_id FROM edges").fetchall()
+        return cls.from_edges(nodes, edges, closure_cache_size)
+
+    @classmethod
+    def load(cls, graph_path: str, closure_cache_size=256):
+        """加载 save 保存的压缩调用图 无需重新构建"""
+        with open(graph_path, "rb") as f:
+            graph_data = marshal.load(f)
+        if graph_data.get("MAGIC") != GRAPH_MAGIC or graph_data.get("FORMAT") != GRAPH_FORMAT:
+            raise ValueError(f"不支持的调用图文件格式: {graph_path}")
+        arrays = []
+        for key, typecode in [("FORWARD_OFFSETS", "q"), ("FORWARD_TARGETS", "i"),
+                              ("REVERSE_OFFSETS", "q"), ("REVERSE_TARGETS", "i")]:
+            values = array(typecode)
+            values.frombytes(graph_data[key])
+            arrays.append(values)
+        return cls(graph_data["NODE_IDS"], graph_data["NODE_LABELS"], graph_data["NODE_FILES"],
+                   (arrays[0], arrays[1]), (arrays[2], arrays[3]), closure_cache_size)
+
+    def save(self, graph_path: str):
+        """保存为 marshal 文件 数组以原始字节存储"""
+        graph_data = {
+            "MAGIC": GRAPH_MAGIC,
+            "FORMAT": GRAPH_FORMAT,
+            "NODE_IDS": self.node_ids,
+            "NODE_LABELS": self.node_labels,
+            "NODE_FILES": self.node_files,
+            "FORWARD_OFFSETS": self.forward_offsets.tobytes(),
+            "FORWARD_TARGETS": self.forward_targets.tobytes(),
+            "REVERSE_OFFSETS": self.reverse_offsets.tobytes(),
+            "REVERSE_TARGETS": self.reverse_targets.tobytes(),
+        }
+        temp_path = f"{graph_path}.tmp"
+        with open(temp_path, "wb") as f:
+            marshal.dump(graph_data, f)
+        os.replace(temp_path, graph_path)
+
+    @property
+    def nodes_num(self):
+        return len(self.node_ids)
+
+    @property
+    def edges_num(self):
+        return len(self.forward_targets)
+
+    def get_adjacency(self, reverse=False):
+        if reverse:
+            return self.reverse_offsets, self.reverse_targets
+        return self.forward_offsets, self.forward_targets
+
+    def neighbors(self, node: int, reverse=False):
+        """获取节点的直接后继(reverse=True 时为直接前驱)序号"""
+        offsets, targets = self.get_adjacency(reverse)
+        return targets[offsets[node]:offsets[node + 1]]
+
+    def to_indexes(self, roots):
+        """方法ID列表转换为节点序号 忽略不存在的ID"""
+        return [self.node_index[root] for root in roots if root in self.node_index]
+
+    def traverse(self, roots: list, reverse=False, max_depth=None, order="bfs"):
+        """
+        从起点开始迭代遍历 返回 [(节点序号, 深度)] 按发现顺序排列 起点深度为0
+        order 为 bfs|dfs max_depth 限制最大跳数 用于 k-hop 查询
+        """
+        offsets, targets = self.get_adjacency(reverse)
+        visited = bytearray(self.nodes_num)
+        results = []
+        if order == "dfs" and max_depth is None:
+            # 不限制跳数时每个节点只展开一次 遍历为线性复杂度
+            stack = [(root, 0) for root in reversed(roots)]
+            while stack:
+                node, depth = stack.pop()
+                if visited[node]:
+                    continue
+                visited[node] = 1
+                results.append((node, depth))
+                # 逆序入栈 保证按邻接顺序访问
+                for target in reversed(targets[offsets[node]:offsets[node + 1]]):
+                    if not visited[target]:
+                        stack.append((target, depth + 1))
+            return results
+        if order == "dfs":
+            # 限制跳数时 节点以更小的深度再次到达需要重新展开 否则会遗漏k跳内的节点
+            min_depths = {}
+            stack = [(root, 0) for root in reversed(roots)]
+            while stack:
+                node, depth = stack.pop()
+                if node in min_depths and min_depths[node] <= depth:
+                    continue
+                min_depths[node] = depth
+                if not visited[node]:
+                    visited[node] = 1
+                    results.append((node, depth))
+                if depth >= max_depth:
+                    continue
+                for target in reversed(targets[offsets[node]:offsets[node + 1]]):
+                    if min_depths.get(target, depth + 2) > depth + 1:
+                        stack.append((target, depth + 1))
+            return results
+
+        queue = deque()
+        for root in roots:
+            if not visited[root]:
+                visited[root] = 1
+                queue.append((root, 0))
+        while queue:
+            node, depth = queue.popleft()
+            results.append((node, depth))
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for target in targets[offsets[node]:offsets[node + 1]]:
+                if not visited[target]:
+                    visited[target] = 1
+                    queue.append((target, depth + 1))
+        return results
+
+    def closure_bitset(self, root: int, reverse=False):
+        """
+        计算起点的可达闭包位图(包含起点) 结果放入有界缓存
+        遍历中遇到已缓存闭包的节点时直接合并其位图 不再展开
+        """
+        cache_key = (root, reverse)
+        bitset = self.closure_cache.get(cache_key)
+        if bitset is not None:
+            self.closure_cache.move_to_end(cache_key)
+            return bitset
+
+        offsets, targets = self.get_adjacency(reverse)
+        visited = bytearray(self.nodes_num)
+        merged = 0
+        visited[root] = 1
+        reached = [root]
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            cached_bitset = self.closure_cache.get((node, reverse)) if node != root else None
+            if cached_bitset is not None:
+                merged |= int.from_bytes(cached_bitset, "little")
+                continue
+            for target in targets[offsets[node]:offsets[node + 1]]:
+                if not visited[target]:
+                    visited[target] = 1
+                    reached.append(target)
+                    stack.append(target)
+
+        # 访问到的节点转换为位图 再与合并的缓存闭包取并集
+        bitset = bytearray((self.nodes_num + 7) >> 3)
+        for node in reached:
+            bitset[node >> 3] |= 1 << (node & 7)
+        if merged:
+            bitset = bytearray((int.from_bytes(bitset, "little") | merged).to_bytes(len(bitset), "little"))
+        bitset = bytes(bitset)
+
+        if self.closure_cache_size:
+            self.closure_cache[cache_key] = bitset
+            if len(self.closure_cache) > self.closure_cache_size:
+                self.closure_cache.popitem(last=False)
+        return bitset
+
+    def reachable(self, roots: list, reverse=False):
+        """获取多个起点的可达方法序号集合(包含起点) 按序号排序 使用闭包缓存"""
+        if len(roots) == 1:
+            return bitset_to_indexes(self.closure_bitset(roots[0], reverse))
+        merged = 0
+        for root in roots:
+            merged |= int.from_bytes(self.closure_bitset(root, reverse), "little")
+        return bitset_to_indexes(merged.to_bytes((self.nodes_num + 7) >> 3, "little"))
+
+    def describe(self, node: int):
+        return {
+            MethodKeys.UNIQ_ID.value: self.node_ids[node],
+            MethodKeys.FULLNAME.value: self.node_labels[node],
+            MethodKeys.FILE.value: self.node_files[node],
+        }
+
+    def find_nodes(self, keyword: str):
+        """按方法ID或完整方法名查找节点序号"""
+        if keyword in self.node_index:
+            return [self.node_index[keyword]]
+        return [index for index, label in enumerate(self.node_labels) if label == keyword]
+
+
+def load_compact_call_graph(source_path: str, closure_cache_size=256):
+    """根据文件头加载 SQLite 项目索引或压缩调用图文件"""
+    with open(source_path, "rb") as f:
+        header = f.read(len(SQLITE_MAGIC))
+    if header == SQLITE_MAGIC:
+        return CompactCallGraph.from_sqlite(source_path, closure_cache_size)
+    return CompactCallGraph.load(source_path, closure_cache_size)
+
+
+if __name__ == '__main__':
+    # python php_call_graph.py project.graph back_action --reverse --depth 2
+    parser = argparse.ArgumentParser(description='查询调用图中的可达方法')
+    parser.add_argument('source', help='压缩调用图文件(php_parser.py -G 生成) 或 SQLite 项目索引文件')
+    parser.add_argument('methods', nargs='+', help='起点方法ID或完整方法名')
+    parser.add_argument('-r', '--reverse', action='store_true', default=False, help='反向查询 即查找所有调用方')
+    parser.add_argument('-k', '--depth', type=int, default=None, help='最大跳数 (默认: 不限制)')
+    parser.add_argument('--dfs', action='store_true', default=False, help='按深度优先顺序输出 (默认: 广度优先)')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    graph = load_compact_call_graph(args.source)
+    print(f"加载调用图 方法:{graph.nodes_num} 调用边:{graph.edges_num} 用时:{time.time() - start_time:.3f} 秒")
+
+    root_nodes = [node for keyword in args.methods for node in graph.find_nodes(keyword)]
+    if not root_nodes:
+        print(f"未找到起点方法: {args.methods}")
+        exit()
+
+    start_time = time.time()
+    visited_nodes = graph.traverse(root_nodes, reverse=args.reverse, max_depth=args.depth,
+                                   order="dfs" if args.dfs else "bfs")
+    for visited_node, visited_depth in visited_nodes:
+        node_info = graph.describe(visited_node)
+        print(f"{'  ' * visited_depth}{node_info[MethodKeys.FULLNAME.value]}  "
+              f"[{node_info[MethodKeys.FILE.value]}] {node_info[MethodKeys.UNIQ_ID.value]}")
+    print(f"可达方法:{len(visited_nodes)} 用时:{time.time() - start_time:.3f} 秒")
@@ -1,16 +1,14 @@
 from php_class_utils import parse_class_define_info
+from php_dependent_utils import AnalysisContext, as_analysis_context
+from php_queries import CLASS_INFO_QUERY
+from php_tree_visitor import get_php_query
 
 
-def analyze_class_infos(language, root_node, dependent_infos:dict):
-    """提取所有类定义信息"""
-    # 获取所有命名空间信息
-    tree_sitter_class_define_query = """
-        ;匹配类定义信息 含abstract类和final类
-        (class_declaration) @class.def
-        ;匹配接口定义
-        (interface_declaration) @class.def
-    """
-    class_info_query = language.query(tree_sitter_class_define_query)
+def analyze_class_infos(language, root_node, analysis_context: AnalysisContext, called_bodies: list = None):
+    """提取所有类定义信息 called_bodies 不为 None 时不解析类方法的调用信息 记录 (方法信息, 方法节点)"""
+    analysis_context = as_analysis_context(analysis_context)
+    # 获取所有类定义信息
+    class_info_query = get_php_query(language, CLASS_INFO_QUERY)
     class_info_matches = class_info_query.matches(root_node)
 
     # 函数调用解析部分
@@ -25,7 +23,7 @@ def analyze_class_infos(language, root_node, dependent_infos:dict):
             # 处理类信息时使用当前命名空间 # 如果命名空间栈非空，使用栈顶命名空间
             is_interface = inter_mark in match_dict
             class_node = match_dict[inter_mark][0] if is_interface else match_dict[class_mark][0]
-            class_info = parse_class_define_info(language, class_node, is_interface, dependent_infos)
+            class_info = parse_class_define_info(language, class_node, is_interface, analysis_context, called_bodies)
             class_infos.append(class_info)
     return class_infos
 
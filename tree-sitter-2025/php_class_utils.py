@@ -1,12 +1,12 @@
 from tree_sitter._binding import Node
 
-from php_enums import PropertyKeys, ClassKeys, PHPModifier, DefineKeys
+from php_enums import PropertyKeys, ClassKeys, PHPModifier
 from php_func_utils import query_method_called_methods, is_static_method, get_class_method_fullname, \
     create_method_result, \
     parse_return_node, parse_params_node, guess_method_type
 from tree_sitter_uitls import find_first_child_by_field, get_node_filed_text, find_children_by_field, \
-    find_node_info_by_line_in_scope
-from php_dependent_utils import spread_dependent_infos
+    decode_node_text
+from php_dependent_utils import AnalysisContext
 
 def parse_class_or_method_node_modifier_infos(any_none:Node):
     """获取指定节点（方法|属性|类）的特殊描述符信息"""
@@ -76,7 +76,8 @@ def parse_class_properties_node(class_node):
     return properties
 
 
-def parse_class_methods_node(language, class_node: Node, namespace: str, dependent_infos: dict):
+def parse_class_methods_node(language, class_node: Node, namespace: str, analysis_context: AnalysisContext,
+                             called_bodies: list = None):
     """获取类内部定义的方法节点信息 """
     # body_node:(declaration_list
     # (declaration_list
@@ -85,14 +86,14 @@ def parse_class_methods_node(language, class_node: Node, namespace: str, depende
     # (method_declaration (visibility_modifier) name: (name) parameters: (formal_parameters) body: (compound_statement (echo_statement (encapsed_string (string_content) (escape_sequence)))))
     # (method_declaration (visibility_modifier) name: (name) parameters: (formal_parameters) body: (compound_statement (echo_statement (encapsed_string (string_content) (escape_sequence))))))
 
-    def parse_class_method_node(language, method_node, class_name, namespace, dependent_infos: dict):
+    def parse_class_method_node(language, method_node, class_name, namespace, analysis_context: AnalysisContext):
         # print(f"method_node:{method_node}")
         method_name = get_node_filed_text(method_node, 'name')
         start_line = method_node.start_point[0]
         end_line = method_node.end_point[0]
         parameters_node = method_node.child_by_field_name('parameters')
         params_info = parse_params_node(parameters_node)
-        called_methods = query_method_called_methods(language, method_node, dependent_infos)
+        called_methods = query_method_called_methods(language, method_node, analysis_context) if called_bodies is None else []
         visibility = get_node_filed_text(method_node, 'visibility_modifier')
         modifiers = parse_class_or_method_node_modifier_infos(method_node)
         method_type = guess_method_type(method_name, is_native_method_or_class=True, is_class_method=True)
@@ -104,6 +105,8 @@ def parse_class_methods_node(language, class_node: Node, namespace: str, depende
                                            fullname=fullname, visibility=visibility, modifiers=modifiers,
                                            method_type=method_type, params_info=params_info, return_infos=return_infos,
                                            is_native=None, called_methods=called_methods)
+        if called_bodies is not None:
+            called_bodies.append((method_info, method_node))
         return method_info
 
     # 获取请求体部分
@@ -114,16 +117,14 @@ def parse_class_methods_node(language, class_node: Node, namespace: str, depende
     method_info = []
     method_nodes = find_children_by_field(body_node, 'method_declaration')
     for method_node in method_nodes:
-        property_info = parse_class_method_node(language, method_node, class_name, namespace, dependent_infos)
+        property_info = parse_class_method_node(language, method_node, class_name, namespace, analysis_context)
         method_info.append(property_info)
     return method_info
 
 
-def parse_class_define_info(language, class_define_node, is_interface, dependent_infos:dict):
+def parse_class_define_info(language, class_define_node, is_interface, analysis_context: AnalysisContext,
+                            called_bodies: list = None):
     """解析类定义信息，使用 child_by_field_name 提取字段。"""
-    # 预解析依赖信息
-    gb_methods_infos,gb_classes_infos,gb_namespace_infos,gb_object_class_infos, gb_import_depends_infos = spread_dependent_infos(dependent_infos)
-
     # 获取类名
     class_name = get_node_filed_text(class_define_node, 'name')
     if not class_name:
@@ -135,8 +136,7 @@ def parse_class_define_info(language, class_define_node, is_interface, dependent
     end_line = class_define_node.end_point[0]
 
     # 反向查询命名空间信息
-    namespace_info = find_node_info_by_line_in_scope(start_line, gb_namespace_infos, DefineKeys.START.value, DefineKeys.END.value)
-    namespace = namespace_info.get(DefineKeys.NAME.value, None)
+    namespace = analysis_context.find_namespace(start_line)
 
     # 获取继承信息
     extends = parse_class_define_extends_infos(class_define_node)
@@ -153,7 +153,7 @@ def parse_class_define_info(language, class_define_node, is_interface, dependent
     properties = parse_class_properties_node(class_define_node)
 
     # 添加类方法信息
-    class_methods = parse_class_methods_node(language, class_define_node, namespace, dependent_infos)
+    class_methods = parse_class_methods_node(language, class_define_node, namespace, analysis_context, called_bodies)
 
     return creat_class_result(class_name=class_name, namespace=namespace, start_line=start_line, end_line=end_line,
                               visibility=visibility, modifiers=modifiers, extends=extends, interfaces=implements_infos,
@@ -166,7 +166,7 @@ def parse_class_define_implements_infos(class_define_node):
     interface_clause_node = find_first_child_by_field(class_define_node, 'class_interface_clause')
     if interface_clause_node:
         implements_infos = find_children_by_field(interface_clause_node, "name")
-        implements_infos = [{node.text.decode('utf-8'): None} for node in implements_infos]
+        implements_infos = [{decode_node_text(node): None} for node in implements_infos]
         # implements_nodes:[{'MyInterface': None}, {'MyInterfaceB': None}]
         implements_infos = implements_infos
     return implements_infos
@@ -178,7 +178,7 @@ def parse_class_define_extends_infos(class_define_node):
     base_clause_node = find_first_child_by_field(class_define_node, 'base_clause')
     if base_clause_node:
         extends_infos = find_children_by_field(base_clause_node, "name")
-        extends_infos = [{node.text.decode('utf-8'): None} for node in extends_infos]
+        extends_infos = [{decode_node_text(node): None} for node in extends_infos]
         # extends_infos:[{'MyAbstractClassA': None}, {'MyAbstractClassB': None}]
     return extends_infos
 
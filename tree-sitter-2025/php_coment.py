@@ -1,7 +1,11 @@
+from php_queries import COMMENT_QUERY
+from php_tree_visitor import get_php_query
+
+
 def remove_comment_nodes(language, root_node):
     """移除所有注释信息"""
     # 匹配所有 comment 节点
-    query = language.query("""(comment) @comment_node""")
+    query = get_php_query(language, COMMENT_QUERY)
     # 执行查询，获取所有匹配的注释节点
     matches = query.matches(root_node)
     # 提取所有注释节点，并按照起始字节排序（从后往前处理，避免索引偏移）
@@ -3,7 +3,9 @@ from typing import Tuple
 from php_basic_define_infos import query_methods_define_infos, query_classes_define_infos, query_namespace_define_infos
 from php_basic_import_infos import analyze_import_infos
 from php_basic_create_object import query_class_object_infos
-from php_enums import DefineTypes, DefineKeys
+from php_enums import DefineTypes, DefineKeys, MethodKeys
+from php_line_index import index_dependent_infos, IndexedInfos
+from tree_sitter_uitls import find_node_info_by_line_in_scope, find_node_info_by_line_nearest
 
 
 def analyse_dependent_infos(language, root_node):
@@ -30,7 +32,8 @@ def analyse_dependent_infos(language, root_node):
     gb_import_depends_infos = analyze_import_infos(language, root_node)
     dependent_infos[DefineTypes.IMPORT_DEPENDS.value] = gb_import_depends_infos
 
-    return dependent_infos
+    # 为各类依赖信息建立行号区间索引 供同一文件的所有调用点复用
+    return index_dependent_infos(dependent_infos)
 
 def get_namespace_infos(dependent_infos:dict):
     gb_namespace_infos =  dependent_infos.get(DefineTypes.DEFINE_NAMESPACES.value, [])
@@ -48,6 +51,8 @@ def spread_dependent_infos(dependent_infos:dict):
 
 def get_infos_names_ranges(node_infos: dict) -> Tuple[set[str], set[Tuple[int, int]]]:
     """从提取的节点名称|起始行信息中获取 节点名称和范围元组"""
+    if isinstance(node_infos, IndexedInfos):
+        return node_infos.value_set(DefineKeys.NAME.value), node_infos.value_set((DefineKeys.START.value, DefineKeys.END.value))
     node_names = set()
     node_ranges = set()
     for node_info in node_infos:
@@ -63,3 +68,63 @@ def get_ranges_names(dependent_infos):
     gb_classes_names, gb_classes_ranges = get_infos_names_ranges(gb_classes_infos)
     return gb_methods_names, gb_methods_ranges, gb_classes_names, gb_classes_ranges
 
+
+class AnalysisContext:
+    """
+    单个文件的分析上下文 在 analyse_dependent_infos 之后创建一次 传递给所有分析器 创建后只读
+    预先计算 名称集合|范围集合|对象名->对象创建信息|(类名,起始行,结束行)->对象名 避免每个方法体|调用点重复计算
+    dependent_infos 为原始依赖信息 仍作为解析结果的一部分输出
+    """
+    __slots__ = ("dependent_infos", "methods_infos", "classes_infos", "namespace_infos", "object_class_infos",
+                 "import_depends_infos", "methods_names", "methods_ranges", "classes_names", "classes_ranges",
+                 "object_classes", "class_objects")
+
+    def __init__(self, dependent_infos: dict):
+        self.dependent_infos = index_dependent_infos(dependent_infos)
+        (self.methods_infos, self.classes_infos, self.namespace_infos, self.object_class_infos,
+         self.import_depends_infos) = spread_dependent_infos(self.dependent_infos)
+
+        methods_names, methods_ranges = get_infos_names_ranges(self.methods_infos)
+        classes_names, classes_ranges = get_infos_names_ranges(self.classes_infos)
+        self.methods_names = frozenset(methods_names)
+        self.methods_ranges = frozenset(methods_ranges)
+        self.classes_names = frozenset(classes_names)
+        self.classes_ranges = frozenset(classes_ranges)
+
+        # 同名对象存在多次创建时 与原有逐条查找一致 只取第一条
+        self.object_classes = {}
+        self.class_objects = {}
+        for object_class_info in self.object_class_infos:
+            self.object_classes.setdefault(object_class_info.get(MethodKeys.OBJECT.value), object_class_info)
+            class_key = (object_class_info.get(MethodKeys.CLASS.value), object_class_info.get(MethodKeys.START.value),
+                         object_class_info.get(MethodKeys.END.value))
+            self.class_objects.setdefault(class_key, object_class_info.get(MethodKeys.OBJECT.value))
+
+    def find_namespace(self, code_line: int):
+        """获取代码行所在的命名空间名称"""
+        namespace_info = find_node_info_by_line_in_scope(code_line, self.namespace_infos,
+                                                         DefineKeys.START.value, DefineKeys.END.value)
+        return namespace_info.get(DefineKeys.NAME.value, None)
+
+    def find_nearest_class(self, code_line: int):
+        """获取代码行之前最近定义的类名称"""
+        class_info = find_node_info_by_line_nearest(code_line, self.classes_infos, start_key=DefineKeys.START.value)
+        return class_info.get(DefineKeys.NAME.value) if class_info else None
+
+    def find_object_class(self, object_name, code_line: int):
+        """获取对象在代码行之前创建时对应的类名称"""
+        object_class_info = self.object_classes.get(object_name)
+        if not object_class_info or object_class_info.get(MethodKeys.START.value) > code_line:
+            return None
+        return object_class_info.get(MethodKeys.CLASS.value)
+
+    def find_class_object(self, class_name, start_line: int, end_line: int):
+        """获取在指定行创建的类对象名称"""
+        return self.class_objects.get((class_name, start_line, end_line))
+
+
+def as_analysis_context(dependent_infos) -> AnalysisContext:
+    """确保传入分析器的是分析上下文 传入依赖信息字典时创建新的上下文"""
+    if isinstance(dependent_infos, AnalysisContext):
+        return dependent_infos
+    return AnalysisContext(dependent_infos or {})
@@ -22,6 +22,35 @@ class FileInfoKeys(Enum):
     CLASS_INFOS = "CLASS_INFOS"
     VARIABLE_INFOS = "VARIABLE_INFOS"
 
+class CacheKeys(Enum):
+    """解析缓存相关的键"""
+    VERSION = "VERSION"     # 解析器|语法|分析器版本 不一致时缓存整体失效
+    FILES = "FILES"         # 相对路径 -> 单文件缓存信息
+    MTIME = "MTIME"         # 文件修改时间 纳秒
+    SIZE = "SIZE"           # 文件大小
+    HASH = "HASH"           # 文件内容哈希 blake2b
+    PARSED = "PARSED"       # 单文件解析结果
+    FORMAT = "FORMAT"       # 二进制缓存格式|python|marshal 版本 不一致时缓存整体失效
+    SECTIONS = "SECTIONS"   # 二进制缓存中 FileInfoKeys 各部分 -> 记录偏移
+    SOURCE = "SOURCE"       # 二进制缓存读取器 仅存在于内存中 用于按需加载解析结果
+    STAGES = "STAGES"       # 解析结果已经执行的分析阶段 缺少时为全部阶段
+    TOKENS = "TOKENS"       # 源码中的小写标识符列表 二进制缓存索引中为记录偏移 按需加载
+
+class AnalysisStage(Enum):
+    """单文件分析流水线的阶段 名称同时用于分析器耗时统计"""
+    DEPENDENT = "dependent_infos"   # 基础依赖信息 所有分析阶段共享
+    GLOBAL_CODE = "global_code"     # 不在函数和类定义内的全局代码块
+    METHODS = "method_infos"        # 全局函数定义
+    CLASSES = "class_infos"         # 类定义和类方法定义
+    CALLS = "called_methods"        # 函数|类方法|全局代码中的调用点
+    VARIABLES = "variable_infos"    # 变量和常量信息
+
+class AnalysisProfile(Enum):
+    """分析配置 决定单文件分析需要执行的流水线阶段"""
+    SYMBOLS = "symbols"     # 只提取函数|类定义
+    CALLS = "calls"         # 定义和调用点 用于调用关系分析
+    FULL = "full"           # 全部阶段 包含变量和常量信息
+
 class ClassKeys(Enum):
     """类信息相关的键"""
     UNIQ_ID = "UNIQ_ID"                 # 综合属性计算出来的一个ID
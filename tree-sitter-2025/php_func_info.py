@@ -1,12 +1,20 @@
+from php_dependent_utils import AnalysisContext, as_analysis_context
 from php_func_utils import query_global_methods_info, parse_global_code_called_methods
 
 
-def analyze_direct_method_infos(parser, language, root_node, dependent_infos:dict):
-    """获取所有函数信息，包括函数内部和非函数部分 """
+def analyze_direct_method_infos(parser, language, root_node, analysis_context: AnalysisContext, global_code_info=None,
+                                called_bodies: list = None):
+    """
+    获取所有函数信息，包括函数内部和非函数部分 global_code_info 可由调用方预先提取后共享
+    called_bodies 不为 None 时只提取函数定义 调用信息和非函数部分由调用方通过 called_bodies 补充
+    """
+    analysis_context = as_analysis_context(analysis_context)
     # 获取文件中的所有函数信息
-    methods_info = query_global_methods_info(language, root_node, dependent_infos)
+    methods_info = query_global_methods_info(language, root_node, analysis_context, called_bodies)
+    if called_bodies is not None:
+        return methods_info
     # 处理文件级别的函数调用
-    global_code_info = parse_global_code_called_methods(parser, language, root_node, dependent_infos)
+    global_code_info = parse_global_code_called_methods(parser, language, root_node, analysis_context, global_code_info)
     if global_code_info:
         methods_info.append(global_code_info)
     return methods_info
@@ -1,22 +1,22 @@
-from typing import Dict, List
+from bisect import bisect_left
+from typing import Dict
 
 from tree_sitter._binding import Node
-from php_dependent_utils import spread_dependent_infos, get_ranges_names, get_infos_names_ranges
+from php_dependent_utils import AnalysisContext, as_analysis_context
 from php_const import PHP_MAGIC_METHODS, PHP_BUILTIN_FUNCTIONS
 from php_enums import MethodKeys, GlobalCode, ParameterKeys, ReturnKeys, PHPModifier, MethodType, \
-    OtherName, DefineKeys
+    OtherName
 from tree_sitter_uitls import find_first_child_by_field, get_node_filed_text, get_node_text, get_node_type, \
-    find_node_info_by_line_nearest, load_str_to_parse, find_children_by_field, find_node_info_by_line_in_scope, \
-    get_node_first_valid_child_node_text
+    find_children_by_field, get_node_first_valid_child_node_text
+from php_queries import GLOBAL_FUNCTION_QUERY, METHOD_CALLED_QUERY, CLASS_INFO_QUERY
+from php_tree_visitor import get_php_query
 
 
-def query_global_methods_info(language, root_node, dependent_infos:dict):
-    """查询节点中的所有全局函数定义信息 需要优化"""
+def query_global_methods_info(language, root_node, analysis_context: AnalysisContext, called_bodies: list = None):
+    """查询节点中的所有全局函数定义信息 called_bodies 不为 None 时不解析调用信息 记录 (函数信息, 函数体节点) 由调用方后续补充"""
+    analysis_context = as_analysis_context(analysis_context)
     # 查询所有函数定义
-    function_query = language.query("""
-        ; 全局函数定义
-        (function_definition) @function.def
-    """)
+    function_query = get_php_query(language, GLOBAL_FUNCTION_QUERY)
 
     functions_info = []
     # 解析所有函数信息
@@ -46,12 +46,10 @@ def query_global_methods_info(language, root_node, dependent_infos:dict):
             # print(f"f_params_info:{f_params_info}")
 
             # 查询方法对应的命名空间信息
-            gb_methods_infos,gb_classes_infos,gb_namespace_infos,gb_object_class_infos, gb_import_depends_infos = spread_dependent_infos(dependent_infos)
-            namespace_info = find_node_info_by_line_in_scope(start_line, gb_namespace_infos, DefineKeys.START.value, DefineKeys.END.value)
-            namespace = namespace_info.get(DefineKeys.NAME.value, None)
+            namespace = analysis_context.find_namespace(start_line)
 
             # 解析函数体中的调用的其他方法
-            called_methods = query_method_called_methods(language, body_node, dependent_infos)
+            called_methods = query_method_called_methods(language, body_node, analysis_context) if called_bodies is None else []
             # print(f"f_called_methods:{f_called_methods}")
 
             method_type = guess_method_type(method_name,True,False)
@@ -65,34 +63,18 @@ def query_global_methods_info(language, root_node, dependent_infos:dict):
                                                return_infos=return_infos, is_native=None,
                                                called_methods=called_methods)
             functions_info.append(method_info)
+            if called_bodies is not None:
+                called_bodies.append((method_info, body_node))
     return functions_info
 
 
-def query_method_called_methods(language, body_node, dependent_infos:dict):
-    """查询方法体代码内调用的其他方法信息"""
-    # 预解析依赖信息
-    gb_methods_infos, gb_classes_infos, gb_namespace_infos, gb_object_class_infos, gb_import_depends_infos = spread_dependent_infos(dependent_infos)
-    gb_methods_names, _, gb_classes_names, _ = get_ranges_names(dependent_infos)
+def query_method_called_methods(language, body_node, analysis_context: AnalysisContext):
+    """查询方法体代码内调用的其他方法信息 body_node 可以是节点列表(如全局代码块)"""
+    analysis_context = as_analysis_context(analysis_context)
 
-    method_called_sql = """
-        ;查询常规函数调用
-        (function_call_expression
-                function: (name)
-                arguments: (arguments)
-        ) @function_call
-
-        ;查询对象方法创建
-        (object_creation_expression) @object_creation
-
-        ;查询对象方法调用
-        (member_call_expression) @member_call
-
-        ;查询静态方法调用
-        (scoped_call_expression) @scoped_call
-    """
-
-    called_method_query = language.query(method_called_sql)
-    matched_info = called_method_query.matches(body_node)
+    called_method_query = get_php_query(language, METHOD_CALLED_QUERY)
+    body_nodes = body_node if isinstance(body_node, list) else [body_node]
+    matched_info = [match for node in body_nodes for match in called_method_query.matches(node)]
 
     called_methods = []
 
@@ -102,7 +84,7 @@ def query_method_called_methods(language, body_node, dependent_infos:dict):
         if 'function_call' in match_dict:
             # print("开始全局函数方法调用")
             function_call_node = match_dict['function_call'][0]
-            called_info = parse_function_call_node(function_call_node, gb_methods_names)
+            called_info = parse_function_call_node(function_call_node, analysis_context)
             if called_info:
                 called_methods.append(called_info)
 
@@ -112,7 +94,7 @@ def query_method_called_methods(language, body_node, dependent_infos:dict):
         if 'object_creation' in match_dict:
             # print("开始对象创建方法调用")
             object_creation_node = match_dict['object_creation'][0]
-            called_info = parse_object_creation_node(object_creation_node, gb_classes_names, gb_object_class_infos)
+            called_info = parse_object_creation_node(object_creation_node, analysis_context)
             if called_info:
                 called_methods.append(called_info)
 
@@ -122,7 +104,7 @@ def query_method_called_methods(language, body_node, dependent_infos:dict):
         if 'member_call' in match_dict:
             # print("开始解析成员方法调用")
             object_method_node = match_dict['member_call'][0]
-            called_info = parse_object_member_call_node(object_method_node, gb_classes_infos, gb_object_class_infos)
+            called_info = parse_object_member_call_node(object_method_node, analysis_context)
             if called_info:
                 called_methods.append(called_info)
 
@@ -132,7 +114,7 @@ def query_method_called_methods(language, body_node, dependent_infos:dict):
         if 'scoped_call' in match_dict:
             # print("开始解析静态方法调用")
             static_method_node = match_dict['scoped_call'][0]
-            called_info = parse_static_method_call_node(static_method_node, gb_classes_infos, gb_object_class_infos)
+            called_info = parse_static_method_call_node(static_method_node, analysis_context)
             if called_info:
                 called_methods.append(called_info)
     return called_methods
@@ -153,74 +135,80 @@ def get_class_method_fullname(class_name, method_name, is_static):
     return fullname
 
 
-def line_in_methods_or_classes_ranges(line_num, function_ranges, class_ranges):
-    """检查行号是否在函数或类范围内"""
-    return any(start <= line_num <= end for start, end in function_ranges) or any(start <= line_num <= end for start, end in class_ranges)
-
-
-def has_global_code(root_node, gb_methods_ranges, gb_classes_ranges):
-    """检查是否有(非class和非函数)全局代码的内容"""
-    for line_num in range(root_node.start_point[0], root_node.end_point[0] + 1):
-        if not line_in_methods_or_classes_ranges(line_num, gb_methods_ranges, gb_classes_ranges):
-            return True
-    return False
-
-
-def get_global_code_info(root_node, gb_methods_ranges, gb_classes_ranges) -> Dict:
-    """获取所有不在全局函数和类定义内的PHP代码信息"""
-
-    # 获取源代码的每一行
-    source_lines = get_node_text(root_node).split('\n')
-    # 存储非函数且非类范围内的代码块
-    non_function_non_class_code = []
-    # 遍历每一行代码
-    for line_num, line_text in enumerate(source_lines):
-        # 如果当前行既不在全局函数范围内也不在类范围内，则添加到结果中
-        if not line_in_methods_or_classes_ranges(line_num, gb_methods_ranges, gb_classes_ranges):
-            code_info = {
-                GlobalCode.LINE.value: line_num,
-                GlobalCode.CODE.value: line_text.strip()  # 去除多余空格
-            }
-            non_function_non_class_code.append(code_info)
-
-    if not non_function_non_class_code:
+# 全局代码需要排除的定义节点类型 与 DEFINE_METHOD|DEFINE_CLASS 的范围一致
+GLOBAL_CODE_EXCLUDE_TYPES = ('function_definition', 'class_declaration', 'interface_declaration')
+
+
+def merge_line_ranges(line_ranges):
+    """合并重叠或相邻的行号范围 返回按起始行排序的范围列表"""
+    merged = []
+    for start, end in sorted(line_ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def get_uncovered_lines(first_line, last_line, line_ranges):
+    """获取 [first_line, last_line] 中不在任何范围内的 起始行|结束行|总行数"""
+    uncovered_start, uncovered_end, uncovered_total = None, None, 0
+    current_line = first_line
+    for start, end in merge_line_ranges(line_ranges) + [[last_line + 1, last_line + 1]]:
+        start, end = max(start, first_line), min(end, last_line)
+        if start > current_line:
+            gap_end = min(start - 1, last_line)
+            if uncovered_start is None:
+                uncovered_start = current_line
+            uncovered_end = gap_end
+            uncovered_total += gap_end - current_line + 1
+        current_line = max(current_line, end + 1)
+        if current_line > last_line:
+            break
+    return uncovered_start, uncovered_end, uncovered_total
+
+
+def get_global_code_info(language, root_node) -> Dict:
+    """
+    获取所有不在全局函数和类定义内的代码信息
+    直接基于已有语法树提取顶层语句节点 不再拼接代码字符串进行二次解析
+    BLOCKS 为按文档顺序排列的 不包含函数和类定义的最大子树节点
+    """
+    define_nodes = [match_dict['function.def'][0]
+                    for _, match_dict in get_php_query(language, GLOBAL_FUNCTION_QUERY).matches(root_node)]
+    define_nodes += [match_dict['class.def'][0]
+                     for _, match_dict in get_php_query(language, CLASS_INFO_QUERY).matches(root_node)]
+
+    # 行号信息 与原有的逐行判断结果保持一致
+    define_ranges = [(node.start_point[0], node.end_point[0]) for node in define_nodes]
+    gb_code_start_line, gb_code_end_line, gb_code_total = get_uncovered_lines(
+        root_node.start_point[0], root_node.end_point[0], define_ranges)
+    if not gb_code_total:
         return None
 
-    # 返回结果字典
-    gb_code_start_line = non_function_non_class_code[0][GlobalCode.LINE.value] if non_function_non_class_code else None
-    gb_code_end_line = non_function_non_class_code[-1][GlobalCode.LINE.value] if non_function_non_class_code else None
+    # 从顶层节点开始 跳过定义节点 仅对包含定义的节点继续向下拆分
+    define_starts = sorted(node.start_byte for node in define_nodes)
+    code_blocks = []
+    stack = list(reversed(root_node.children))
+    while stack:
+        node = stack.pop()
+        if node.type in GLOBAL_CODE_EXCLUDE_TYPES:
+            continue
+        index = bisect_left(define_starts, node.start_byte)
+        if index < len(define_starts) and define_starts[index] < node.end_byte:
+            stack.extend(reversed(node.children))
+        else:
+            code_blocks.append(node)
+
     global_code_info = {
         GlobalCode.START.value: gb_code_start_line,
         GlobalCode.END.value: gb_code_end_line,
-        GlobalCode.TOTAL.value: len(non_function_non_class_code),
-        GlobalCode.BLOCKS.value: non_function_non_class_code,
+        GlobalCode.TOTAL.value: gb_code_total,
+        GlobalCode.BLOCKS.value: code_blocks,
     }
     return global_code_info
 
 
-def get_global_code_string(global_code_info):
-    if not global_code_info:
-        return None
-
-    # 提取 START 和 END 行号
-    nf_start_line = global_code_info[GlobalCode.START.value]
-    nf_end_line = global_code_info[GlobalCode.END.value]
-
-    # 提取 BLOCKS 并按 LINE 排序
-    code_blocks = global_code_info[GlobalCode.BLOCKS.value]
-    sorted_blocks = sorted(code_blocks, key=lambda x: x[GlobalCode.LINE.value])
-
-    # 构建完整的行号空代码
-    codes = ["" for _ in range(nf_start_line, nf_end_line + 1)]
-    # 填充代码数据
-    for block in sorted_blocks:
-        line_num = block[GlobalCode.LINE.value]
-        codes[line_num] = block[GlobalCode.CODE.value]
-
-    # 将所有代码拼接成字符串
-    return "\n".join(codes)
-
-
 def create_method_result(method_name, start_line, end_line, namespace, object_name, class_name, fullname, visibility,
                          modifiers, method_type, params_info, return_infos, is_native, called_methods, uniq_id=None,
                          method_file=None):
@@ -332,7 +320,7 @@ def parse_params_node(params_node: Node):
     return parameters
 
 
-def parse_function_call_node(function_call_node:Node, gb_methods_names: List):
+def parse_function_call_node(function_call_node:Node, analysis_context: AnalysisContext):
     """解析函数调用节点"""
     # print(f"function_call_node:{function_call_node}")
     # (function_call_expression function: (name) arguments: (arguments (argument (string (string_content)))))
@@ -341,7 +329,7 @@ def parse_function_call_node(function_call_node:Node, gb_methods_names: List):
     end_line = function_call_node.end_point[0]
 
     # 定义是否是本文件函数
-    is_native = method_name in gb_methods_names
+    is_native = method_name in analysis_context.methods_names
     # 定义获取函数类型
     method_type = guess_method_type(method_name, is_native, False)
     # print(f"method_type:{method_name} is{method_type}  native:{is_native}")
@@ -358,7 +346,7 @@ def parse_function_call_node(function_call_node:Node, gb_methods_names: List):
                                 return_infos=None, is_native=is_native, called_methods=None)
 
 
-def parse_object_creation_node(object_creation_node: Node, classes_names: List, gb_object_class_infos: List[Dict]):
+def parse_object_creation_node(object_creation_node: Node, analysis_context: AnalysisContext):
     """解析对象创建节点"""
     # b'new UserDemo()' # (object_creation_expression (name) (arguments)
     # object_creation_node:(object_creation_expression (name) (arguments (argument (encapsed_string (string_content)))))
@@ -372,7 +360,7 @@ def parse_object_creation_node(object_creation_node: Node, classes_names: List,
     # print(f"class_name:{class_name} ｛method_name｝ {start_line} {end_line}")
 
     # 定义是否是本文件定义的class
-    is_native = class_name in classes_names # 构造方法 可以直接判断
+    is_native = class_name in analysis_context.classes_names # 构造方法 可以直接判断
     # print(f"is_native_class:{is_native}")
 
     # 定义获取函数类型
@@ -390,7 +378,7 @@ def parse_object_creation_node(object_creation_node: Node, classes_names: List,
     # print(f"arguments_info:{arguments_info}")
 
     # 查找对应的对象信息 虽然没啥用
-    object_name = find_object_from_object_class_infos(class_name, gb_object_class_infos, start_line, end_line)
+    object_name = analysis_context.find_class_object(class_name, start_line, end_line)
 
     return create_method_result(method_name=method_name, start_line=start_line, end_line=end_line,
                                 namespace=None, object_name=object_name, class_name=class_name, fullname=fullname,
@@ -398,20 +386,7 @@ def parse_object_creation_node(object_creation_node: Node, classes_names: List,
                                 return_infos=None, is_native=is_native, called_methods=None)
 
 
-def find_object_from_object_class_infos(class_name, gb_object_class_infos, start_line, end_line):
-    """从对象创建信息中查找类对应的对象信息"""
-    object_name = None
-    for object_class_info in gb_object_class_infos:
-        # {'OBJECT': '$user2', 'CLASS': 'UserDemo', 'START': 16, 'END': 16}
-        if object_class_info.get(MethodKeys.CLASS.value) == class_name:
-            if (start_line == object_class_info.get(MethodKeys.START.value)
-                    and end_line == object_class_info.get(MethodKeys.END.value)):
-                object_name = object_class_info.get(MethodKeys.OBJECT.value)
-                break
-    return object_name
-
-
-def parse_object_member_call_node(object_method_node: Node, gb_classes_infos, gb_object_class_infos: Dict):
+def parse_object_member_call_node(object_method_node: Node, analysis_context: AnalysisContext):
     # print(f"object_method_node:{object_method_node}")
     # object_method_node:(member_call_expression object: (variable_name (name)) name: (name) arguments: (arguments (argument (encapsed_string (string_content)))))
 
@@ -428,7 +403,7 @@ def parse_object_member_call_node(object_method_node: Node, gb_classes_infos, gb
         object_name = get_node_first_valid_child_node_text(object_method_node)
 
     # 定义是否是本文件函数
-    is_native, class_name = guess_called_object_is_native(object_name, start_line, gb_classes_infos, gb_object_class_infos)
+    is_native, class_name = guess_called_object_is_native(object_name, start_line, analysis_context)
     if not class_name:
         # TODO 需要处理多箭头的对象方法调用问题
         # 比较复杂的情况 获取不到类名时正常的
@@ -457,7 +432,7 @@ def parse_object_member_call_node(object_method_node: Node, gb_classes_infos, gb
                                 params_info=arguments_info, return_infos=None, is_native=is_native, called_methods=None)
 
 
-def parse_static_method_call_node(object_method_node: Node, gb_classes_infos, gb_object_class_infos: Dict):
+def parse_static_method_call_node(object_method_node: Node, analysis_context: AnalysisContext):
     # print(f"parse_static_method_call_node:{object_method_node}")
     # parse_static_method_call_node:(scoped_call_expression scope: (name) name: (name) arguments: (arguments (argument (encapsed_string (string_content)))))
 
@@ -475,11 +450,10 @@ def parse_static_method_call_node(object_method_node: Node, gb_classes_infos, gb
     # 判断静态方法是否是 对象调用 较少见
     if str(class_name).startswith("$"):
         object_name = class_name
-        is_native, class_name = guess_called_object_is_native(object_name, start_line, gb_classes_infos, gb_object_class_infos)
+        is_native, class_name = guess_called_object_is_native(object_name, start_line, analysis_context)
     else:
         object_name = class_name
-        gb_classes_names, gb_classes_ranges = get_infos_names_ranges(gb_classes_infos)
-        is_native = class_name in gb_classes_names
+        is_native = class_name in analysis_context.classes_names
 
     # 定义获取函数类型
     method_type = guess_method_type(method_name, is_native, True)
@@ -503,32 +477,20 @@ def parse_static_method_call_node(object_method_node: Node, gb_classes_infos, gb
                                 params_info=arguments_info, return_infos=None, is_native=is_native, called_methods=None)
 
 
-def parse_global_code_called_methods(parser, language, root_node, dependent_infos:dict):
+def parse_global_code_called_methods(parser, language, root_node, analysis_context: AnalysisContext, global_code_info=None):
     """查询全部代码调用的函数信息 并且只保留其中不属于函数和类的部分"""
-    gb_methods_names, gb_methods_ranges, gb_classes_names, gb_classes_ranges = get_ranges_names(dependent_infos)
-
-    if not has_global_code(root_node, gb_methods_ranges, gb_classes_ranges):
+    if global_code_info is None:
+        global_code_info = get_global_code_info(language, root_node)
+    if not global_code_info:
         # print("文件中不存在全局性代码...")
         return None
 
-    # print("开始进行全局性代码额外处理...")
-    # 方案1 获取所有代码信息 然后排除其中的 函数定义范围和类定义范围信息 再进行 代码解析
-    global_code_info = get_global_code_info(root_node, gb_methods_ranges, gb_classes_ranges)
-    # print(f"global_code_info:{global_code_info}")
-
     nf_name_txt = OtherName.NOT_IN_METHOD.value
     nf_start_line = global_code_info[GlobalCode.START.value]
     nf_end_line = global_code_info[GlobalCode.END.value]
 
-    # 解析全局代码数据
-    nf_global_code = get_global_code_string(global_code_info)
-    if not nf_global_code:
-        return None
-
-    nf_code_tree = load_str_to_parse(parser, nf_global_code)
-    nf_code_node = nf_code_tree.root_node
-    # 查询调用的方法信息
-    nf_code_called_methods = query_method_called_methods(language, nf_code_node, dependent_infos)
+    # 直接在原语法树的全局代码块上查询调用的方法信息
+    nf_code_called_methods = query_method_called_methods(language, global_code_info[GlobalCode.BLOCKS.value], analysis_context)
 
     # 如果没有找到信息就直接返回None
     if not nf_code_called_methods:
@@ -539,37 +501,23 @@ def parse_global_code_called_methods(parser, language, root_node, dependent_info
                                 visibility=None, modifiers=None, method_type=None, params_info=None, return_infos=None,
                                 is_native=None, called_methods=nf_code_called_methods)
 
-def guess_called_object_is_native(object_name, object_line, gb_classes_infos, gb_object_class_infos: List[Dict]):
+def guess_called_object_is_native(object_name, object_line, analysis_context: AnalysisContext):
     """从本文件中初始化类信息字典分析对象属于哪个类"""
-    gb_classes_names, gb_classes_ranges = get_infos_names_ranges(gb_classes_infos)
-    if object_name in gb_classes_names:
+    if object_name in analysis_context.classes_names:
         # 对象名在本地类方法中, 说明对象属于全局方法调用
         return True, object_name
 
     if "$this" in object_name:
         # 表名就是本class的方法 TODO 目前不能查询时哪个类 可以通过 gb_classes_names 的范围进行查询
-        nearest_class_info = find_node_info_by_line_nearest(object_line, gb_classes_infos, start_key=DefineKeys.START.value)
-        nearest_class_name = nearest_class_info.get(DefineKeys.NAME.value) if  nearest_class_info else None
-        return True, nearest_class_name
+        return True, analysis_context.find_nearest_class(object_line)
 
-    # 通过对象名称 初次筛选获取命中的类信息
-    # [{'METHOD_OBJECT': '$myClass', 'METHOD_CLASS': 'MyClass', 'METHOD_START_LINE': 5},,,]
-    filtered_object_infos = []
-    if object_name:
-        for object_class_info in gb_object_class_infos:
-            if object_name == object_class_info.get(MethodKeys.OBJECT.value, None):
-                # print(f"找到对象{object_name}对应的原始类信息:{object_class_info}")
-                filtered_object_infos.append(object_class_info)
-                break
-
-    if not filtered_object_infos:
+    # 通过对象名称获取命中的类创建信息
+    # {'OBJECT': '$myClass', 'CLASS': 'MyClass', 'START': 5, 'END': 5}
+    if not object_name or object_name not in analysis_context.object_classes:
         return False, None
 
-    # 进一步筛选最近的类创建信息
-    nearest_class_info = find_node_info_by_line_nearest(object_line, filtered_object_infos, start_key=MethodKeys.START.value)
-    nearest_class_name = nearest_class_info.get(MethodKeys.CLASS.value)
-
-    if nearest_class_name in gb_classes_names:
+    nearest_class_name = analysis_context.find_object_class(object_name, object_line)
+    if nearest_class_name in analysis_context.classes_names:
         return True, nearest_class_name
     else:
         return False, nearest_class_name
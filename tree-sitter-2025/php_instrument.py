@@ -0,0 +1,231 @@
+import heapq
+import itertools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from libs_com.utils_process import print_progress
+
+
+class NullSink:
+    """不输出任何内容"""
+
+    def on_progress(self, completed, total, start_time):
+        pass
+
+    def on_finish(self, report: dict):
+        pass
+
+
+class ProgressSink(NullSink):
+    """节流刷新的进度条 结束时输出阶段耗时和最慢文件"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.last_time = 0.0
+
+    def on_progress(self, completed, total, start_time):
+        # 逐文件刷新终端本身就有明显开销 两次刷新之间至少间隔 interval 秒 最后一个文件总是输出
+        now = time.time()
+        if completed < total and now - self.last_time < self.interval:
+            return
+        self.last_time = now
+        print_progress(completed, total, start_time)
+
+    def on_finish(self, report: dict):
+        print("\n阶段耗时(秒):")
+        for stage, stage_info in report["stages"].items():
+            print(f"  {stage:<20} 墙钟:{stage_info['wall']:>8.2f} CPU:{stage_info['cpu']:>8.2f}")
+        for cache_name, cache_info in report["caches"].items():
+            print(f"  缓存 {cache_name}: 命中:{cache_info['hits']} 未命中:{cache_info['misses']} "
+                  f"命中率:{cache_info['hit_rate']:.1%}")
+        if report["slowest_files"]:
+            print(f"\n解析最慢的 {len(report['slowest_files'])} 个文件:")
+            for file_info in report["slowest_files"]:
+                print(f"  {file_info['wall'] * 1000:>9.1f} 毫秒 {file_info['bytes']:>9} 字节 "
+                      f"{file_info['nodes'] or '-':>8} 节点 {file_info['path']}")
+
+
+class JsonReportSink(NullSink):
+    """结束时将运行报告写入 JSON 文件"""
+
+    def __init__(self, report_path: str):
+        self.report_path = report_path
+
+    def on_finish(self, report: dict):
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n运行报告已写入:->{self.report_path}")
+
+
+class FileTimer:
+    """记录单个文件各分析器的墙钟和线程CPU耗时 每次 lap 记录距离上一次的耗时"""
+
+    def __init__(self):
+        self.start_wall = self.last_wall = time.perf_counter()
+        self.start_cpu = self.last_cpu = time.thread_time()
+        self.analyzers = {}
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def lap(self, analyzer):
+        now_wall, now_cpu = time.perf_counter(), time.thread_time()
+        self.analyzers[analyzer] = (now_wall - self.last_wall, now_cpu - self.last_cpu)
+        self.last_wall, self.last_cpu = now_wall, now_cpu
+
+    def finish(self, file_stats: dict, file_bytes, nodes):
+        """填充文件统计信息 多线程解析时内存峰值为进程级别 仅单线程时准确"""
+        file_stats["wall"] = time.perf_counter() - self.start_wall
+        file_stats["cpu"] = time.thread_time() - self.start_cpu
+        file_stats["bytes"] = file_bytes
+        file_stats["nodes"] = nodes
+        file_stats["analyzers"] = self.analyzers
+        file_stats["malloc_peak"] = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+
+
+class NullFileTimer:
+    """未开启文件统计时使用 不产生任何记录"""
+
+    def lap(self, analyzer):
+        pass
+
+    def finish(self, file_stats, file_bytes, nodes):
+        pass
+
+
+NULL_FILE_TIMER = NullFileTimer()
+
+
+def create_file_timer(file_stats):
+    return FileTimer() if file_stats is not None else NULL_FILE_TIMER
+
+
+class Instrumentation:
+    """
+    记录阶段|分析器|文件级别的耗时和缓存命中率 结束时生成运行报告并交给各输出端
+    sinks 为空时等同于 NullSink 仍然记录数据 可通过 build_report 获取
+    """
+
+    def __init__(self, sinks=None, top_files=20, trace_malloc=False):
+        self.sinks = sinks or [NullSink()]
+        self.top_files = top_files
+        self.trace_malloc = trace_malloc
+        # 名称 -> [墙钟, CPU, 次数]
+        self.stages = {}
+        self.analyzers = {}
+        # 文件统计合并后即丢弃 只保留累计值 [文件数, 字节数, 节点数, 墙钟, CPU] 和耗时最长的 top_files 个文件
+        self.files_total = [0, 0, 0, 0.0, 0.0]
+        # 小顶堆 (墙钟, 序号, 相对路径, 文件统计) 序号避免墙钟相同时比较后续字段
+        self.slowest_heap = []
+        self.file_sequence = itertools.count()
+        # 名称 -> [命中, 未命中]
+        self.caches = {}
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+
+    def start(self):
+        """开启内存追踪 会明显降低解析速度 仅用于排查"""
+        if self.trace_malloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        """记录阶段耗时 CPU 时间为整个进程的CPU时间 包含所有线程 不包含子进程"""
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start_wall, time.process_time() - start_cpu)
+
+    def add_stage(self, name, wall, cpu):
+        with self.lock:
+            stage_info = self.stages.setdefault(name, [0.0, 0.0, 0])
+            stage_info[0] += wall
+            stage_info[1] += cpu
+            stage_info[2] += 1
+
+    def add_file_stats(self, relative_path, file_stats: dict):
+        """合并单个文件的统计信息 累计到文件和分析器耗时 只有最慢的 top_files 个文件保留完整统计"""
+        if not file_stats:
+            return
+        with self.lock:
+            files_total = self.files_total
+            files_total[0] += 1
+            files_total[1] += file_stats["bytes"] or 0
+            files_total[2] += file_stats["nodes"] or 0
+            files_total[3] += file_stats["wall"]
+            files_total[4] += file_stats["cpu"]
+            if self.top_files > 0:
+                heap_item = (file_stats["wall"], next(self.file_sequence), relative_path, file_stats)
+                if len(self.slowest_heap) < self.top_files:
+                    heapq.heappush(self.slowest_heap, heap_item)
+                elif heap_item[0] > self.slowest_heap[0][0]:
+                    heapq.heapreplace(self.slowest_heap, heap_item)
+            for analyzer, (wall, cpu) in file_stats.get("analyzers", {}).items():
+                analyzer_info = self.analyzers.setdefault(analyzer, [0.0, 0.0, 0])
+                analyzer_info[0] += wall
+                analyzer_info[1] += cpu
+                analyzer_info[2] += 1
+
+    def add_cache_stats(self, name, hits, misses):
+        with self.lock:
+            cache_info = self.caches.setdefault(name, [0, 0])
+            cache_info[0] += hits
+            cache_info[1] += misses
+
+    def progress(self, completed, total, start_time):
+        for sink in self.sinks:
+            sink.on_progress(completed, total, start_time)
+
+    def get_slowest_files(self, top=None):
+        """耗时最长的文件 按耗时降序 top 不能超过 top_files"""
+        top = self.top_files if top is None else min(top, self.top_files)
+        slowest = sorted(self.slowest_heap, key=lambda item: item[0], reverse=True)[:top]
+        return [{"path": relative_path, **file_stats} for _, _, relative_path, file_stats in slowest]
+
+    def build_report(self):
+        def format_timing(timing):
+            return {"wall": round(timing[0], 6), "cpu": round(timing[1], 6), "count": timing[2]}
+
+        parsed_num, total_bytes, total_nodes, total_wall, total_cpu = self.files_total
+        report = {
+            "start_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.start_time)),
+            "total_wall": round(time.time() - self.start_time, 6),
+            "stages": {name: format_timing(timing) for name, timing in self.stages.items()},
+            "analyzers": {name: format_timing(timing) for name, timing in self.analyzers.items()},
+            "caches": {name: {"hits": hits, "misses": misses,
+                              "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+                       for name, (hits, misses) in self.caches.items()},
+            "files": {
+                "parsed": parsed_num,
+                "bytes": total_bytes,
+                "nodes": total_nodes,
+                "wall": round(total_wall, 6),
+                "cpu": round(total_cpu, 6),
+            },
+            "slowest_files": self.get_slowest_files(),
+        }
+        if tracemalloc.is_tracing():
+            report["malloc_peak"] = tracemalloc.get_traced_memory()[1]
+        return report
+
+    def finish(self):
+        """生成运行报告并交给各输出端 返回报告"""
+        report = self.build_report()
+        if self.trace_malloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        for sink in self.sinks:
+            sink.on_finish(report)
+        return report
+
+
+def create_instrumentation(progress="bar", report_path=None, top_files=20, trace_malloc=False):
+    """按命令行参数创建 progress 可选 bar|none"""
+    sinks = []
+    if progress == "bar":
+        sinks.append(ProgressSink())
+    if report_path:
+        sinks.append(JsonReportSink(report_path))
+    return Instrumentation(sinks, top_files=top_files, trace_malloc=trace_malloc)
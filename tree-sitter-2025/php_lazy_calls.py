@@ -0,0 +1,247 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+from php_call_graph import iter_parsed_methods
+from php_enums import AnalysisProfile, AnalysisStage, MethodKeys, CacheKeys
+from php_map_basic import repair_parsed_infos_basic_info
+from php_map_called import build_method_relation_map, resolve_parsed_info_called_info, apply_resolved_called_info, \
+    GLOBAL_METHOD_ID_METHOD_INFO_MAP, CLASS_ID_CLASS_INFO_MAP
+from php_parser import PHPParser
+from php_pipeline import resolve_stages
+from php_query_server import METHOD_SUMMARY_KEYS
+from php_symbols import intern_strings
+from tree_sitter_uitls import custom_format_path
+
+
+def get_path_distance(relative_path: str, near_path: str):
+    """两个文件路径之间的目录距离 同目录为 0 每多一层不同的目录加 1"""
+    dirs = relative_path.split("/")[:-1]
+    near_dirs = near_path.split("/")[:-1]
+    common = 0
+    for left, right in zip(dirs, near_dirs):
+        if left != right:
+            break
+        common += 1
+    return len(dirs) + len(near_dirs) - 2 * common
+
+
+class LazyCallResolver:
+    """
+    两阶段分析 第一阶段只提取全项目的函数和类定义(symbols 配置)并建立关系映射
+    调用点在查询涉及到某个文件时才重新解析该文件提取 并基于已有的关系映射解析可能的源方法
+    单个文件的调用解析只依赖关系映射和本文件信息 结果与全量分析一致
+    """
+
+    def __init__(self, php_parser: PHPParser, imports_filter=True):
+        self.php_parser = php_parser
+        # 标识符在定义提取阶段从解析所用的字节中获取 并随缓存保存 缓存命中的文件不再读取源码
+        php_parser.collect_tokens = True
+        self.imports_filter = imports_filter
+        self.call_stages = resolve_stages(AnalysisProfile.CALLS.value)
+        self.parsed_infos = {}
+        self.method_relation_map = None
+        # 方法ID -> (MethodBrief, 类名)  格式化后的文件路径 -> 相对路径
+        self.method_briefs = {}
+        self.format_paths = {}
+        # 已经提取并解析调用点的文件
+        self.extracted_files = set()
+        # 小写标识符 -> 包含该标识符的文件  相对路径 -> 文件中的小写标识符列表 用于单个文件失效时移除旧记录
+        self.token_files = {}
+        self.file_tokens = {}
+        # 查询服务中会被多个线程同时调用
+        self.lock = threading.RLock()
+
+    def load(self, save_cache=True, workers=None, executor="thread", chunk_size=None):
+        """第一阶段 加载全项目定义信息并建立关系映射 解析器配置已包含调用点时 所有文件视为已提取"""
+        instrument = self.php_parser.instrument
+        parsed_infos = self.php_parser.load_parsed_infos(save_cache=save_cache, workers=workers, executor=executor,
+                                                         chunk_size=chunk_size)
+        with instrument.stage("basic_info"):
+            self.parsed_infos = repair_parsed_infos_basic_info(parsed_infos)
+        with instrument.stage("relation_map_build"):
+            self.method_relation_map = build_method_relation_map(self.parsed_infos)
+
+        for method_brief in self.method_relation_map[GLOBAL_METHOD_ID_METHOD_INFO_MAP].values():
+            self.method_briefs[method_brief.uniq_id] = (method_brief, None)
+        for class_brief in self.method_relation_map[CLASS_ID_CLASS_INFO_MAP].values():
+            for method_brief in class_brief.methods:
+                self.method_briefs[method_brief.uniq_id] = (method_brief, class_brief.name)
+        self.format_paths = {custom_format_path(relative_path): relative_path for relative_path in self.parsed_infos}
+        with instrument.stage("token_index"):
+            for relative_path, tokens in self.php_parser.source_tokens.items():
+                self.update_file_tokens(relative_path, tokens)
+            self.php_parser.source_tokens = {}
+
+        if AnalysisStage.CALLS.value in self.php_parser.stages:
+            with instrument.stage("called_resolve"):
+                for relative_path, parsed_info in self.parsed_infos.items():
+                    self.resolve_file_calls(parsed_info)
+            self.extracted_files = set(self.parsed_infos)
+        return self
+
+    def resolve_file_calls(self, parsed_info: dict):
+        resolved_infos = resolve_parsed_info_called_info(parsed_info, self.method_relation_map, self.imports_filter)
+        apply_resolved_called_info(parsed_info, resolved_infos)
+
+    def update_file_tokens(self, relative_path: str, tokens):
+        """替换文件在标识符索引中的记录 tokens 为空时只移除旧记录"""
+        tokens = [sys.intern(token) for token in tokens or ()]
+        for token in self.file_tokens.pop(relative_path, ()):
+            files = self.token_files[token]
+            files.discard(relative_path)
+            if not files:
+                del self.token_files[token]
+        for token in tokens:
+            self.token_files.setdefault(token, set()).add(relative_path)
+        if tokens:
+            self.file_tokens[relative_path] = tokens
+
+    def ensure_files(self, relative_paths):
+        """第二阶段 提取并解析指定文件的调用点 已提取的文件直接跳过 返回本次新提取的文件数"""
+        with self.lock:
+            pending = [path for path in dict.fromkeys(relative_paths)
+                       if path in self.parsed_infos and path not in self.extracted_files]
+            if not pending:
+                return 0
+            php_parser = self.php_parser
+            with php_parser.instrument.stage("lazy_calls"):
+                for relative_path in pending:
+                    abspath_path = os.path.join(php_parser.project_root, relative_path)
+                    source_state = {}
+                    try:
+                        _, parsed_info = PHPParser.parse_php_file(abspath_path, php_parser.PARSER, php_parser.LANGUAGE,
+                                                                  relative_path, stages=self.call_stages,
+                                                                  source_state=source_state, collect_tokens=True)
+                    except OSError as error:
+                        # 文件在加载后被删除 保留定义信息
+                        print(f"读取文件发生异常: {abspath_path} -> {error}")
+                        self.update_file_tokens(relative_path, None)
+                        self.extracted_files.add(relative_path)
+                        continue
+                    # 文件可能在加载后被修改 按本次解析的内容更新索引
+                    self.update_file_tokens(relative_path, source_state[CacheKeys.TOKENS.value])
+                    intern_strings(parsed_info)
+                    repair_parsed_infos_basic_info({relative_path: parsed_info})
+                    self.resolve_file_calls(parsed_info)
+                    self.parsed_infos[relative_path] = parsed_info
+                    self.extracted_files.add(relative_path)
+            return len(pending)
+
+    def get_method_file(self, method_id: str):
+        """方法所在文件的相对路径"""
+        method_brief, _ = self.method_briefs.get(method_id, (None, None))
+        return self.format_paths.get(method_brief.file) if method_brief else None
+
+    def find_methods(self, keyword: str):
+        """按方法ID|完整方法名|方法名查找方法ID"""
+        if keyword in self.method_briefs:
+            return [keyword]
+        return [method_id for method_id, (method_brief, _) in self.method_briefs.items()
+                if keyword in (method_brief.fullname, method_brief.name)]
+
+    def get_search_term(self, method_id: str):
+        """调用方源码中必然出现的名称 构造方法通过 new 类名 调用 其他方法通过方法名调用"""
+        method_brief, class_name = self.method_briefs[method_id]
+        if method_brief.name == "__construct" and class_name:
+            return class_name
+        return method_brief.name
+
+    def find_candidate_files(self, method_id: str, near_file=None, max_files=None):
+        """
+        可能调用该方法的文件 源码中不包含方法名称标识符的文件不可能解析出对该方法的调用 直接排除
+        PHP 函数名不区分大小写 按小写查找标识符索引 near_file 不为空时按目录距离由近到远排序
+        """
+        search_term = self.get_search_term(method_id).lower()
+        with self.lock:
+            candidates = sorted(self.token_files.get(search_term, ()))
+        if near_file:
+            near_file = near_file.replace("\\", "/")
+            candidates.sort(key=lambda path: get_path_distance(path, near_file))
+        return candidates[:max_files] if max_files else candidates
+
+    def get_method_summary(self, method_id: str):
+        """构造与查询服务一致的方法摘要 文件未提取时从定义信息中获取"""
+        relative_path = self.get_method_file(method_id)
+        for method_info in iter_parsed_methods({relative_path: self.parsed_infos.get(relative_path, {})}):
+            if method_info.get(MethodKeys.UNIQ_ID.value) == method_id:
+                return {key: method_info.get(key) for key in METHOD_SUMMARY_KEYS}
+        return {MethodKeys.UNIQ_ID.value: method_id}
+
+    def find_callees(self, method_id: str):
+        """查询方法调用了哪些方法 只提取方法所在的文件"""
+        relative_path = self.get_method_file(method_id)
+        if not relative_path:
+            return []
+        self.ensure_files([relative_path])
+        results = []
+        for method_info in iter_parsed_methods({relative_path: self.parsed_infos[relative_path]}):
+            if method_info.get(MethodKeys.UNIQ_ID.value) != method_id:
+                continue
+            for called_info in method_info.get(MethodKeys.CALLED_METHODS.value) or []:
+                for callee_id in called_info.get(MethodKeys.MAY_SOURCE.value) or {}:
+                    results.append({"CALLEE": self.get_method_summary(callee_id),
+                                    "LINE": called_info.get(MethodKeys.START.value)})
+        return results
+
+    def find_callers(self, method_id: str, near_file=None, max_files=None):
+        """查询方法被哪些方法调用 只提取源码中包含方法名称的文件 max_files 限制时只查询距离 near_file 最近的文件"""
+        if method_id not in self.method_briefs:
+            return []
+        candidates = self.find_candidate_files(method_id, near_file, max_files)
+        self.ensure_files(candidates)
+        results = []
+        for relative_path in candidates:
+            for method_info in iter_parsed_methods({relative_path: self.parsed_infos[relative_path]}):
+                for called_info in method_info.get(MethodKeys.CALLED_METHODS.value) or []:
+                    if method_id in (called_info.get(MethodKeys.MAY_SOURCE.value) or {}):
+                        results.append({"CALLER": {key: method_info.get(key) for key in METHOD_SUMMARY_KEYS},
+                                        "LINE": called_info.get(MethodKeys.START.value)})
+        return results
+
+    def get_stats(self):
+        return {"methods": len(self.method_briefs), "files": len(self.parsed_infos),
+                "extracted_files": len(self.extracted_files)}
+
+
+if __name__ == '__main__':
+    # python php_lazy_calls.py -p project_path back_action --callers --near app/admin/index.php
+    parser = argparse.ArgumentParser(description='先提取全项目定义 按需提取和解析调用点 查询方法的调用方|被调用方')
+    parser.add_argument('methods', nargs='+', help='方法ID|完整方法名|方法名')
+    parser.add_argument('-p', '--project-path', required=True, help='需要扫描的目标项目地址')
+    parser.add_argument('-n', '--project-name', default='default_project', help='项目名称 影响缓存文件名')
+    parser.add_argument('-r', '--callers', action='store_true', default=False, help='查询调用方 (默认: 查询被调用方)')
+    parser.add_argument('-N', '--near', default=None, help='调用方查询时优先查询距离该文件最近的文件')
+    parser.add_argument('-m', '--max-files', type=int, default=None, help='调用方查询时最多提取的文件数 (默认: 不限制)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='定义提取阶段的线程数 (默认: CPU 核心数)')
+    parser.add_argument('-f', '--imports-filter', action='store_false', default=True, help='分析时被调用方法启用导入信息过滤 (默认: True)!!!')
+    args = parser.parse_args()
+
+    from php_instrument import create_instrumentation
+    php_parser = PHPParser(project_name=args.project_name, project_path=args.project_path,
+                           instrument=create_instrumentation(progress="none"), profile=AnalysisProfile.SYMBOLS.value)
+    start_time = time.time()
+    resolver = LazyCallResolver(php_parser, imports_filter=args.imports_filter).load(workers=args.workers)
+    print(f"\n定义提取完成 {resolver.get_stats()} 用时:{time.time() - start_time:.2f} 秒")
+
+    for keyword in args.methods:
+        method_ids = resolver.find_methods(keyword)
+        if not method_ids:
+            print(f"未找到方法: {keyword}")
+        for method_id in method_ids:
+            start_time = time.time()
+            if args.callers:
+                results = resolver.find_callers(method_id, near_file=args.near, max_files=args.max_files)
+                result_key = "CALLER"
+            else:
+                results = resolver.find_callees(method_id)
+                result_key = "CALLEE"
+            method_brief, _ = resolver.method_briefs[method_id]
+            print(f"\n{method_brief.fullname} [{method_brief.file}] {method_id}")
+            for result in results:
+                summary = result[result_key]
+                print(f"  {summary.get(MethodKeys.FULLNAME.value)}  [{summary.get(MethodKeys.FILE.value)}:"
+                      f"{result['LINE']}] {summary.get(MethodKeys.UNIQ_ID.value)}")
+            print(f"结果:{len(results)} 已提取文件:{len(resolver.extracted_files)} 用时:{time.time() - start_time:.3f} 秒")
@@ -0,0 +1,143 @@
+from bisect import bisect_left, bisect_right
+
+
+class LineIndex:
+    """
+    基于行号区间的有序索引 每个文件构建一次
+    用于 O(log n) 回答 "行号N处的包含节点" "行号N之前最近的节点" "行号N之前结束的所有节点"
+    查询结果与线性扫描 find_node_info_by_line_* 的结果保持一致(含相同起始行时取列表中靠前的节点)
+    """
+
+    def __init__(self, infos: list[dict], start_key: str, end_key: str = None):
+        self.infos = infos
+        self.start_key = start_key
+        self.end_key = end_key
+
+        # 按起始行稳定排序 相同起始行保持原列表顺序
+        self.start_order = sorted(range(len(infos)), key=lambda i: infos[i][start_key])
+        self.starts = [infos[i][start_key] for i in self.start_order]
+
+        self.ends = None
+        self.prev_greater = None
+        self.end_order = None
+        self.end_values = None
+        self.ending_cache = {}
+        if end_key:
+            self.ends = [infos[i][end_key] for i in self.start_order]
+            self.prev_greater = self.build_prev_greater(self.ends)
+            self.end_order = sorted(range(len(infos)), key=lambda i: infos[i][end_key])
+            self.end_values = [infos[i][end_key] for i in self.end_order]
+
+    @staticmethod
+    def build_prev_greater(ends):
+        """计算每个区间之前第一个结束行更大的区间位置 用于跳过不可能包含目标行的区间"""
+        prev_greater = [-1] * len(ends)
+        stack = []
+        for index, end in enumerate(ends):
+            while stack and ends[stack[-1]] <= end:
+                stack.pop()
+            prev_greater[index] = stack[-1] if stack else -1
+            stack.append(index)
+        return prev_greater
+
+    def find_nearest(self, code_line: int):
+        """查找起始行小于等于目标行号的最近节点信息"""
+        index = bisect_right(self.starts, code_line)
+        if index == 0:
+            return {}
+        first = bisect_left(self.starts, self.starts[index - 1])
+        return self.infos[self.start_order[first]]
+
+    def find_all_in_scope(self, code_line: int):
+        """查找所有包含目标行号的节点信息 按原列表顺序返回"""
+        found = []
+        index = bisect_right(self.starts, code_line) - 1
+        while index >= 0:
+            if self.ends[index] >= code_line:
+                found.append(self.start_order[index])
+                index -= 1
+            else:
+                index = self.prev_greater[index]
+        return [self.infos[i] for i in sorted(found)]
+
+    def find_in_scope(self, code_line: int):
+        """查找包含目标行号的节点信息 存在多个时取起始行最大的节点"""
+        filtered_infos = self.find_all_in_scope(code_line)
+        if len(filtered_infos) == 1:
+            return filtered_infos[0]
+        if len(filtered_infos) > 1:
+            print(f"Warning: 发现行号[{code_line}]处于多个节点信息中:{filtered_infos}")
+            return max(filtered_infos, key=lambda ns: ns[self.start_key])
+        return {}
+
+    def filter_ending_before(self, code_line: int):
+        """获取结束行小于等于目标行号的所有节点信息 按原列表顺序返回"""
+        count = bisect_right(self.end_values, code_line)
+        positions = self.ending_cache.get(count)
+        if positions is None:
+            positions = sorted(self.end_order[:count])
+            self.ending_cache[count] = positions
+        return [self.infos[i] for i in positions]
+
+
+class IndexedInfos(list):
+    """
+    携带惰性索引的节点信息列表 行为与普通列表一致
+    索引在首次查询时构建 之后同一文件的所有调用点复用 列表内容在构建索引后不应再修改
+    """
+
+    def __init__(self, infos=()):
+        super().__init__(infos)
+        self.line_indexes = {}
+        self.value_indexes = {}
+        self.value_sets = {}
+
+    def __reduce__(self):
+        # 跨进程传递与缓存时只保留列表数据 索引在使用方按需重建
+        return list, (list(self),)
+
+    def line_index(self, start_key: str, end_key: str = None, require_key: str = None) -> LineIndex:
+        """获取按行号建立的区间索引 require_key 用于只索引该键有值的节点信息"""
+        cache_key = (start_key, end_key, require_key)
+        line_index = self.line_indexes.get(cache_key)
+        if line_index is None:
+            infos = [x for x in self if x.get(require_key)] if require_key else list(self)
+            line_index = LineIndex(infos, start_key, end_key)
+            self.line_indexes[cache_key] = line_index
+        return line_index
+
+    def find_first(self, keys: tuple, values: tuple):
+        """查找多个键值与给定值完全一致的第一个节点信息"""
+        value_index = self.value_indexes.get(keys)
+        if value_index is None:
+            value_index = {}
+            for info in self:
+                value_index.setdefault(tuple(info.get(key) for key in keys), info)
+            self.value_indexes[keys] = value_index
+        return value_index.get(values)
+
+    def value_set(self, key) -> set:
+        """获取指定键的全部取值集合 key为元组时返回多个键取值组成的元组集合"""
+        values = self.value_sets.get(key)
+        if values is None:
+            if isinstance(key, tuple):
+                values = {tuple(info.get(k) for k in key) for info in self}
+            else:
+                values = {info.get(key) for info in self}
+            self.value_sets[key] = values
+        return values
+
+
+def index_dependent_infos(dependent_infos: dict) -> dict:
+    """将依赖信息中的各类节点列表包装为带索引的列表"""
+    for info_type, infos in dependent_infos.items():
+        if isinstance(infos, list) and not isinstance(infos, IndexedInfos):
+            dependent_infos[info_type] = IndexedInfos(infos)
+    return dependent_infos
+
+
+def as_indexed_infos(infos):
+    """确保节点信息列表带有索引 已带索引时直接返回"""
+    if isinstance(infos, IndexedInfos):
+        return infos
+    return IndexedInfos(infos or [])
@@ -1,17 +1,32 @@
 from php_enums import FileInfoKeys
 from php_basic_import_infos import analyze_import_infos
+from php_instrument import Instrumentation
 from php_map_basic import repair_parsed_infos_basic_info
-from php_map_called import repair_parsed_infos_called_info, build_method_relation_map
+from php_map_called import repair_parsed_infos_called_info, build_method_relation_map, CALLED_RESOLVE_MEMO
 
 
-def analyze_methods_relation(parsed_infos:dict, imports_filter:bool):
-    """整理出所有文件的函数关系"""
+def build_methods_relation(parsed_infos:dict, imports_filter:bool, workers=1, instrument=None):
+    """整理出所有文件的函数关系 同时返回关系映射 供增量更新时复用 instrument 不为空时记录各阶段耗时"""
+    instrument = instrument or Instrumentation()
     # 为原始信息进行进行基本的信息补充
-    parsed_infos = repair_parsed_infos_basic_info(parsed_infos)
+    with instrument.stage("basic_info"):
+        parsed_infos = repair_parsed_infos_basic_info(parsed_infos)
 
     # 进一步补充被调用函数的信息
-    method_relation_map = build_method_relation_map(parsed_infos)
-    parsed_infos = repair_parsed_infos_called_info(parsed_infos, method_relation_map, imports_filter)
+    with instrument.stage("relation_map_build"):
+        method_relation_map = build_method_relation_map(parsed_infos)
+    with instrument.stage("called_resolve"):
+        parsed_infos = repair_parsed_infos_called_info(parsed_infos, method_relation_map, imports_filter, workers)
+
+    resolve_memo = method_relation_map.get(CALLED_RESOLVE_MEMO)
+    instrument.add_cache_stats("called_resolve_memo", resolve_memo.hits, resolve_memo.misses)
+    print(f"\n调用解析缓存 命中:{resolve_memo.hits} 未命中:{resolve_memo.misses} 命中率:{resolve_memo.hit_rate():.1%}")
+    return parsed_infos, method_relation_map
+
+
+def analyze_methods_relation(parsed_infos:dict, imports_filter:bool, workers=1, instrument=None):
+    """整理出所有文件的函数关系 workers 为被调用函数解析阶段的并行进程数"""
+    parsed_infos, _ = build_methods_relation(parsed_infos, imports_filter, workers, instrument)
     return parsed_infos
 
 if __name__ == '__main__':
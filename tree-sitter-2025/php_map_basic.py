@@ -1,26 +1,38 @@
+import sys
+
 from php_enums import ClassKeys, MethodKeys, FileInfoKeys, ImportKey, DefineKeys, DefineTypes
 from tree_sitter_uitls import get_strs_hash, custom_format_path
+from php_line_index import as_indexed_infos
 
 
-def fix_method_infos_uniq_id(method_infos: list[dict], file_path: str):
-    """为方法信息填充ID数据等"""
+def calc_method_uniq_id(method_info: dict, file_path: str):
+    """计算方法的唯一标识 file_path 为格式化后的相对路径"""
+    m_class = method_info.get(MethodKeys.CLASS.value)
+    m_name = method_info.get(MethodKeys.NAME.value)
+    m_start = method_info.get(MethodKeys.START.value)
+    m_end = method_info.get(MethodKeys.END.value)
+    uniq_id = get_strs_hash(f"{file_path}|{m_class}|{m_name}|{m_start}|{m_end}")
+    return f"method_{uniq_id}"
+
+
+def calc_class_uniq_id(class_info: dict, file_path: str):
+    """计算类的唯一标识 file_path 为格式化后的相对路径"""
+    c_namespace = class_info.get(ClassKeys.NAMESPACE.value)
+    c_name = class_info.get(ClassKeys.NAME.value)
+    c_start = class_info.get(ClassKeys.START.value)
+    c_end = class_info.get(ClassKeys.END.value)
+    uniq_id = get_strs_hash(f"{file_path}|{c_namespace}|{c_name}|{c_start}|{c_end}")
+    return f"class_{uniq_id}"
 
-    def calc_method_uniq_id(method_info: dict):
-        m_file = method_info.get(MethodKeys.FILE.value)
-        m_class = method_info.get(MethodKeys.CLASS.value)
-        m_name = method_info.get(MethodKeys.NAME.value)
-        m_start = method_info.get(MethodKeys.START.value)
-        m_end = method_info.get(MethodKeys.END.value)
-        uniq_id = get_strs_hash(f"{m_file}|{m_class}|{m_name}|{m_start}|{m_end}")
-        uniq_id = f"method_{uniq_id}"
-        return uniq_id
 
+def fix_method_infos_uniq_id(method_infos: list[dict], file_path: str):
+    """为方法信息填充ID数据等"""
     # 循环进行信息补充
     for index, method_info in enumerate(method_infos):
         # 修复方法信息的文件路径
         method_info[MethodKeys.FILE.value] = file_path
         # 修复方法信息的唯一标识符逻辑
-        method_info[MethodKeys.UNIQ_ID.value] = calc_method_uniq_id(method_info)
+        method_info[MethodKeys.UNIQ_ID.value] = calc_method_uniq_id(method_info, file_path)
         # 把更新保存到原数据中
         method_infos[index] = method_info
     return method_infos
@@ -28,37 +40,28 @@ def fix_method_infos_uniq_id(method_infos: list[dict], file_path: str):
 
 def fix_class_infos_uniq_id(class_infos: list[dict], file_path: str):
     """为生成的类信息补充数据"""
-
-    def calc_class_uniq_id(class_info: dict):
-        c_file = class_info.get(ClassKeys.FILE.value)
-        c_namespace = class_info.get(ClassKeys.NAMESPACE.value)
-        c_name = class_info.get(ClassKeys.NAME.value)
-        c_start = class_info.get(ClassKeys.START.value)
-        c_end = class_info.get(ClassKeys.END.value)
-        uniq_id = get_strs_hash(f"{c_file}|{c_namespace}|{c_name}|{c_start}|{c_end}")
-        uniq_id = f"class_{uniq_id}"
-        return uniq_id
-
     for index, class_info in enumerate(class_infos):
         # 修复方法信息的文件路径
         class_info[ClassKeys.FILE.value] = file_path
         # 修复方法信息的唯一标识符逻辑
-        class_info[ClassKeys.UNIQ_ID.value] = calc_class_uniq_id(class_info)
+        class_info[ClassKeys.UNIQ_ID.value] = calc_class_uniq_id(class_info, file_path)
         class_infos[index] = class_info
     return class_infos
 
 
 def fix_called_methods_namespace_info(called_method_infos: dict, file_path: str, namespace_infos: list[dict], import_infos: list[dict]):
     """基于native键记录和import导入信息来为被调用函数填充命名空间和文件路径信息"""
+    # 同一文件的所有调用点共用一次构建的行号索引 按结束行二分筛选
+    import_infos = as_indexed_infos(import_infos)
+    namespace_infos = as_indexed_infos(namespace_infos)
+
     def filter_import_files_by_line(start_line, import_infos):
         """从导入信息中获取文件信息"""
         if not import_infos:
             return []
 
-        filtered_import_infos = [import_info
-                                 for import_info in import_infos
-                                 if import_info.get(ImportKey.PATH.value, None)
-                                 and import_info.get(ImportKey.END.value) <= start_line]
+        line_index = import_infos.line_index(ImportKey.START.value, ImportKey.END.value, require_key=ImportKey.PATH.value)
+        filtered_import_infos = line_index.filter_ending_before(start_line)
 
         # 获取 filtered_import_infos 中的文件 PATH 信息路径
         import_paths = [import_info.get(ImportKey.PATH.value) for import_info in filtered_import_infos]
@@ -69,10 +72,8 @@ def fix_called_methods_namespace_info(called_method_infos: dict, file_path: str,
         if not import_infos:
             return []
 
-        filtered_import_infos = [import_info
-                                 for import_info in import_infos
-                                 if import_info.get(ImportKey.NAMESPACE.value, None)
-                                 and import_info.get(ImportKey.END.value) <= start_line]
+        line_index = import_infos.line_index(ImportKey.START.value, ImportKey.END.value, require_key=ImportKey.NAMESPACE.value)
+        filtered_import_infos = line_index.filter_ending_before(start_line)
 
         # 获取 filtered_import_infos 中的文件 PATH 信息路径
         use_namespaces = [import_info.get(ImportKey.NAMESPACE.value) for import_info in filtered_import_infos]
@@ -83,9 +84,8 @@ def fix_called_methods_namespace_info(called_method_infos: dict, file_path: str,
         if not namespace_infos:
             return []
 
-        filtered_namespace_infos = [namespace_info
-                                    for namespace_info in namespace_infos
-                                    if namespace_info.get(DefineKeys.END.value) <= start_line]
+        line_index = namespace_infos.line_index(DefineKeys.START.value, DefineKeys.END.value)
+        filtered_namespace_infos = line_index.filter_ending_before(start_line)
 
         define_namespaces = [namespace_info.get(DefineKeys.NAME.value) for namespace_info in filtered_namespace_infos]
         return define_namespaces
@@ -120,8 +120,8 @@ def fix_called_methods_namespace_info(called_method_infos: dict, file_path: str,
 def repair_parsed_infos_basic_info(parsed_infos:dict):
     """修复函数和类的UNIQ和FILE信息"""
     for file_path, parsed_info in parsed_infos.items():
-        # 格式化路径
-        file_path = custom_format_path(file_path)
+        # 格式化路径 同一文件的方法|类|调用信息共用一个路径对象
+        file_path = sys.intern(custom_format_path(file_path))
 
         # 填充 类信息中ID和路径信息
         class_infos = parsed_info.get(FileInfoKeys.CLASS_INFOS.value, [])
@@ -139,9 +139,9 @@ def repair_parsed_infos_basic_info(parsed_infos:dict):
 
         # 获取导入信息
         dependent_infos = parsed_info.get(FileInfoKeys.DEPEND_INFOS.value, {})
-        import_infos = dependent_infos.get(DefineTypes.IMPORT_DEPENDS.value, [])
+        import_infos = as_indexed_infos(dependent_infos.get(DefineTypes.IMPORT_DEPENDS.value, []))
         # 获取命名空间的定义
-        namespace_infos = dependent_infos.get(DefineTypes.DEFINE_NAMESPACES.value, [])
+        namespace_infos = as_indexed_infos(dependent_infos.get(DefineTypes.DEFINE_NAMESPACES.value, []))
 
         # 填充 called_methods 中的部分已知信息
         global_method_infos = parsed_info.get(FileInfoKeys.METHOD_INFOS.value, [])
@@ -1,8 +1,107 @@
-import copy
 from collections import defaultdict
+from typing import NamedTuple
 
 from php_const import PHP_MAGIC_METHODS
-from php_enums import ClassKeys, MethodKeys, FileInfoKeys
+from php_enums import ClassKeys, MethodKeys, FileInfoKeys, PHPVisibility
+from tree_sitter_uitls import custom_format_path
+
+
+class MethodBrief(NamedTuple):
+    """关系映射中使用的方法只读投影 仅保留调用解析需要的字段"""
+    uniq_id: str
+    name: str
+    fullname: str
+    file: str
+    namespace: str
+    params_num: int
+    visibility: str
+
+
+class ClassBrief(NamedTuple):
+    """关系映射中使用的类只读投影 methods 为 MethodBrief 元组 按名称索引的值为保持原顺序的 MethodBrief 元组"""
+    uniq_id: str
+    name: str
+    file: str
+    namespace: str
+    methods: tuple
+    methods_by_name: dict
+    methods_by_fullname: dict
+
+
+class CalledBrief(NamedTuple):
+    """调用解析中使用的调用点只读投影 字段顺序与调用签名一致 不会被读取的字段置空 以便作为缓存键"""
+    method_type: str
+    name: str
+    fullname: str
+    class_name: str
+    is_native: bool
+    file: str
+    may_namespaces: tuple
+    may_files: tuple
+    params_num: int
+
+
+def create_method_brief(method_info: dict) -> MethodBrief:
+    """从方法信息创建只读投影 不复制原始字典"""
+    return MethodBrief(
+        uniq_id=method_info.get(MethodKeys.UNIQ_ID.value),
+        name=method_info.get(MethodKeys.NAME.value),
+        fullname=method_info.get(MethodKeys.FULLNAME.value),
+        file=method_info.get(MethodKeys.FILE.value),
+        namespace=method_info.get(MethodKeys.NAMESPACE.value),
+        params_num=len(method_info.get(MethodKeys.PARAMS.value) or []),
+        # 如果没有 visibility 表示是 public 类型
+        visibility=method_info.get(MethodKeys.VISIBILITY.value, PHPVisibility.PUBLIC.value),
+    )
+
+
+def group_method_briefs(method_briefs: tuple, field: str):
+    """按字段值对方法分组 组内保持类中定义的顺序"""
+    grouped = defaultdict(list)
+    for method_brief in method_briefs:
+        grouped[getattr(method_brief, field)].append(method_brief)
+    return {key: tuple(value) for key, value in grouped.items()}
+
+
+def create_class_brief(class_info: dict) -> ClassBrief:
+    """从类信息创建只读投影 不复制原始字典"""
+    methods = tuple(create_method_brief(m) for m in class_info.get(ClassKeys.METHODS.value, []))
+    return ClassBrief(
+        uniq_id=class_info.get(ClassKeys.UNIQ_ID.value),
+        name=class_info.get(ClassKeys.NAME.value),
+        file=class_info.get(ClassKeys.FILE.value),
+        namespace=class_info.get(ClassKeys.NAMESPACE.value),
+        methods=methods,
+        methods_by_name=group_method_briefs(methods, "name"),
+        methods_by_fullname=group_method_briefs(methods, "fullname"),
+    )
+
+
+def create_called_brief(called_method_info: dict, imports_filter: bool) -> CalledBrief:
+    """
+    从调用信息创建只读投影 每个调用点只读取一次字典
+    本地方法只按文件筛选 非本地方法只按导入信息筛选 因此只保留对应分支需要的字段以提高缓存命中率
+    """
+    is_native = bool(called_method_info.get(MethodKeys.IS_NATIVE.value, False))
+    if is_native:
+        native_file = called_method_info.get(MethodKeys.FILE.value, None)
+        may_namespaces, may_files = (), ()
+    else:
+        native_file = None
+        may_namespaces = tuple(called_method_info.get(MethodKeys.MAY_NAMESPACES.value) or ()) if imports_filter else ()
+        may_files = tuple(called_method_info.get(MethodKeys.MAY_FILES.value) or ()) if imports_filter else ()
+
+    return CalledBrief(
+        method_type=called_method_info.get(MethodKeys.METHOD_TYPE.value),
+        name=called_method_info.get(MethodKeys.NAME.value),
+        fullname=called_method_info.get(MethodKeys.FULLNAME.value),
+        class_name=called_method_info.get(MethodKeys.CLASS.value),
+        is_native=is_native,
+        file=native_file,
+        may_namespaces=may_namespaces,
+        may_files=may_files,
+        params_num=len(called_method_info.get(MethodKeys.PARAMS.value) or []),
+    )
 
 
 def get_all_global_methods(parsed_infos: dict):
@@ -45,29 +144,20 @@ def build_method_name_method_ids_map(all_method_infos: list[dict]):
 
 
 def build_method_id_method_info_map(all_method_infos: dict):
-    """整理 method id -> method info 的映射 ｛函数ID:方法信息｝"""
+    """整理 method id -> method brief 的映射 ｛函数ID:方法只读投影｝"""
     method_id_method_info_map = {}
     for method_info in all_method_infos:
         method_uniq_id = method_info.get(MethodKeys.UNIQ_ID.value)
-
-        # 不需要保留 CALLED_METHODS 信息
-        copy_method_info = copy.deepcopy(method_info)
-        copy_method_info.pop(MethodKeys.CALLED_METHODS.value)
-        method_id_method_info_map[method_uniq_id] = copy_method_info
+        method_id_method_info_map[method_uniq_id] = create_method_brief(method_info)
     return method_id_method_info_map
 
 
 def build_class_id_class_info_map(all_class_infos: dict):
-    """创建class id -> class info 的映射  ｛类ID:类信息｝"""
+    """创建class id -> class brief 的映射  ｛类ID:类只读投影｝"""
     class_id_class_info_map = {}
     for class_info in all_class_infos:
         class_uniq_id = class_info.get(ClassKeys.UNIQ_ID.value)
-
-        # 不需要保留 CALLED_METHODS 信息
-        copy_class_info = copy.deepcopy(class_info)
-        for copy_method_info in copy_class_info.get(ClassKeys.METHODS.value, []):
-            copy_method_info.pop(MethodKeys.CALLED_METHODS.value)
-        class_id_class_info_map[class_uniq_id] = copy_class_info
+        class_id_class_info_map[class_uniq_id] = create_class_brief(class_info)
     return class_id_class_info_map
 
 
@@ -113,3 +203,39 @@ def build_class_namespace_class_ids_map(all_class_infos: dict):
         class_namespace_class_ids_map[class_namespace].append(class_uniq_id)
     return class_namespace_class_ids_map
 
+
+def get_path_segments(path: str):
+    """将命名空间或文件路径统一格式化为路径片段列表 a\\b/c.php -> [a, b, c.php]"""
+    if not path:
+        return []
+    segments = [segment.strip() for segment in custom_format_path(path).split('/')]
+    return [segment for segment in segments if segment and segment != '.']
+
+
+def get_segment_runs(path: str):
+    """获取路径中所有连续片段组合 a/b/c -> a, a/b, a/b/c, b, b/c, c"""
+    segments = get_path_segments(path)
+    runs = set()
+    for start in range(len(segments)):
+        for end in range(start + 1, len(segments) + 1):
+            runs.add("/".join(segments[start:end]))
+    return runs
+
+
+def get_segment_suffixes(path: str):
+    """获取路径中所有以最后一个片段结尾的片段组合 a/b/c.php -> c.php, b/c.php, a/b/c.php"""
+    segments = get_path_segments(path)
+    return {"/".join(segments[start:]) for start in range(len(segments))}
+
+
+def build_segment_method_ids_map(all_method_infos: list[dict], method_key: str, get_runs=get_segment_runs):
+    """
+    整理 路径片段组合 -> method ids 的映射 用于按命名空间|导入文件哈希查找方法 ｛片段组合:{函数ID,函数ID}｝
+    get_runs 决定建立索引的片段组合 命名空间使用所有连续片段 文件路径使用路径后缀
+    """
+    segment_method_ids_map = defaultdict(set)
+    for method_info in all_method_infos:
+        method_uniq_id = method_info.get(MethodKeys.UNIQ_ID.value)
+        for segment_run in get_runs(method_info.get(method_key)):
+            segment_method_ids_map[segment_run].add(method_uniq_id)
+    return segment_method_ids_map
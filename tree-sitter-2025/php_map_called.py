@@ -1,6 +1,12 @@
-from tree_php.php_enums import MethodType, PHPVisibility
-from tree_php.php_map_build import *
-from tree_uitls.tree_sitter_uitls import custom_format_path
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from functools import lru_cache
+
+from php_enums import MethodType, PHPVisibility
+from php_map_build import *
 
 GLOBAL_METHOD_ID_METHOD_INFO_MAP = "GLOBAL_METHOD_ID_METHOD_INFO_MAP"
 GLOBAL_METHOD_NAME_METHOD_IDS_MAP = "GLOBAL_METHOD_NAME_METHOD_IDS_MAP"
@@ -10,12 +16,65 @@ CLASS_NAME_CLASS_IDS_MAP = "CLASS_NAME_CLASS_IDS_MAP"
 CLASS_METHOD_NAME_CLASS_IDS_MAP = "CLASS_METHOD_NAME_CLASS_IDS_MAP"
 CLASS_METHOD_FULLNAME_CLASS_IDS_MAP = "CLASS_METHOD_FULLNAME_CLASS_IDS_MAP"
 
+METHOD_NAMESPACE_METHOD_IDS_MAP = "METHOD_NAMESPACE_METHOD_IDS_MAP"
+METHOD_FILE_METHOD_IDS_MAP = "METHOD_FILE_METHOD_IDS_MAP"
+
+CALLED_RESOLVE_MEMO = "CALLED_RESOLVE_MEMO"
+
+
+class ResolveMemo:
+    """有界LRU缓存 按调用签名缓存可能的源方法 结果为只读的 MethodBrief 元组"""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        result = self.cache.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        self.cache[key] = result
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+    def discard_where(self, predicate):
+        """删除签名满足条件的缓存结果 用于增量更新后失效受影响的调用 返回删除数量"""
+        discard_keys = [key for key in self.cache if predicate(key)]
+        for key in discard_keys:
+            del self.cache[key]
+        return len(discard_keys)
+
+    def add_stats(self, hits, misses):
+        """合并子进程中产生的命中统计"""
+        self.hits += hits
+        self.misses += misses
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def get_called_signature(called_brief: CalledBrief, imports_filter: bool):
+    """获取调用方法的规范签名 调用点投影中仅包含查找源方法时实际读取的字段"""
+    return (imports_filter,) + called_brief
+
 
 def build_method_relation_map(parsed_infos:dict):
 
     # 1、整理出所有文件中的全局函数信息|类信息
     all_global_methods = get_all_global_methods(parsed_infos)
     all_class_infos = get_all_class_infos(parsed_infos)
+    # 全局方法和类方法 用于建立命名空间|文件路径索引
+    all_method_infos = all_global_methods + get_all_class_methods(parsed_infos)
 
     method_info_map = {
         # 全局方法id->方法详情 的对应关系
@@ -31,6 +90,15 @@ def build_method_relation_map(parsed_infos:dict):
         CLASS_METHOD_FULLNAME_CLASS_IDS_MAP: build_class_method_fullname_class_ids_map(all_class_infos),
         # 类名称 -> 类IDs 的对应关系
         CLASS_NAME_CLASS_IDS_MAP: build_class_name_class_ids_map(all_class_infos),
+
+        # 调用签名 -> 可能的源方法 的缓存
+        CALLED_RESOLVE_MEMO: ResolveMemo(),
+
+        # 命名空间片段组合 -> 方法IDs 的对应关系
+        METHOD_NAMESPACE_METHOD_IDS_MAP: build_segment_method_ids_map(all_method_infos, MethodKeys.NAMESPACE.value),
+        # 文件路径后缀 -> 方法IDs 的对应关系
+        METHOD_FILE_METHOD_IDS_MAP: build_segment_method_ids_map(all_method_infos, MethodKeys.FILE.value,
+                                                                 get_runs=get_segment_suffixes),
     }
 
     return method_info_map
@@ -40,113 +108,126 @@ def filter_methods_by_visibility(possible_method_infos):
     """通过类方法的可访问性进行一次过滤"""
     filtered_method_infos = []
     for possible_method_info in possible_method_infos:
-        # 如果没有 visibility 表示是 public 类型
-        method_visibility = possible_method_info.get(MethodKeys.VISIBILITY.value, PHPVisibility.PUBLIC.value)
-        if PHPVisibility.PRIVATE.value != method_visibility:
+        # 如果没有 visibility 表示是 public 类型 已在 MethodBrief 中补充默认值
+        if PHPVisibility.PRIVATE.value != possible_method_info.visibility:
             filtered_method_infos.append(possible_method_info)
 
     # print(f"通过类方法可访问性筛选出可能的方法信息:[{len(possible_method_infos)}]个")
     return filtered_method_infos
 
 
-def filter_methods_by_params_num(called_method_info, possible_method_infos):
+def filter_methods_by_params_num(called_brief: CalledBrief, possible_method_infos):
     """通过对比参数数量信息过滤可能的方法"""
     # TODO 通过默认值进行优化参数过滤
     filtered_method_infos = []
+    called_params_num = called_brief.params_num
     for possible_method_info in possible_method_infos:
-        if len(possible_method_info[MethodKeys.PARAMS.value]) >= len(called_method_info[MethodKeys.PARAMS.value]):
+        if possible_method_info.params_num >= called_params_num:
             filtered_method_infos.append(possible_method_info)
 
-    # method_name = called_method_info.get(MethodKeys.NAME.value)
+    # method_name = called_brief.name
     # print(f"基于参数信息筛选[{method_name}]对应方法:[{len(filtered_method_infos)}]个")
 
     return filtered_method_infos
 
 
-def filter_methods_by_native_file(called_method_info, possible_method_infos):
+def filter_methods_by_native_file(called_brief: CalledBrief, possible_method_infos):
     """根据是否是本地方法文件来进行筛选"""
     filtered_method_infos = []
-    # 查找其中文件名和 called_method_info 中的文件名相同的对象
-    native_file = called_method_info.get(MethodKeys.FILE.value, None)
+    # 查找其中文件名和调用点文件名相同的对象
+    native_file = called_brief.file
     for possible_method_info in possible_method_infos:
-        possible_file = possible_method_info.get(MethodKeys.FILE.value, None)
+        possible_file = possible_method_info.file
         if native_file and possible_file and possible_file == native_file:
             filtered_method_infos.append(possible_method_info)
 
-    # called_method_name = called_method_info.get(MethodKeys.NAME.value)
+    # called_method_name = called_brief.name
     # print(f"基于Native信息 找到[{called_method_name}]对应方法:[{len(filtered_method_infos)}]个 -> File: [{native_file}]")
     return filtered_method_infos
 
 
-def filter_methods_by_depends(called_method_info, possible_method_infos):
+@lru_cache(maxsize=65536)
+def format_import_path(raw_path:str):
+    """将导入语句中的路径格式化为去除相对路径后的路径 同一导入语句在所有调用点只格式化一次"""
+    path = raw_path
+
+    replace_map = {
+        "dirname":"",
+        "__FILE__":"",
+        "(": "",
+        ")": "",
+        "ROOT_PATH": "",
+    }
+    for key, value in replace_map.items():
+        path = path.replace(key, value)
+
+    if '__' in  path and path.count("__") %2 == 0:
+        path = path.split("__")[-1]
+
+    # 按路径片段去除 字符串拼接符|引号|相对路径 保留 config.inc.php 等包含多个点的文件名
+    # dirname(__FILE__) . '/../lib/a.php' -> lib/a.php   ../inc/init.php -> inc/init.php
+    segments = [segment.strip(" \t\"'.") for segment in path.replace("\\", "/").split("/")]
+    path = "/".join(segment for segment in segments if segment)
+
+    if not path:
+        return None
+    if path.count(".php") > 0 and len(path) <= 4:
+        print(f"导入路径:{raw_path}经过格式化后结果不合格:{path}")
+        path = None
+    return path
+
+
+@lru_cache(maxsize=65536)
+def get_segment_key(path:str):
+    """获取与 build_segment_method_ids_map 一致的索引键"""
+    return "/".join(get_path_segments(path))
+
+
+def filter_methods_by_segment_keys(segment_keys, possible_method_infos, segment_method_ids_map):
+    """按片段组合索引筛选方法 每个键命中的方法按原顺序追加"""
+    filtered_method_infos = []
+    for segment_key in segment_keys:
+        method_ids = segment_method_ids_map.get(segment_key) if segment_key else None
+        if not method_ids:
+            continue
+        for possible_method_info in possible_method_infos:
+            if possible_method_info.uniq_id in method_ids:
+                filtered_method_infos.append(possible_method_info)
+    return filtered_method_infos
+
+
+def filter_methods_by_depends(called_brief: CalledBrief, possible_method_infos, method_info_map: dict):
     """通过导入信息和命名空间信息查找可能的路径"""
-    def format_import_path(raw_path:str):
-        path = raw_path
-
-        replace_map = {
-            "dirname":"",
-            "__FILE__":"",
-            "(": "",
-            ")": "",
-            "ROOT_PATH": "",
-        }
-        for key, value in replace_map.items():
-            path = path.replace(key, value)
-
-        if '__' in  path and path.count("__") %2 == 0:
-            path = path.split("__")[-1]
-
-        if '.' in path and path.count(".") >= 2:
-            path = path.split(".", 1)[-1]
-
-        path = path.strip("\\/.\"'")
-
-        if path.count(".php") > 0 and len(path) <= 4:
-            print(f"导入路径:{raw_path}经过格式化后结果不合格:{path}")
-            path = None
-        return path
-
-    may_namespaces = called_method_info.get(MethodKeys.MAY_NAMESPACES.value, [])
-    may_files = called_method_info.get(MethodKeys.MAY_FILES.value, [])
+    may_namespaces = called_brief.may_namespaces
+    may_files = called_brief.may_files
     if not may_namespaces and not may_files:
         # 没有命名空间信息和导入信息被获取到
         return []
 
-    called_method_name = called_method_info.get(MethodKeys.NAME.value)
+    if not possible_method_infos:
+        return []
 
-    filtered_by_may_namespace = []
-    for may_namespace in may_namespaces:
-        for possible_method_info in possible_method_infos:
-            possible_namespace = custom_format_path(possible_method_info.get(MethodKeys.NAMESPACE.value, None))
-            if possible_namespace and may_namespace in possible_namespace:
-                filtered_by_may_namespace.append(possible_method_info)
-    # else:
-    #     if filtered_by_may_namespace:
-    #         print(f"基于可能的namespace信息 找到[{called_method_name}]对应方法:[{len(filtered_by_may_namespace)}]个")
-
-    filtered_by_may_files = []
-    for may_file in may_files:
-        # may_file 应该是最小格式化缩写
-        may_file = format_import_path(may_file)
-        for possible_method_info in possible_method_infos:
-            possible_file = custom_format_path(possible_method_info.get(MethodKeys.FILE.value, None))
-            if may_file and possible_file and may_file in possible_file:
-                filtered_by_may_files.append(possible_method_info)
-    # else:
-    #     if filtered_by_may_files:
-    #         print(f"基于可能的namespace信息 找到[{called_method_name}]对应方法:[{len(filtered_by_may_namespace)}]个")
+    # 命名空间需要与方法命名空间中的连续片段一致
+    namespace_keys = [get_segment_key(may_namespace) for may_namespace in may_namespaces]
+    filtered_by_may_namespace = filter_methods_by_segment_keys(
+        namespace_keys, possible_method_infos, method_info_map.get(METHOD_NAMESPACE_METHOD_IDS_MAP))
+
+    # 格式化后的导入路径需要与方法文件路径的后缀一致 include 'lib/a.php' 可以匹配 app/lib/a.php
+    file_keys = [get_segment_key(format_import_path(may_file)) for may_file in may_files]
+    filtered_by_may_files = filter_methods_by_segment_keys(
+        file_keys, possible_method_infos, method_info_map.get(METHOD_FILE_METHOD_IDS_MAP))
 
     filtered_method_infos = filtered_by_may_namespace + filtered_by_may_files
     return filtered_method_infos
 
 
-def find_possible_global_methods(called_method_info: dict, method_info_map: dict, imports_filter:bool):
+def find_possible_global_methods(called_brief: CalledBrief, method_info_map: dict, imports_filter:bool):
     """查找多个uniq中最有可能的方法"""
     global_method_id_method_info_map = method_info_map.get(GLOBAL_METHOD_ID_METHOD_INFO_MAP)
     global_method_name_method_ids_map = method_info_map.get(GLOBAL_METHOD_NAME_METHOD_IDS_MAP)
 
     # 获取被调用类的信息
-    method_name = called_method_info.get(MethodKeys.NAME.value)
+    method_name = called_brief.name
     # 通过方法名称查找可能的全局方法信息
     possible_method_ids = global_method_name_method_ids_map.get(method_name, [])
     # print(f"通过方法名[{method_name}]找到可能的全局方法:[{len(possible_method_ids)}]个")
@@ -155,22 +236,22 @@ def find_possible_global_methods(called_method_info: dict, method_info_map: dict
     possible_method_infos = [global_method_id_method_info_map.get(mid) for mid in possible_method_ids]
 
     # 通过本地方法标志进行初次筛选
-    if called_method_info.get(MethodKeys.IS_NATIVE.value, False):
-        possible_method_infos = filter_methods_by_native_file(called_method_info, possible_method_infos)
+    if called_brief.is_native:
+        possible_method_infos = filter_methods_by_native_file(called_brief, possible_method_infos)
     else:
         # 通过导入文件进行筛选
         if imports_filter:
-            possible_method_infos = filter_methods_by_depends(called_method_info, possible_method_infos)
+            possible_method_infos = filter_methods_by_depends(called_brief, possible_method_infos, method_info_map)
 
     # 通过参数数量再一次进行过滤 对于java等语言可以通过参数类型进行过滤
-    possible_method_infos = filter_methods_by_params_num(called_method_info, possible_method_infos)
+    possible_method_infos = filter_methods_by_params_num(called_brief, possible_method_infos)
 
     return possible_method_infos
 
 
-def find_possible_class_methods(called_method_info: dict, method_info_map: dict, imports_filter:bool):
+def find_possible_class_methods(called_brief: CalledBrief, method_info_map: dict, imports_filter:bool):
     possible_class_ids = []
-    called_method_fullname = called_method_info.get(MethodKeys.FULLNAME.value)
+    called_method_fullname = called_brief.fullname
     # 1、直接通过完整的方法直接查找可能的类信息
     if not possible_class_ids:
         class_method_fullname_class_ids_map = method_info_map.get(CLASS_METHOD_FULLNAME_CLASS_IDS_MAP)
@@ -180,16 +261,15 @@ def find_possible_class_methods(called_method_info: dict, method_info_map: dict,
 
     # 2、通过类名进行查找可能的类信息
     if not possible_class_ids:
-        called_method_class_name = called_method_info.get(MethodKeys.CLASS.value)
+        called_method_class_name = called_brief.class_name
         class_name_class_ids_map = method_info_map.get(CLASS_NAME_CLASS_IDS_MAP)
         possible_class_ids = class_name_class_ids_map.get(called_method_class_name, [])
         # if possible_class_ids:
         #     print(f"[{called_method_fullname}]通[过完整类名]找到可能的class:[{len(possible_class_ids)}]个")
 
     # 3、通过不完整的方法名查找可能的对象名 (不查找构造方法)
-    called_method_type = called_method_info.get(MethodKeys.METHOD_TYPE.value)
-    if not possible_class_ids and called_method_type != MethodType.CONSTRUCT.value:
-        called_method_name = called_method_info.get(MethodKeys.NAME.value)
+    if not possible_class_ids and called_brief.method_type != MethodType.CONSTRUCT.value:
+        called_method_name = called_brief.name
         class_method_name_class_ids_map = method_info_map.get(CLASS_METHOD_NAME_CLASS_IDS_MAP)
         possible_class_ids = class_method_name_class_ids_map.get(called_method_name, [])
         # if possible_class_ids:
@@ -204,20 +284,20 @@ def find_possible_class_methods(called_method_info: dict, method_info_map: dict,
     possible_class_infos = [class_id_class_info_map.get(cid) for cid in possible_class_ids]
 
     # 从可能的class中获取方法信息
-    possible_method_infos = get_class_methods_by_method_name(called_method_info, possible_class_infos)
+    possible_method_infos = get_class_methods_by_method_name(called_brief, possible_class_infos)
 
     # 如果是本地方法 就通过方法对应的文件信息进行初次筛选
-    method_is_native = called_method_info.get(MethodKeys.IS_NATIVE.value, False)
+    method_is_native = called_brief.is_native
     # 从本地信息中获取类, 考虑从从方法的文件路径中进行调用
     if method_is_native:
-        # possible_class_infos = filter_class_by_native_file(called_method_info, possible_class_infos)
-        possible_method_infos = filter_methods_by_native_file(called_method_info, possible_method_infos)
+        # possible_class_infos = filter_class_by_native_file(called_brief, possible_class_infos)
+        possible_method_infos = filter_methods_by_native_file(called_brief, possible_method_infos)
     else:
         if imports_filter:
-            possible_method_infos = filter_methods_by_depends(called_method_info, possible_method_infos)
+            possible_method_infos = filter_methods_by_depends(called_brief, possible_method_infos, method_info_map)
 
     # 通过参数数量再一次进行过滤 对于java等语言可以通过参数类型进行过滤
-    possible_method_infos = filter_methods_by_params_num(called_method_info, possible_method_infos)
+    possible_method_infos = filter_methods_by_params_num(called_brief, possible_method_infos)
 
     # 如果不是本地方法 还可以通过 Class方法的可访问性再次进行过滤
     if not method_is_native:
@@ -227,44 +307,69 @@ def find_possible_class_methods(called_method_info: dict, method_info_map: dict,
     return possible_method_infos
 
 
-def get_class_methods_by_method_name(called_method_info, possible_class_infos):
-    """通过被调用的方法名 从可能的类信息中提取方法信息"""
-    called_method_name  = called_method_info.get(MethodKeys.NAME.value)
-    called_method_fullname  = called_method_info.get(MethodKeys.FULLNAME.value)
+def get_class_methods_by_method_name(called_brief: CalledBrief, possible_class_infos):
+    """通过被调用的方法名 从可能的类信息中提取方法信息 结果按类中定义的顺序排列"""
+    called_method_name  = called_brief.name
+    called_method_fullname  = called_brief.fullname
 
     possible_method_infos = []
     for possible_class_info in possible_class_infos:
-        method_infos = possible_class_info.get(ClassKeys.METHODS.value, [])
-        for method_info in method_infos:
-            method_name = method_info[MethodKeys.NAME.value]
-            method_fullname = method_info[MethodKeys.FULLNAME.value]
-            if method_fullname == called_method_fullname or method_name == called_method_name:
-                possible_method_infos.append(method_info)
+        named_methods = possible_class_info.methods_by_name.get(called_method_name, ())
+        fullname_methods = possible_class_info.methods_by_fullname.get(called_method_fullname, ())
+        if not fullname_methods or fullname_methods == named_methods:
+            possible_method_infos.extend(named_methods)
+        elif not named_methods:
+            possible_method_infos.extend(fullname_methods)
+        else:
+            # 两种方式命中的方法不同时 按原顺序合并
+            for method_info in possible_class_info.methods:
+                if method_info.fullname == called_method_fullname or method_info.name == called_method_name:
+                    possible_method_infos.append(method_info)
     # print(f"通过被调用方法名筛选[{called_method_fullname}]可能的方法信息:[{len(possible_method_infos)}]个")
     return possible_method_infos
 
 
-def filter_class_by_native_file(called_method_info, possible_class_infos):
+def filter_class_by_native_file(called_brief: CalledBrief, possible_class_infos):
     """通过本地方法属性进行calss过滤"""
     filtered_class_infos = []
-    native_file = called_method_info[MethodKeys.FILE.value]
+    native_file = called_brief.file
     for possible_class_info in possible_class_infos:
-        possible_file = possible_class_info[ClassKeys.FILE.value]
+        possible_file = possible_class_info.file
         if native_file and possible_file and possible_file == native_file:
             filtered_class_infos.append(possible_class_info)
 
-    # called_method_fullname = called_method_info.get(MethodKeys.FULLNAME.value)
+    # called_method_fullname = called_brief.fullname
     # print(f"基于Native信息 找到[{called_method_fullname}]对应类信息: {len(filtered_class_infos)}个 -> File:[{native_file}]")
     return filtered_class_infos
 
 
-def find_possible_called_methods(called_method_info, method_info_map: dict, imports_filter:bool):
-    """查找可能的被调用方法的原始信息"""
-    called_method_fullname = called_method_info.get(MethodKeys.FULLNAME.value)
+def find_possible_called_methods(called_method_info: dict, method_info_map: dict, imports_filter:bool):
+    """查找可能的被调用方法的原始信息 相同签名的调用直接复用缓存结果"""
     called_method_type = called_method_info.get(MethodKeys.METHOD_TYPE.value)
+    # 内置方法和动态方法不需要查找
+    if called_method_type in [MethodType.BUILTIN.value, MethodType.DYNAMIC.value]:
+        return []
+
+    # 每个调用点只读取一次字典 后续的查找和筛选都使用只读投影
+    called_brief = create_called_brief(called_method_info, imports_filter)
+    resolve_memo = method_info_map.get(CALLED_RESOLVE_MEMO)
+    if resolve_memo is None:
+        return resolve_possible_called_methods(called_brief, method_info_map, imports_filter)
+
+    signature = get_called_signature(called_brief, imports_filter)
+    possible_methods = resolve_memo.get(signature)
+    if possible_methods is None:
+        possible_methods = tuple(resolve_possible_called_methods(called_brief, method_info_map, imports_filter))
+        resolve_memo.put(signature, possible_methods)
+    return list(possible_methods)
+
+
+def resolve_possible_called_methods(called_brief: CalledBrief, method_info_map: dict, imports_filter:bool):
+    """按调用方法类型查找可能的被调用方法的原始信息"""
+    called_method_type = called_brief.method_type
 
-    # called_method_name = called_method_info.get(MethodKeys.NAME.value)
-    # print(f"called method fullname:{called_method_fullname} -> method_type:{called_method_type}")
+    # called_method_name = called_brief.name
+    # print(f"called method fullname:{called_brief.fullname} -> method_type:{called_method_type}")
 
     # 存储可能的方法信息
     possible_methods = []
@@ -282,14 +387,14 @@ def find_possible_called_methods(called_method_info, method_info_map: dict, impo
     # GENERAL = "GENERAL_METHOD"      # 自定义的普通方法
     elif called_method_type in [MethodType.GENERAL.value]:
         # print(f"被调用的方法[{called_method_name}]是全局方法 开始进行查找可能的源信息")
-        possible_methods = find_possible_global_methods(called_method_info, method_info_map, imports_filter)
+        possible_methods = find_possible_global_methods(called_brief, method_info_map, imports_filter)
         # if len(possible_methods) > 0:
         #     print(f"最终查找到全局方法[{called_method_fullname}]可能的原始方法 共[{len(possible_methods)}]个")
 
     # 开始查找类方法 CONSTRUCT MAGIC CLASS
     elif called_method_type in [MethodType.CONSTRUCT.value, MethodType.MAGIC_METHOD.value, MethodType.CLASS_METHOD.value]:
         # print(f"被调用的方法[{called_method_name}]是类的方法 开始进行查找可能的源信息")
-        possible_methods = find_possible_class_methods(called_method_info, method_info_map, imports_filter)
+        possible_methods = find_possible_class_methods(called_brief, method_info_map, imports_filter)
         # if len(possible_methods) > 0:
         #     print(f"查找到类的方法[{called_method_fullname}]可能的原始方法 共[{len(possible_methods)}]个")
     return possible_methods
@@ -303,38 +408,127 @@ def get_short_method_infos(possible_methods):
 
     for possible_method in possible_methods:
         # 仅保留id和文件名称 便于搜索
-        method_id = possible_method.get(MethodKeys.UNIQ_ID.value)
-        method_file = possible_method.get(MethodKeys.FILE.value)
-        short_method_infos[method_id]=method_file
+        short_method_infos[possible_method.uniq_id] = possible_method.file
     return short_method_infos
 
 
-def repair_parsed_infos_called_info(parsed_infos: dict, method_relation_map:dict, imports_filter:bool):
-    """修补被调用函数的信息"""
-
-    for file_path, parsed_info in parsed_infos.items():
-        # 修复全局方法中的调用方法信息
-        global_method_infos = parsed_info.get(FileInfoKeys.METHOD_INFOS.value, [])
-        for method_info in global_method_infos:
-            called_method_infos = method_info.get(MethodKeys.CALLED_METHODS.value, [])
-            # 填充方法中调用的其他方法的信息
-            for called_method_info in called_method_infos:
-                # 填充可能的方法信息
-                called_possible = find_possible_called_methods(called_method_info, method_relation_map, imports_filter)
-                if called_possible:
-                    called_method_info[MethodKeys.MAY_SOURCE.value] = get_short_method_infos(called_possible)
-
-        # 修复类方法中的调用方法信息
-        class_infos = parsed_info.get(FileInfoKeys.CLASS_INFOS.value, [])
-        for class_info in class_infos:
-            for method_info in class_info.get(ClassKeys.METHODS.value, []):
-                called_method_infos = method_info.get(MethodKeys.CALLED_METHODS.value, [])
-                # 填充方法中调用的其他方法的信息
-                for called_method_info in called_method_infos:
-                    # 填充可能的方法信息
-                    called_possible = find_possible_called_methods(called_method_info, method_relation_map, imports_filter)
-                    if called_possible:
-                        called_method_info[MethodKeys.MAY_SOURCE.value] = get_short_method_infos(called_possible)
+def iter_method_called_infos(parsed_info: dict):
+    """按固定顺序遍历文件中全局方法和类方法的调用信息 返回 (调用位置, 调用信息)"""
+    # 全局方法中的调用方法信息
+    global_method_infos = parsed_info.get(FileInfoKeys.METHOD_INFOS.value, [])
+    for method_index, method_info in enumerate(global_method_infos):
+        called_method_infos = method_info.get(MethodKeys.CALLED_METHODS.value, []) or []
+        for called_index, called_method_info in enumerate(called_method_infos):
+            yield (None, method_index, called_index), called_method_info
+
+    # 类方法中的调用方法信息
+    class_infos = parsed_info.get(FileInfoKeys.CLASS_INFOS.value, [])
+    for class_index, class_info in enumerate(class_infos):
+        for method_index, method_info in enumerate(class_info.get(ClassKeys.METHODS.value, [])):
+            called_method_infos = method_info.get(MethodKeys.CALLED_METHODS.value, []) or []
+            for called_index, called_method_info in enumerate(called_method_infos):
+                yield (class_index, method_index, called_index), called_method_info
+
+
+def resolve_parsed_info_called_info(parsed_info: dict, method_relation_map: dict, imports_filter: bool):
+    """解析单个文件中所有被调用方法可能的源方法 返回 [(调用位置, MAY_SOURCE)]"""
+    resolved_infos = []
+    for called_position, called_method_info in iter_method_called_infos(parsed_info):
+        # 填充可能的方法信息
+        called_possible = find_possible_called_methods(called_method_info, method_relation_map, imports_filter)
+        if called_possible:
+            resolved_infos.append((called_position, get_short_method_infos(called_possible)))
+    return resolved_infos
+
+
+def apply_resolved_called_info(parsed_info: dict, resolved_infos: list):
+    """将解析出的 MAY_SOURCE 写回对应的调用信息"""
+    for (class_index, method_index, called_index), may_source in resolved_infos:
+        if class_index is None:
+            method_info = parsed_info[FileInfoKeys.METHOD_INFOS.value][method_index]
+        else:
+            class_info = parsed_info[FileInfoKeys.CLASS_INFOS.value][class_index]
+            method_info = class_info[ClassKeys.METHODS.value][method_index]
+        method_info[MethodKeys.CALLED_METHODS.value][called_index][MethodKeys.MAY_SOURCE.value] = may_source
+
+
+# 并行解析时 由父进程在 fork 前设置 子进程以写时复制方式共享 无需序列化传递
+RESOLVE_PARSED_INFOS = None
+RESOLVE_RELATION_MAP = None
+RESOLVE_IMPORTS_FILTER = True
+
+# 调用数量低于该值时 进程启动开销大于收益 直接串行处理
+RESOLVE_PARALLEL_MIN_CALLS = 5000
+
+
+def resolve_called_infos_shard(file_paths: list):
+    """在子进程中解析一组文件 仅返回体积较小的 MAY_SOURCE 结果 以及本分片的缓存命中统计"""
+    resolve_memo = RESOLVE_RELATION_MAP.get(CALLED_RESOLVE_MEMO)
+    hits, misses = (resolve_memo.hits, resolve_memo.misses) if resolve_memo else (0, 0)
+    shard_results = [(file_path, resolve_parsed_info_called_info(RESOLVE_PARSED_INFOS[file_path], RESOLVE_RELATION_MAP,
+                                                                 RESOLVE_IMPORTS_FILTER))
+                     for file_path in file_paths]
+    if resolve_memo:
+        hits, misses = resolve_memo.hits - hits, resolve_memo.misses - misses
+    return shard_results, hits, misses
+
+
+def split_files_by_called_count(file_called_counts: dict, shard_num: int):
+    """按调用数量由多到少 依次分配给当前负载最小的分片 使各分片工作量接近"""
+    shards = [[] for _ in range(shard_num)]
+    loads = [0] * shard_num
+    for file_path, called_count in sorted(file_called_counts.items(), key=lambda x: x[1], reverse=True):
+        index = loads.index(min(loads))
+        shards[index].append(file_path)
+        loads[index] += called_count
+    return [shard for shard in shards if shard]
+
+
+def get_fork_context():
+    """
+    获取 fork 进程上下文 只在 linux 或默认启动方式已经是 fork 时使用 其他情况返回 None 由调用方串行处理
+    macOS 虽然支持 fork 但在已加载系统框架的进程中 fork 不安全 默认启动方式为 spawn
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    if sys.platform.startswith("linux") or multiprocessing.get_start_method(allow_none=True) == "fork":
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def repair_parsed_infos_called_info_parallel(parsed_infos: dict, method_relation_map: dict, imports_filter: bool,
+                                             workers: int):
+    """按文件分片并行解析被调用方法 依赖 fork 写时复制共享只读的关系映射"""
+    global RESOLVE_PARSED_INFOS, RESOLVE_RELATION_MAP, RESOLVE_IMPORTS_FILTER
+
+    file_called_counts = {file_path: sum(1 for _ in iter_method_called_infos(parsed_info))
+                          for file_path, parsed_info in parsed_infos.items()}
+    # 每个进程分配多个分片 避免单个大文件拖慢整体
+    shards = split_files_by_called_count(file_called_counts, workers * 4)
+
+    RESOLVE_PARSED_INFOS, RESOLVE_RELATION_MAP, RESOLVE_IMPORTS_FILTER = parsed_infos, method_relation_map, imports_filter
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_fork_context()) as executor:
+            resolve_memo = method_relation_map.get(CALLED_RESOLVE_MEMO)
+            for shard_results, hits, misses in executor.map(resolve_called_infos_shard, shards):
+                if resolve_memo:
+                    resolve_memo.add_stats(hits, misses)
+                for file_path, resolved_infos in shard_results:
+                    apply_resolved_called_info(parsed_infos[file_path], resolved_infos)
+    finally:
+        RESOLVE_PARSED_INFOS, RESOLVE_RELATION_MAP = None, None
     return parsed_infos
 
 
+def repair_parsed_infos_called_info(parsed_infos: dict, method_relation_map:dict, imports_filter:bool, workers=1):
+    """修补被调用函数的信息 workers 大于1且 get_fork_context 可用时按文件分片并行处理"""
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(parsed_infos) > 1 and get_fork_context() is not None:
+        called_count = sum(1 for parsed_info in parsed_infos.values() for _ in iter_method_called_infos(parsed_info))
+        if called_count >= RESOLVE_PARALLEL_MIN_CALLS:
+            return repair_parsed_infos_called_info_parallel(parsed_infos, method_relation_map, imports_filter, workers)
+
+    for file_path, parsed_info in parsed_infos.items():
+        resolved_infos = resolve_parsed_info_called_info(parsed_info, method_relation_map, imports_filter)
+        apply_resolved_called_info(parsed_info, resolved_infos)
+    return parsed_infos
@@ -0,0 +1,130 @@
+from php_enums import MethodType
+from php_map_basic import repair_parsed_infos_basic_info
+from php_map_called import *
+
+# 关系映射中不参与增量合并的键
+RELATION_MAP_SKIP_KEYS = {CALLED_RESOLVE_MEMO}
+
+
+def build_partial_relation_map(parsed_infos: dict):
+    """为部分文件构建关系映射 不包含调用解析缓存"""
+    partial_map = build_method_relation_map(parsed_infos)
+    for skip_key in RELATION_MAP_SKIP_KEYS:
+        partial_map.pop(skip_key, None)
+    return partial_map
+
+
+def merge_relation_map(method_relation_map: dict, partial_map: dict):
+    """将部分文件的关系映射合并到全量关系映射中"""
+    for map_key, partial_index in partial_map.items():
+        relation_index = method_relation_map[map_key]
+        for index_key, index_value in partial_index.items():
+            if isinstance(index_value, list):
+                relation_index.setdefault(index_key, []).extend(index_value)
+            elif isinstance(index_value, set):
+                relation_index.setdefault(index_key, set()).update(index_value)
+            else:
+                relation_index[index_key] = index_value
+
+
+def subtract_relation_map(method_relation_map: dict, partial_map: dict):
+    """从全量关系映射中删除部分文件的方法和类 唯一ID包含文件路径 不会误删其他文件的数据"""
+    for map_key, partial_index in partial_map.items():
+        relation_index = method_relation_map[map_key]
+        for index_key, index_value in partial_index.items():
+            if isinstance(index_value, (list, set)):
+                remain_value = relation_index.get(index_key)
+                if remain_value is None:
+                    continue
+                remove_ids = set(index_value)
+                if isinstance(remain_value, set):
+                    remain_value -= remove_ids
+                else:
+                    remain_value[:] = [uniq_id for uniq_id in remain_value if uniq_id not in remove_ids]
+                if not remain_value:
+                    del relation_index[index_key]
+            else:
+                relation_index.pop(index_key, None)
+
+
+def get_affected_keys(partial_map: dict):
+    """获取部分文件关系映射影响到的查找键 (方法名, 类方法完整名, 类名)"""
+    method_names = set(partial_map[GLOBAL_METHOD_NAME_METHOD_IDS_MAP])
+    method_fullnames = set(partial_map[CLASS_METHOD_FULLNAME_CLASS_IDS_MAP])
+    class_names = set(partial_map[CLASS_NAME_CLASS_IDS_MAP])
+    for class_brief in partial_map[CLASS_ID_CLASS_INFO_MAP].values():
+        method_names.update(method_brief.name for method_brief in class_brief.methods)
+    return method_names, method_fullnames, class_names
+
+
+def called_is_affected(method_type, name, fullname, class_name, affected_keys):
+    """判断调用的查找结果是否可能受到变更文件的影响 与 find_possible_called_methods 使用的查找键保持一致"""
+    if method_type in [MethodType.BUILTIN.value, MethodType.DYNAMIC.value]:
+        return False
+    method_names, method_fullnames, class_names = affected_keys
+    return name in method_names or fullname in method_fullnames or class_name in class_names
+
+
+def signature_is_affected(signature, affected_keys):
+    """调用签名格式参考 get_called_signature"""
+    _, method_type, name, fullname, class_name = signature[:5]
+    return called_is_affected(method_type, name, fullname, class_name, affected_keys)
+
+
+def update_methods_relation(parsed_infos: dict, method_relation_map: dict, changed_infos: dict, imports_filter: bool):
+    """
+    增量更新函数关系 changed_infos 为 {相对路径: 新的原始解析结果|None(已删除)}
+    1、从关系映射中删除变更文件的旧数据 合并新数据
+    2、失效受影响的调用解析缓存
+    3、变更文件重新解析全部调用 其他文件仅重新解析查找键受影响的调用
+    返回 (重新解析的调用数量, 受影响的文件列表)
+    """
+    # 删除旧文件数据 并记录受影响的查找键
+    old_infos = {path: parsed_infos[path] for path in changed_infos if path in parsed_infos}
+    old_partial_map = build_partial_relation_map(old_infos)
+    subtract_relation_map(method_relation_map, old_partial_map)
+
+    # 补充新文件的基本信息后合并 已删除的文件从解析结果中移除
+    new_infos = {path: info for path, info in changed_infos.items() if info is not None}
+    new_infos = repair_parsed_infos_basic_info(new_infos)
+    new_partial_map = build_partial_relation_map(new_infos)
+    merge_relation_map(method_relation_map, new_partial_map)
+    for relative_path, parsed_info in changed_infos.items():
+        if parsed_info is None:
+            parsed_infos.pop(relative_path, None)
+        else:
+            parsed_infos[relative_path] = new_infos[relative_path]
+
+    affected_keys = tuple(old_keys | new_keys for old_keys, new_keys
+                          in zip(get_affected_keys(old_partial_map), get_affected_keys(new_partial_map)))
+    resolve_memo = method_relation_map.get(CALLED_RESOLVE_MEMO)
+    if resolve_memo:
+        resolve_memo.discard_where(lambda signature: signature_is_affected(signature, affected_keys))
+
+    resolved_count = 0
+    affected_files = []
+    for relative_path, parsed_info in parsed_infos.items():
+        if relative_path in new_infos:
+            resolved_infos = resolve_parsed_info_called_info(parsed_info, method_relation_map, imports_filter)
+            apply_resolved_called_info(parsed_info, resolved_infos)
+            resolved_count += sum(1 for _ in iter_method_called_infos(parsed_info))
+            affected_files.append(relative_path)
+            continue
+
+        file_affected = False
+        for _, called_method_info in iter_method_called_infos(parsed_info):
+            if not called_is_affected(called_method_info.get(MethodKeys.METHOD_TYPE.value),
+                                      called_method_info.get(MethodKeys.NAME.value),
+                                      called_method_info.get(MethodKeys.FULLNAME.value),
+                                      called_method_info.get(MethodKeys.CLASS.value), affected_keys):
+                continue
+            # 与全量解析一致 未找到源方法时不保留 MAY_SOURCE
+            called_method_info.pop(MethodKeys.MAY_SOURCE.value, None)
+            called_possible = find_possible_called_methods(called_method_info, method_relation_map, imports_filter)
+            if called_possible:
+                called_method_info[MethodKeys.MAY_SOURCE.value] = get_short_method_infos(called_possible)
+            resolved_count += 1
+            file_affected = True
+        if file_affected:
+            affected_files.append(relative_path)
+    return resolved_count, affected_files
@@ -0,0 +1,365 @@
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+from importlib.metadata import version, PackageNotFoundError
+
+from libs_com.file_path import file_is_empty
+from libs_com.utils_json import dump_json
+from php_enums import CacheKeys
+
+# 分析器输出结构的版本号 修改解析结果结构时需要同步增加 使旧缓存失效
+ANALYZER_VERSION = "1"
+
+
+def get_package_version(package_name):
+    try:
+        return version(package_name)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def get_parser_version(language):
+    """组合 tree_sitter|tree_sitter_php|语法ABI|分析器 版本 作为缓存版本标识"""
+    return "|".join([
+        get_package_version("tree_sitter"),
+        get_package_version("tree_sitter_php"),
+        str(getattr(language, "version", "unknown")),
+        ANALYZER_VERSION,
+    ])
+
+
+def get_file_stat(file_path):
+    """获取文件的修改时间和大小"""
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_file_hash(file_path):
+    """计算文件内容的 blake2b 哈希"""
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_bytes_hash(source_bytes):
+    """计算已读取内容的 blake2b 哈希 与 get_file_hash 的结果一致"""
+    return hashlib.blake2b(source_bytes, digest_size=16).hexdigest()
+
+
+def create_cache_entry(file_path, parsed_info, stages=None, source_state=None):
+    """
+    创建单文件缓存信息 stages 为解析时执行的分析阶段
+    source_state 为解析时记录的 {MTIME, SIZE, HASH, TOKENS} 与解析所用的内容一致 为空时重新读取文件
+    """
+    if source_state is None:
+        mtime, size = get_file_stat(file_path)
+        file_hash = get_file_hash(file_path)
+    else:
+        mtime, size = source_state[CacheKeys.MTIME.value], source_state[CacheKeys.SIZE.value]
+        file_hash = source_state[CacheKeys.HASH.value]
+    return {
+        CacheKeys.MTIME.value: mtime,
+        CacheKeys.SIZE.value: size,
+        CacheKeys.HASH.value: file_hash,
+        CacheKeys.PARSED.value: parsed_info,
+        CacheKeys.STAGES.value: list(stages) if stages is not None else None,
+        CacheKeys.TOKENS.value: source_state.get(CacheKeys.TOKENS.value) if source_state else None,
+    }
+
+
+# 二进制缓存文件布局:
+#   [文件头 MAGIC][记录 u32长度+marshal数据]...[索引 marshal数据][文件尾 u64索引偏移 u32索引长度 END_MAGIC]
+# 索引中记录每个文件的 MTIME|SIZE|HASH 以及各 FileInfoKeys 部分的记录偏移, 读取时只解码索引, 解析结果按需加载
+# 格式 2: 解析结果中的字符串已驻留 加载时各文件共享相同的字符串对象
+CACHE_MAGIC = b"PHPCACHE"
+CACHE_END_MAGIC = b"PHPCEND\0"
+CACHE_FORMAT = f"2|py{sys.version_info[0]}.{sys.version_info[1]}|marshal{marshal.version}"
+RECORD_HEADER = struct.Struct("<I")
+CACHE_TRAILER = struct.Struct("<QI8s")
+
+
+def to_marshal_data(value):
+    """将 marshal 不支持的 list|dict 子类(如 IndexedInfos)转换为基础类型"""
+    if isinstance(value, dict):
+        return {key: to_marshal_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_marshal_data(item) for item in value]
+    return value
+
+
+def dumps_record(value):
+    try:
+        return marshal.dumps(value)
+    except ValueError:
+        return marshal.dumps(to_marshal_data(value))
+
+
+class ParseCacheReader:
+    """二进制缓存读取器 通过 mmap 按偏移读取单个文件或单个 FileInfoKeys 部分"""
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.file = open(cache_path, "rb")
+        try:
+            self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.file.close()
+            raise
+        self.index = self.read_index()
+
+    def read_index(self):
+        buffer = self.buffer
+        if len(buffer) < len(CACHE_MAGIC) + CACHE_TRAILER.size or buffer[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+            raise ValueError("不是有效的二进制缓存文件")
+        index_offset, index_length, end_magic = CACHE_TRAILER.unpack_from(buffer, len(buffer) - CACHE_TRAILER.size)
+        if end_magic != CACHE_END_MAGIC or index_offset + index_length > len(buffer) - CACHE_TRAILER.size:
+            raise ValueError("二进制缓存文件不完整")
+        return marshal.loads(buffer[index_offset:index_offset + index_length])
+
+    def read_record_bytes(self, offset):
+        """读取记录的原始字节 包含长度前缀 用于保存时直接复制未变化的记录"""
+        length, = RECORD_HEADER.unpack_from(self.buffer, offset)
+        return self.buffer[offset:offset + RECORD_HEADER.size + length]
+
+    def read_record(self, offset):
+        length, = RECORD_HEADER.unpack_from(self.buffer, offset)
+        start = offset + RECORD_HEADER.size
+        return marshal.loads(self.buffer[start:start + length])
+
+    def load_sections(self, sections: dict, section_keys=None):
+        """加载单个文件的解析结果 section_keys 为需要加载的 FileInfoKeys 值 为空时加载全部"""
+        return {section_key: self.read_record(offset)
+                for section_key, offset in sections.items()
+                if section_keys is None or section_key in section_keys}
+
+    def close(self):
+        if not self.buffer.closed:
+            self.buffer.close()
+        self.file.close()
+
+
+def load_json_parse_cache(cache_path, parser_version):
+    """加载旧版 JSON 格式的缓存 用于兼容升级前生成的缓存文件"""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache_data = json.load(f)
+    except (OSError, ValueError) as error:
+        print(f"\n加载缓存文件失败, 将重新解析:{cache_path} -> {error}")
+        return {}
+
+    if not isinstance(cache_data, dict) or cache_data.get(CacheKeys.VERSION.value) != parser_version:
+        print(f"\n缓存文件版本不一致, 将重新解析:{cache_path}")
+        return {}
+    return cache_data.get(CacheKeys.FILES.value, {})
+
+
+def load_parse_cache(cache_path, parser_version):
+    """
+    加载逐文件缓存 版本不一致或格式不兼容时返回空缓存
+    二进制缓存只加载索引 缓存信息中的解析结果通过 get_entry_parsed_info 按需加载
+    """
+    if file_is_empty(cache_path):
+        return {}
+
+    with open(cache_path, "rb") as f:
+        is_json_cache = f.read(len(CACHE_MAGIC)) != CACHE_MAGIC
+    if is_json_cache:
+        return load_json_parse_cache(cache_path, parser_version)
+
+    try:
+        reader = ParseCacheReader(cache_path)
+    except (OSError, ValueError, EOFError, TypeError) as error:
+        print(f"\n加载缓存文件失败, 将重新解析:{cache_path} -> {error}")
+        return {}
+
+    index = reader.index
+    if index.get(CacheKeys.FORMAT.value) != CACHE_FORMAT or index.get(CacheKeys.VERSION.value) != parser_version:
+        print(f"\n缓存文件版本不一致, 将重新解析:{cache_path}")
+        reader.close()
+        return {}
+
+    cache_entries = index.get(CacheKeys.FILES.value, {})
+    for cache_entry in cache_entries.values():
+        cache_entry[CacheKeys.SOURCE.value] = reader
+    return cache_entries
+
+
+def is_legacy_cache_entries(cache_entries):
+    """判断缓存信息是否来自旧版 JSON 缓存 需要重新保存为二进制格式"""
+    return any(CacheKeys.SOURCE.value not in cache_entry for cache_entry in cache_entries.values())
+
+
+def get_entry_parsed_info(cache_entry, section_keys=None):
+    """获取缓存信息中的解析结果 二进制缓存按需从文件中加载 section_keys 可只加载部分 FileInfoKeys"""
+    parsed_info = cache_entry.get(CacheKeys.PARSED.value)
+    if parsed_info is not None:
+        if section_keys is None:
+            return parsed_info
+        return {key: value for key, value in parsed_info.items() if key in section_keys}
+
+    reader = cache_entry[CacheKeys.SOURCE.value]
+    parsed_info = reader.load_sections(cache_entry[CacheKeys.SECTIONS.value], section_keys)
+    if section_keys is None:
+        cache_entry[CacheKeys.PARSED.value] = parsed_info
+    return parsed_info
+
+
+def get_entry_tokens(cache_entry):
+    """获取缓存信息中的小写标识符列表 二进制缓存按记录偏移加载 未记录时返回 None"""
+    tokens = cache_entry.get(CacheKeys.TOKENS.value)
+    if isinstance(tokens, int):
+        return cache_entry[CacheKeys.SOURCE.value].read_record(tokens)
+    return tokens
+
+
+def save_parse_cache(cache_path, cache_entries, parser_version):
+    """
+    保存逐文件缓存为二进制格式 先写入临时文件再替换 避免中断时损坏原缓存
+    未加载解析结果的缓存直接复制原始记录字节 不做解码
+    """
+    temp_path = f"{cache_path}.tmp"
+    readers = set()
+    try:
+        files_index = {}
+        with open(temp_path, "wb") as f:
+            f.write(CACHE_MAGIC)
+            offset = len(CACHE_MAGIC)
+            for relative_path, cache_entry in cache_entries.items():
+                sections = {}
+                if CacheKeys.SOURCE.value in cache_entry:
+                    readers.add(cache_entry[CacheKeys.SOURCE.value])
+                parsed_info = cache_entry.get(CacheKeys.PARSED.value)
+                if parsed_info is not None:
+                    section_records = ((key, dumps_record(value)) for key, value in parsed_info.items())
+                    section_records = ((key, RECORD_HEADER.pack(len(data)) + data) for key, data in section_records)
+                else:
+                    reader = cache_entry[CacheKeys.SOURCE.value]
+                    section_records = ((key, reader.read_record_bytes(record_offset))
+                                       for key, record_offset in cache_entry[CacheKeys.SECTIONS.value].items())
+
+                for section_key, record in section_records:
+                    f.write(record)
+                    sections[section_key] = offset
+                    offset += len(record)
+
+                # 标识符列表作为独立记录 只有需要时才加载
+                tokens = cache_entry.get(CacheKeys.TOKENS.value)
+                tokens_offset = None
+                if tokens is not None:
+                    if isinstance(tokens, int):
+                        record = cache_entry[CacheKeys.SOURCE.value].read_record_bytes(tokens)
+                    else:
+                        data = dumps_record(tokens)
+                        record = RECORD_HEADER.pack(len(data)) + data
+                    f.write(record)
+                    tokens_offset = offset
+                    offset += len(record)
+
+                files_index[relative_path] = {
+                    CacheKeys.MTIME.value: cache_entry.get(CacheKeys.MTIME.value),
+                    CacheKeys.SIZE.value: cache_entry.get(CacheKeys.SIZE.value),
+                    CacheKeys.HASH.value: cache_entry.get(CacheKeys.HASH.value),
+                    CacheKeys.SECTIONS.value: sections,
+                    CacheKeys.STAGES.value: cache_entry.get(CacheKeys.STAGES.value),
+                    CacheKeys.TOKENS.value: tokens_offset,
+                }
+
+            index_data = marshal.dumps({
+                CacheKeys.FORMAT.value: CACHE_FORMAT,
+                CacheKeys.VERSION.value: parser_version,
+                CacheKeys.FILES.value: files_index,
+            })
+            f.write(index_data)
+            f.write(CACHE_TRAILER.pack(offset, len(index_data), CACHE_END_MAGIC))
+
+        # 替换前关闭旧缓存的映射 windows 下无法替换仍被映射的文件
+        for reader in readers:
+            reader.close()
+        os.replace(temp_path, cache_path)
+        return True, None
+    except (OSError, ValueError) as error:
+        print(f"写入缓存文件发生异常: {cache_path} -> {error}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False, error
+
+
+def export_parse_cache_json(cache_path, output_path, parser_version):
+    """将二进制缓存导出为原有的 JSON 缓存格式 便于查看和兼容旧版本"""
+    cache_entries = load_parse_cache(cache_path, parser_version)
+    files = {}
+    for relative_path, cache_entry in cache_entries.items():
+        files[relative_path] = {
+            CacheKeys.MTIME.value: cache_entry.get(CacheKeys.MTIME.value),
+            CacheKeys.SIZE.value: cache_entry.get(CacheKeys.SIZE.value),
+            CacheKeys.HASH.value: cache_entry.get(CacheKeys.HASH.value),
+            CacheKeys.PARSED.value: get_entry_parsed_info(cache_entry),
+            CacheKeys.STAGES.value: cache_entry.get(CacheKeys.STAGES.value),
+            CacheKeys.TOKENS.value: get_entry_tokens(cache_entry),
+        }
+    cache_data = {
+        CacheKeys.VERSION.value: parser_version,
+        CacheKeys.FILES.value: files,
+    }
+    return dump_json(output_path, cache_data, encoding='utf-8', indent=2, mode="w+")
+
+
+def check_cache_entry(file_path, cache_entry, required_stages=None, require_tokens=False):
+    """
+    检查单文件缓存是否仍然有效
+    缓存执行过的分析阶段需要包含 required_stages 未记录阶段的缓存为全部阶段 require_tokens 时需要包含标识符列表
+    修改时间和大小一致时直接命中, 仅修改时间变化时(如 touch|checkout)通过内容哈希确认
+    """
+    if not cache_entry:
+        return False
+    computed_stages = cache_entry.get(CacheKeys.STAGES.value)
+    if required_stages and computed_stages is not None and not set(required_stages) <= set(computed_stages):
+        return False
+    if require_tokens and cache_entry.get(CacheKeys.TOKENS.value) is None:
+        return False
+    mtime, size = get_file_stat(file_path)
+    if cache_entry.get(CacheKeys.SIZE.value) != size:
+        return False
+    if cache_entry.get(CacheKeys.MTIME.value) == mtime:
+        return True
+    if cache_entry.get(CacheKeys.HASH.value) == get_file_hash(file_path):
+        cache_entry[CacheKeys.MTIME.value] = mtime
+        return True
+    return False
+
+
+def split_cached_files(file_pairs, cache_entries, required_stages=None, require_tokens=False):
+    """
+    将文件划分为 缓存命中 和 需要重新解析 两部分
+    file_pairs: [(绝对路径, 相对路径)]
+    required_stages: 需要的分析阶段 缓存中缺少这些阶段的文件需要重新解析
+    require_tokens: 需要标识符列表 缓存中没有记录的文件需要重新解析
+    返回 (命中的缓存信息{相对路径:缓存}, 需要解析的文件对列表)
+    已删除的文件不会出现在返回的缓存信息中 即自动被淘汰
+    """
+    hit_entries = {}
+    changed_pairs = []
+    for abspath_path, relative_path in file_pairs:
+        cache_entry = cache_entries.get(relative_path)
+        if check_cache_entry(abspath_path, cache_entry, required_stages, require_tokens):
+            hit_entries[relative_path] = cache_entry
+        else:
+            changed_pairs.append((abspath_path, relative_path))
+    return hit_entries, changed_pairs
+
+
+if __name__ == '__main__':
+    # 导出二进制缓存为 JSON: python php_parse_cache.py xxx.parse.cache xxx.parse.cache.json
+    from tree_sitter_uitls import init_php_parser
+
+    if len(sys.argv) != 3:
+        print("用法: python php_parse_cache.py <缓存文件> <导出的JSON文件>")
+        exit()
+    _, LANGUAGE = init_php_parser()
+    export_parse_cache_json(sys.argv[1], sys.argv[2], get_parser_version(LANGUAGE))
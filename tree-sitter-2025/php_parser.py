@@ -1,107 +1,335 @@
 import json
+import os
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 
-from libs_com.file_path import get_root_dir, get_relative_path, file_is_empty, path_is_exist
+from libs_com.file_path import get_root_dir, get_relative_path, path_is_exist
 from libs_com.files_filter import get_php_files
 from libs_com.utils_hash import get_path_hash
 from libs_com.utils_json import dump_json
-from libs_com.utils_process import print_progress
 from php_parser_args import parse_php_parser_args
-from php_class_info import analyze_class_infos
-from php_enums import FileInfoKeys, ClassKeys
-from php_func_info import analyze_direct_method_infos
+from php_enums import FileInfoKeys, ClassKeys, CacheKeys, AnalysisProfile
+from php_instrument import create_file_timer, create_instrumentation
 from php_map_analyze import analyze_methods_relation
-from tree_sitter_uitls import init_php_parser, read_file_to_root
-from php_variable_info import analyze_variable_infos
-from php_dependent_utils import analyse_dependent_infos
+from php_parse_cache import get_parser_version, load_parse_cache, save_parse_cache, split_cached_files, \
+    create_cache_entry, get_entry_parsed_info, is_legacy_cache_entries, get_file_stat, get_bytes_hash, \
+    get_entry_tokens
+from php_pipeline import resolve_stages, run_pipeline, get_stages_sections, project_parsed_info
+from php_scheduler import plan_parse_tasks, run_bounded_tasks, get_current_rss
+from tree_sitter_uitls import init_php_parser, read_file_to_source, use_source_view
+from php_tree_visitor import use_node_index
+from php_sqlite_index import ProjectIndexWriter
+from php_symbols import intern_strings
+
+# 进程池模式下 每个工作进程独立持有的解析器和语言对象
+WORKER_PARSER = None
+WORKER_LANGUAGE = None
+
+
+def init_process_worker():
+    """进程池初始化函数 每个工作进程只构建一次解析器和Language"""
+    global WORKER_PARSER, WORKER_LANGUAGE
+    WORKER_PARSER, WORKER_LANGUAGE = init_php_parser()
+
+
+def parse_php_files_chunk(file_pairs, stages=None, parser=None, language=None, collect_tokens=False):
+    """
+    解析一批文件 仅返回可序列化的 (相对路径, 解析结果, 文件统计, 源码状态) 列表 空结果也返回 用于统计进度
+    parser 为空时使用工作进程持有的解析器 线程池模式下传入共享的解析器
+    """
+    parser = parser or WORKER_PARSER
+    language = language or WORKER_LANGUAGE
+    chunk_results = []
+    for abspath_path, relative_path in file_pairs:
+        file_stats, source_state = {}, {}
+        relative_path, parsed_info = PHPParser.parse_php_file(abspath_path, parser, language, relative_path,
+                                                              file_stats=file_stats, stages=stages,
+                                                              source_state=source_state, collect_tokens=collect_tokens)
+        chunk_results.append((relative_path, parsed_info, file_stats, source_state))
+    return chunk_results
 
 
 class PHPParser:
-    def __init__(self, project_name, project_path):
+    def __init__(self, project_name, project_path, exclude_dirs=None, exclude_globs=None, extensions=None,
+                 use_gitignore=False, scan_workers=1, instrument=None, profile=AnalysisProfile.FULL.value,
+                 memory_limit=None, max_in_flight=None, collect_tokens=False):
         # 初始化解析器
         self.PARSER, self.LANGUAGE = init_php_parser()
+        # 分析配置 symbols|calls|full 或阶段名称列表 决定每个文件执行的分析阶段
+        self.profile = profile
+        self.stages = resolve_stages(profile)
+        # 阶段和文件级别的耗时统计 默认只输出节流的进度条
+        self.instrument = instrument or create_instrumentation()
         self.project_path = project_path
+        # 文件发现配置
+        self.exclude_dirs = exclude_dirs
+        self.exclude_globs = exclude_globs
+        self.extensions = extensions
+        self.use_gitignore = use_gitignore
+        self.scan_workers = scan_workers
+        # 并发解析的调度配置 内存上限(字节)超过时减少在途任务 在途任务数默认为工作者数量的两倍
+        self.memory_limit = memory_limit
+        self.max_in_flight = max_in_flight
+        self.schedule_stats = None
+        # 解析时同时提取源码中的小写标识符 随缓存保存 加载后放入 source_tokens{相对路径: 标识符列表}
+        self.collect_tokens = collect_tokens
+        self.source_tokens = {}
         self.project_root = get_root_dir(project_path)
         self.parsed_cache = f"{project_name}.{get_path_hash(project_path)}.parse.cache"
 
     @staticmethod
-    def parse_php_file(abspath_path, parser, language, relative_path=None):
-        # 解析tree
-        root_node = read_file_to_root(parser, abspath_path)
-        # 解析出基础依赖信息用于函数调用呢
-        dependent_infos = analyse_dependent_infos(language, root_node)
-
-        # 分析函数信息
-        method_infos = analyze_direct_method_infos(parser, language, root_node, dependent_infos)
-        # 分析类信息（在常量分析之后添加）
-        class_infos = analyze_class_infos(language, root_node, dependent_infos)
-        # 分析变量和常量信息 目前没有使用
-        variables_infos = analyze_variable_infos(parser, language, root_node, dependent_infos)
-
-        # 结果信息
-        parsed_info = {
-            FileInfoKeys.METHOD_INFOS.value: method_infos,
-            FileInfoKeys.CLASS_INFOS.value: class_infos,
-            FileInfoKeys.VARIABLE_INFOS.value: variables_infos,
-            FileInfoKeys.DEPEND_INFOS.value: dependent_infos,
-        }
+    def parse_php_file(abspath_path, parser, language, relative_path=None, single_pass=True, file_stats=None,
+                       stages=None, source_state=None, collect_tokens=False):
+        """
+        file_stats 不为 None 时记录各分析阶段耗时|字节数|节点数 stages 为需要执行的分析阶段 默认全部
+        source_state 不为 None 时记录解析所用内容的 MTIME|SIZE|HASH 用于生成缓存信息
+        collect_tokens 时 source_state 中同时记录从同一份字节中提取的小写标识符 TOKENS
+        """
+        file_timer = create_file_timer(file_stats)
+        stages = stages or resolve_stages()
+        # 读取前获取修改时间和大小 读取期间文件被修改时 记录的状态只会比内容更旧 下次分析时按哈希重新确认
+        if source_state is not None:
+            source_state[CacheKeys.MTIME.value], source_state[CacheKeys.SIZE.value] = get_file_stat(abspath_path)
+        # 解析tree 节点文本都从同一份源码字节中按范围解码
+        root_node, source_view = read_file_to_source(parser, abspath_path)
+        if source_state is not None:
+            source_state[CacheKeys.HASH.value] = get_bytes_hash(source_view.buffer)
+            if collect_tokens:
+                source_state[CacheKeys.TOKENS.value] = source_view.get_identifiers()
+        file_timer.lap("read_parse")
+        # 单次遍历建立节点索引 后续分析器的查询都从索引中匹配 single_pass=False 时保留原有的多次查询路径
+        with use_source_view(source_view), use_node_index(root_node, enabled=single_pass) as node_index:
+            file_timer.lap("node_index")
+            # 按分析配置依次执行 依赖信息|函数|类|调用点|变量 等分析阶段
+            parsed_info = run_pipeline(parser, language, root_node, stages, file_timer)
+        file_timer.finish(file_stats, root_node.end_byte, node_index.visit_count if node_index else None)
 
         if relative_path is None:
             relative_path = abspath_path
         return relative_path, parsed_info
 
-    def parse_php_files_threads(self, php_files, workers=None):
+    def get_result_handler(self, total, sink=None):
+        """
+        解析结果的接收函数 每个文件完成后立即记录统计并交给 sink(相对路径, 解析结果, 源码状态)
+        未指定 sink 时收集到字典中 返回 (结果字典, 接收函数)
+        """
         parse_infos = {}
-        # 使用多线程解析文件
+        start_time = time.time()
+        completed = 0
+
+        def handle_result(relative_path, parsed_info, file_stats, source_state):
+            nonlocal completed
+            completed += 1
+            self.instrument.progress(completed, total, start_time)
+            if not parsed_info:
+                return
+            self.instrument.add_file_stats(relative_path, file_stats)
+            if sink:
+                sink(relative_path, parsed_info, source_state)
+            else:
+                parse_infos[relative_path] = parsed_info
+        return parse_infos, handle_result
+
+    def get_file_pairs(self, php_files):
+        return [(file, get_relative_path(file, self.project_root)) for file in php_files]
+
+    def run_parse_tasks(self, executor, task_func, php_files, workers, chunk_size, sink):
+        """按文件大小降序切分任务块 限制在途任务数量提交到执行器 返回未指定 sink 时收集的结果"""
+        parse_infos, handle_result = self.get_result_handler(len(php_files), sink)
+
+        def handle_chunk(chunk_results):
+            for chunk_result in chunk_results:
+                handle_result(*chunk_result)
+
+        # 每个工作者至少分到多个任务块 便于负载均衡 同时减少任务调度和进程间通信次数
+        if not chunk_size:
+            chunk_size = max(1, min(64, len(php_files) // (workers * 4)))
+        tasks = plan_parse_tasks(self.get_file_pairs(php_files), max_files=chunk_size)
+        # 在途任务保持在工作者数量的两倍 工作者完成后立即有下一个任务 同时不会一次性创建全部 Future
+        max_in_flight = self.max_in_flight or workers * 2
+        self.schedule_stats = run_bounded_tasks(lambda task: executor.submit(task_func, task), tasks, handle_chunk,
+                                                max_in_flight, memory_limit=self.memory_limit)
+        return parse_infos
+
+    def parse_php_files_threads(self, php_files, workers=None, chunk_size=None, sink=None):
+        """使用多线程解析文件 解析器由各线程共享"""
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
         with ThreadPoolExecutor(max_workers=workers) as executor:
-            # 提交任务到线程池
-            start_time = time.time()
-            futures = [executor.submit(
-                self.parse_php_file,file, self.PARSER, self.LANGUAGE, get_relative_path(file, self.project_root))
-                       for file in php_files]
-            for index, future in enumerate(as_completed(futures), start=1):
-                relative_path, parsed_info = future.result()
-                print_progress(index, len(php_files), start_time)
-                if parsed_info:
-                    parse_infos[relative_path] = parsed_info
+            task_func = partial(parse_php_files_chunk, stages=self.stages, parser=self.PARSER, language=self.LANGUAGE,
+                                collect_tokens=self.collect_tokens)
+            return self.run_parse_tasks(executor, task_func, php_files, workers, chunk_size, sink)
+
+    def parse_php_files_process(self, php_files, workers=None, chunk_size=None, sink=None):
+        """使用多进程解析文件 绕开GIL限制 每个进程拥有独立的解析器"""
+        if not php_files:
+            return {}
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_process_worker) as executor:
+            task_func = partial(parse_php_files_chunk, stages=self.stages, collect_tokens=self.collect_tokens)
+            return self.run_parse_tasks(executor, task_func, php_files, workers, chunk_size, sink)
+
+    def parse_php_files_single(self, php_files, sink=None):
+        parse_infos, handle_result = self.get_result_handler(len(php_files), sink)
+        for file, relative_path in self.get_file_pairs(php_files):
+            file_stats, source_state = {}, {}
+            relative_path, parsed_info = self.parse_php_file(file, self.PARSER, self.LANGUAGE, relative_path,
+                                                             file_stats=file_stats, stages=self.stages,
+                                                             source_state=source_state,
+                                                             collect_tokens=self.collect_tokens)
+            handle_result(relative_path, parsed_info, file_stats, source_state)
         return parse_infos
 
-    def parse_php_files_single(self, php_files):
-        parse_infos = {}
+    def parse_php_files(self, php_files, workers=None, executor="thread", chunk_size=None, sink=None):
+        """按配置的并发模式解析文件 sink 不为空时每个文件完成后立即交给 sink 处理 不再收集结果"""
+        if workers == 1:
+            return self.parse_php_files_single(php_files, sink=sink)
+        elif executor == "process":
+            return self.parse_php_files_process(php_files, workers=workers, chunk_size=chunk_size, sink=sink)
+        else:
+            return self.parse_php_files_threads(php_files, workers=workers, chunk_size=chunk_size, sink=sink)
+
+    def get_php_files(self):
+        """按文件发现配置扫描项目文件"""
+        return get_php_files(self.project_path, exclude_dirs=self.exclude_dirs, exclude_globs=self.exclude_globs,
+                             extensions=self.extensions, use_gitignore=self.use_gitignore, workers=self.scan_workers)
+
+    def load_parsed_infos(self, save_cache=True, workers=None, executor="thread", chunk_size=None, index_writer=None):
+        """扫描项目文件 命中缓存的文件直接加载 其余文件重新解析 返回未补充函数关系的原始解析结果"""
         start_time = time.time()
-        for index, file in enumerate(php_files, start=1):
-            relative_path, parsed_info = self.parse_php_file(file,self.PARSER, self.LANGUAGE, get_relative_path(file, self.project_root))
-            print_progress(index, len(php_files), start_time)
-            if parsed_info:
-                parse_infos[relative_path] = parsed_info
-        return parse_infos
+        self.instrument.start()
+        with self.instrument.stage("discovery"):
+            php_files = self.get_php_files()
+        print(f"\n扫描到PHP文件:{len(php_files)} 用时:{time.time() - start_time:.1f} 秒")
+        file_pairs = [(file, get_relative_path(file, self.project_root)) for file in php_files]
+
+        # 加载逐文件缓存 仅重新解析内容发生变化的文件 已删除的文件自动淘汰
+        with self.instrument.stage("cache_load"):
+            parser_version = get_parser_version(self.LANGUAGE)
+            cache_entries = load_parse_cache(self.parsed_cache, parser_version)
+            # 缓存中缺少当前配置所需分析阶段的文件需要重新解析
+            hit_entries, changed_pairs = split_cached_files(file_pairs, cache_entries, self.stages,
+                                                            require_tokens=self.collect_tokens)
+        evicted_count = len(set(cache_entries) - set(relative_path for _, relative_path in file_pairs))
+        self.instrument.add_cache_stats("parse_cache", len(hit_entries), len(changed_pairs))
+        print(f"\n加载缓存分析结果文件:->{self.parsed_cache} 命中:{len(hit_entries)} "
+              f"需解析:{len(changed_pairs)} 淘汰:{evicted_count}")
+
+        changed_files = [abspath_path for abspath_path, _ in changed_pairs]
+        changed_abspaths = {relative_path: abspath_path for abspath_path, relative_path in changed_pairs}
+        changed_entries = {}
 
+        def add_changed_info(relative_path, parsed_info, source_state):
+            # 每个文件完成后立即驻留字符串并生成缓存信息 命中缓存的结果在加载时已经共享字符串对象
+            # 缓存中的修改时间|大小|哈希使用解析时记录的状态 不重新读取文件
+            intern_strings(parsed_info)
+            changed_entries[relative_path] = create_cache_entry(changed_abspaths[relative_path], parsed_info,
+                                                                self.stages, source_state)
+            # 解析完成即写入项目索引 写入器按批次提交 调用关系在全部解析完成后统一写入
+            if index_writer:
+                index_writer.add_parsed_info(relative_path, parsed_info)
 
-    def analyse(self, save_cache=True, workers=None, imports_filter=True):
-        """运行PHP解析器"""
-        #  加载已存在的解析结果
-        if file_is_empty(self.parsed_cache):
-            start_time = time.time()
-            php_files = get_php_files(self.project_path)
-            if workers == 1:
-                parsed_infos = self.parse_php_files_single(php_files)
+        with self.instrument.stage("parse"):
+            self.parse_php_files(changed_files, workers=workers, executor=executor, chunk_size=chunk_size,
+                                 sink=add_changed_info)
+        print(f"\n代码结构初步解析完成  用时:{time.time() - start_time:.1f} 秒")
+
+        # 按文件顺序整理解析结果 保证输出顺序稳定 缓存中只加载当前配置需要的部分
+        section_keys = get_stages_sections(self.stages)
+        parsed_infos = {}
+        new_cache_entries = {}
+        self.source_tokens = {}
+        for abspath_path, relative_path in file_pairs:
+            if relative_path in hit_entries:
+                cache_entry = hit_entries[relative_path]
+            elif relative_path in changed_entries:
+                cache_entry = changed_entries[relative_path]
             else:
-                parsed_infos = self.parse_php_files_threads(php_files, workers=workers)
-            print(f"\n代码结构初步解析完成  用时:{time.time() - start_time:.1f} 秒")
-            if save_cache:
-                dump_json(self.parsed_cache, parsed_infos, encoding='utf-8', indent=2, mode="w+")
-        else:
-            print(f"\n加载缓存分析结果文件:->{self.parsed_cache}")
-            parsed_infos = json.load(open(self.parsed_cache, "r", encoding="utf-8"))
+                continue
+            new_cache_entries[relative_path] = cache_entry
+            parsed_info = get_entry_parsed_info(cache_entry, section_keys)
+            if relative_path in hit_entries:
+                # 缓存可能由包含更多阶段的配置生成 裁剪后与直接按当前配置解析的结果一致
+                parsed_info = project_parsed_info(parsed_info, self.stages, cache_entry.get(CacheKeys.STAGES.value))
+            parsed_infos[relative_path] = parsed_info
+            if self.collect_tokens:
+                self.source_tokens[relative_path] = get_entry_tokens(cache_entry)
+            # 重新解析的文件已在解析时写入
+            if index_writer and relative_path in hit_entries:
+                index_writer.add_parsed_info(relative_path, parsed_info)
+
+        # 旧版 JSON 缓存在首次加载后即转换为二进制格式
+        if save_cache and (changed_pairs or evicted_count or not cache_entries or is_legacy_cache_entries(cache_entries)):
+            with self.instrument.stage("cache_save"):
+                save_parse_cache(self.parsed_cache, new_cache_entries, parser_version)
+        return parsed_infos
+
+    def analyse(self, save_cache=True, workers=None, imports_filter=True, executor="thread", chunk_size=None,
+                sqlite_path=None):
+        """运行PHP解析器 executor 可选 thread|process sqlite_path 不为空时同时写入 SQLite 项目索引"""
+        index_writer = ProjectIndexWriter(sqlite_path) if sqlite_path else None
+        parsed_infos = self.load_parsed_infos(save_cache=save_cache, workers=workers, executor=executor,
+                                              chunk_size=chunk_size, index_writer=index_writer)
 
         # 补充函数调用信息
         start_time = time.time()
-        analyze_infos = analyze_methods_relation(parsed_infos, imports_filter)
+        analyze_infos = analyze_methods_relation(parsed_infos, imports_filter, workers, instrument=self.instrument)
         print(f"\n补充函数调用信息完成 用时: {time.time() - start_time:.1f} 秒")
+
+        if index_writer:
+            with self.instrument.stage("sqlite_index"):
+                index_writer.add_resolved_edges(analyze_infos)
+                index_writer.close()
+            print(f"\nSQLite项目索引写入完成:->{sqlite_path}")
         return analyze_infos
 
 
+# 分析结果按信息类型分别输出
+OUTPUT_INFO_TYPES = [
+    FileInfoKeys.VARIABLE_INFOS.value,
+    FileInfoKeys.DEPEND_INFOS.value,
+    FileInfoKeys.METHOD_INFOS.value,
+    FileInfoKeys.CLASS_INFOS.value,
+]
+
+
+def get_output_file_infos(parsed_info: dict, info_type: str):
+    """获取单个文件指定类型的输出信息"""
+    curr_file_infos = parsed_info.get(info_type, None)
+    # 当获取方法信息时，往信息中补充类方法信息 使用新列表 不修改解析结果
+    if info_type == FileInfoKeys.METHOD_INFOS.value:
+        curr_file_infos = list(curr_file_infos or [])
+        for class_info in parsed_info.get(FileInfoKeys.CLASS_INFOS.value, []):
+            curr_file_infos.extend(class_info.get(ClassKeys.METHODS.value, []))
+    return curr_file_infos
+
+
+def write_output_file(output_file: str, write_func):
+    """先写入临时文件再替换 避免读取到不完整的结果"""
+    with open(f"{output_file}.tmp", 'w', encoding='utf-8') as f:
+        write_func(f)
+    os.replace(f"{output_file}.tmp", output_file)
+
+
+def save_parsed_outputs(parsed_infos: dict, output_prefix: str):
+    """按信息类型分别保存分析结果 {output_prefix}.{信息类型}.json"""
+    # 按类型处理并保存，避免一次性存储所有数据
+    output_files = []
+    for info_type in OUTPUT_INFO_TYPES:
+        curr_type_infos = {}
+        for relative_path, parsed_info in parsed_infos.items():
+            curr_file_infos = get_output_file_infos(parsed_info, info_type)
+            if curr_file_infos:
+                curr_type_infos[relative_path] = curr_file_infos
+
+        # 立即写入文件并释放内存
+        output_file = f"{output_prefix}.{info_type}.json"
+        write_output_file(output_file, lambda f: json.dump(curr_type_infos, f, ensure_ascii=False, indent=2))
+        output_files.append(output_file)
+        del curr_type_infos  # 显式释放内存（可选）
+    return output_files
+
+
 if __name__ == '__main__':
     args = parse_php_parser_args()
 
@@ -114,46 +342,50 @@ if __name__ == '__main__':
     workers = args.workers
     save_cache = args.save_cache
     imports_filter = args.imports_filter
+    executor = args.executor
+    chunk_size = args.chunk_size
+    sqlite_path = args.sqlite_index
+    if args.memory_limit and get_current_rss() is None:
+        print("[!] 当前平台无法获取进程的当前内存 内存上限不生效")
 
     # project_name = "default_project"
     # project_path = r"C:\phps\WWW\TestCode\EcShopBenTengAppSample"
-    php_parser = PHPParser(project_name=project_name, project_path=project_path)
-    parsed_infos = php_parser.analyse(save_cache=save_cache, workers=workers, imports_filter=imports_filter)
-
-    # 定义要处理的信息类型
-    info_types = {
-        'variable': FileInfoKeys.VARIABLE_INFOS.value,
-        'depend': FileInfoKeys.DEPEND_INFOS.value,
-        'method': FileInfoKeys.METHOD_INFOS.value,
-        'class': FileInfoKeys.CLASS_INFOS.value
-    }
-
-    # 定义要处理的信息类型
-    info_types = [
-        FileInfoKeys.VARIABLE_INFOS.value,
-        FileInfoKeys.DEPEND_INFOS.value,
-        FileInfoKeys.METHOD_INFOS.value,
-        FileInfoKeys.CLASS_INFOS.value,
-    ]
+    php_parser = PHPParser(project_name=project_name, project_path=project_path, exclude_dirs=args.exclude_dir,
+                           exclude_globs=args.exclude_glob, extensions=args.extensions,
+                           use_gitignore=args.use_gitignore, scan_workers=args.scan_workers, profile=args.profile,
+                           memory_limit=args.memory_limit * 1024 * 1024 if args.memory_limit else None,
+                           max_in_flight=args.max_in_flight,
+                           instrument=create_instrumentation(progress=args.progress, report_path=args.report,
+                                                             top_files=args.top_files, trace_malloc=args.trace_malloc))
+    output_prefix = args.output or f"{project_name}.parsed"
+    if args.watch:
+        # 监听模式 常驻内存 文件变更后增量更新分析结果 暂不更新 SQLite 项目索引
+        from php_watch import run_watch
+        run_watch(php_parser, output_prefix, save_cache=save_cache, workers=workers, imports_filter=imports_filter,
+                  executor=executor, chunk_size=chunk_size, poll_interval=args.poll_interval, listen=args.serve)
+        exit()
 
-    # 按类型处理并保存，避免一次性存储所有数据
-    for info_type in info_types:
-        curr_type_infos = {}
-        for relative_path, parsed_info in parsed_infos.items():
-            curr_file_infos = parsed_info.get(info_type, None)
-            # 当获取方法信息时 进行额外处理
-            if info_type == FileInfoKeys.METHOD_INFOS.value:
-                # 当获取方法信息时，往信息中补充类方法信息
-                for class_info in parsed_info.get(FileInfoKeys.CLASS_INFOS.value, []):
-                    class_method_infos = class_info.get(ClassKeys.METHODS.value, [])
-                    curr_file_infos.extend(class_method_infos)
+    parsed_infos = php_parser.analyse(save_cache=save_cache, workers=workers, imports_filter=imports_filter,
+                                      executor=executor, chunk_size=chunk_size, sqlite_path=sqlite_path)
 
-            if curr_file_infos:
-                curr_type_infos[relative_path] = curr_file_infos
+    with php_parser.instrument.stage("save_outputs"):
+        save_parsed_outputs(parsed_infos, output_prefix)
 
-        # 立即写入文件并释放内存
-        output_file = f"{args.output}.{info_type}.json" if args.output else f"{project_name}.parsed.{info_type}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(curr_type_infos, f, ensure_ascii=False, indent=2)
-        del curr_type_infos  # 显式释放内存（可选）
+    if args.call_graph:
+        from php_call_graph import CompactCallGraph
+        with php_parser.instrument.stage("call_graph"):
+            call_graph = CompactCallGraph.from_parsed_infos(parsed_infos)
+            call_graph.save(args.call_graph)
+        print(f"\n压缩调用图保存完成:->{args.call_graph} 方法:{call_graph.nodes_num} 调用边:{call_graph.edges_num}")
+
+    php_parser.instrument.finish()
 
+    if args.serve:
+        # 常驻查询服务 一次构建调用图索引 持续响应查询
+        from php_query_server import CallGraphIndex, create_query_server
+        query_server = create_query_server(CallGraphIndex.from_parsed_infos(parsed_infos), args.serve)
+        print(f"\n调用图查询服务已启动: {args.serve} {query_server.index.get_stats()}")
+        try:
+            query_server.serve_forever()
+        except KeyboardInterrupt:
+            query_server.server_close()
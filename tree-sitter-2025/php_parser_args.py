@@ -8,12 +8,33 @@ def parse_php_parser_args():
     parser.add_argument('-n', '--project-name', default='default_project', help='项目名称 影响输出分析结果文件名')
     # 性能配置 线程树为1时不启动多线程, 可用于错误调试
     parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='线程数 (默认: CPU 核心数)')
+    parser.add_argument('-x', '--executor', default='thread', choices=['thread', 'process'],
+                        help='并发解析模式 thread:线程池 process:进程池(多核并行) (默认: thread)')
+    parser.add_argument('-c', '--chunk-size', type=int, default=None, help='每个任务块最多包含的文件数 小文件合并为一个任务块 大文件单独解析 (默认: 自动计算)')
+    parser.add_argument('-I', '--max-in-flight', type=int, default=None, help='同时提交到执行器的最大任务块数 (默认: 工作者数量的两倍)')
+    parser.add_argument('-m', '--memory-limit', type=int, default=None, help='解析时主进程内存上限(MB) 超过时减少在途任务 仅 linux 下生效 (默认: 不限制)')
     parser.add_argument('-o', '--output', default=None, help='分析结果文件路径 (默认: {project}_result.json)')
+    parser.add_argument('-d', '--sqlite-index', default=None, help='同时写入SQLite项目索引的文件路径 用于快速查询调用关系 (默认: 不写入)')
+    # 监听模式
+    parser.add_argument('-W', '--watch', action='store_true', default=False, help='常驻监听项目文件变更 增量更新分析结果 (默认: False)')
+    parser.add_argument('-P', '--poll-interval', type=float, default=1.0, help='监听模式下 inotify 不可用时的轮询间隔秒数 (默认: 1.0)')
+    parser.add_argument('-G', '--call-graph', default=None, help='同时保存压缩调用图的文件路径 用于 php_call_graph.py 快速查询可达方法 (默认: 不保存)')
+    parser.add_argument('-S', '--serve', default=None, help='分析完成后启动调用图查询服务 监听地址 host:port 或 unix:/path/to/socket (默认: 不启动)')
     # 性能配置
     parser.add_argument('-s', '--save-cache', action='store_false', default=True, help='缓存解析结果 (默认: True)!!!')
+    parser.add_argument('-b', '--progress', default='bar', choices=['bar', 'none'], help='解析进度输出方式 bar:节流刷新的进度条 none:不输出 (默认: bar)')
+    parser.add_argument('-R', '--report', default=None, help='运行报告JSON文件路径 包含阶段|分析器耗时 缓存命中率 最慢文件 (默认: 不输出)')
+    parser.add_argument('-T', '--top-files', type=int, default=20, help='运行结束时输出解析最慢的文件数量 (默认: 20)')
+    parser.add_argument('-M', '--trace-malloc', action='store_true', default=False, help='记录每个文件解析时的内存峰值 会明显降低速度 (默认: False)')
+    parser.add_argument('-A', '--profile', default='full', choices=['symbols', 'calls', 'full'],
+                        help='分析配置 symbols:只提取函数和类定义 calls:定义和调用点 full:同时分析变量和常量 (默认: full)')
     parser.add_argument('-f', '--imports-filter', action='store_false', default=True, help='分析时被调用方法启用导入信息过滤 (默认: True)!!!')
 
     # 过滤配置
     parser.add_argument('-e', '--exclude-dir', nargs='+', default=[], help='排除目录路径关键字列表, 支持部分路径和完整路径 (例如: test/ build/)')
+    parser.add_argument('-g', '--exclude-glob', nargs='+', default=[], help='排除文件或目录的通配符规则列表 (例如: *.tpl.php cache/*)')
+    parser.add_argument('-t', '--extensions', nargs='+', default=['.php'], help='扫描的PHP文件后缀列表 (默认: .php 例如: .php .phtml .inc)')
+    parser.add_argument('-i', '--use-gitignore', action='store_true', default=False, help='扫描文件时遵循项目中的 .gitignore 规则 (默认: False)')
+    parser.add_argument('-a', '--scan-workers', type=int, default=1, help='并行扫描目录的线程数 NFS等高延迟文件系统建议调大 (默认: 1)')
     args = parser.parse_args()
     return args
\ No newline at end of file
@@ -0,0 +1,178 @@
+from typing import NamedTuple, Callable, Tuple
+
+from php_class_info import analyze_class_infos
+from php_dependent_utils import analyse_dependent_infos, AnalysisContext
+from php_enums import AnalysisStage, AnalysisProfile, FileInfoKeys, MethodKeys, ClassKeys, OtherName
+from php_func_info import analyze_direct_method_infos
+from php_func_utils import get_global_code_info, query_method_called_methods, parse_global_code_called_methods
+from php_variable_info import analyze_variable_infos
+
+
+class PipelineStage(NamedTuple):
+    """单文件分析流水线的阶段 run(state) 将结果写入分析状态 section 为阶段输出到解析结果中的 FileInfoKeys"""
+    name: str
+    requires: Tuple[str, ...]
+    run: Callable
+    section: str = None
+
+
+class AnalysisState:
+    """单个文件在流水线各阶段之间传递的中间结果"""
+
+    def __init__(self, parser, language, root_node):
+        self.parser = parser
+        self.language = language
+        self.root_node = root_node
+        self.analysis_context = None
+        self.global_code_info = None
+        # 调用点阶段需要补充的 (方法信息, 方法体节点)
+        self.called_bodies = []
+        # FileInfoKeys -> 阶段输出
+        self.sections = {}
+
+
+def run_dependent_stage(state: AnalysisState):
+    # 名称集合|范围索引|对象创建信息等只计算一次 所有分析器共享
+    state.analysis_context = AnalysisContext(analyse_dependent_infos(state.language, state.root_node))
+    state.sections[FileInfoKeys.DEPEND_INFOS.value] = state.analysis_context.dependent_infos
+
+
+def run_global_code_stage(state: AnalysisState):
+    # 提取全局代码块 由函数调用分析和变量分析共享
+    state.global_code_info = get_global_code_info(state.language, state.root_node)
+
+
+def run_methods_stage(state: AnalysisState):
+    state.sections[FileInfoKeys.METHOD_INFOS.value] = analyze_direct_method_infos(
+        state.parser, state.language, state.root_node, state.analysis_context, called_bodies=state.called_bodies)
+
+
+def run_classes_stage(state: AnalysisState):
+    state.sections[FileInfoKeys.CLASS_INFOS.value] = analyze_class_infos(
+        state.language, state.root_node, state.analysis_context, called_bodies=state.called_bodies)
+
+
+def run_calls_stage(state: AnalysisState):
+    """补充函数和类方法的调用信息 全局代码中的调用作为一个虚拟函数追加到函数列表末尾"""
+    for method_info, body_node in state.called_bodies:
+        method_info[MethodKeys.CALLED_METHODS.value] = query_method_called_methods(state.language, body_node,
+                                                                                  state.analysis_context)
+    global_method_info = parse_global_code_called_methods(state.parser, state.language, state.root_node,
+                                                          state.analysis_context, state.global_code_info)
+    if global_method_info:
+        state.sections[FileInfoKeys.METHOD_INFOS.value].append(global_method_info)
+
+
+def run_variables_stage(state: AnalysisState):
+    state.sections[FileInfoKeys.VARIABLE_INFOS.value] = analyze_variable_infos(
+        state.parser, state.language, state.root_node, state.analysis_context, state.global_code_info)
+
+
+# 阶段名称 -> 阶段 按注册顺序执行 注册时依赖的阶段必须已经注册 因此注册顺序即为执行顺序
+PIPELINE_STAGES = {}
+
+
+def register_stage(stage: PipelineStage):
+    """注册分析阶段 可用于扩展自定义分析器"""
+    missing = [name for name in stage.requires if name not in PIPELINE_STAGES]
+    if missing:
+        raise ValueError(f"分析阶段[{stage.name}]依赖的阶段尚未注册:{missing}")
+    PIPELINE_STAGES[stage.name] = stage
+    return stage
+
+
+register_stage(PipelineStage(AnalysisStage.DEPENDENT.value, (), run_dependent_stage, FileInfoKeys.DEPEND_INFOS.value))
+register_stage(PipelineStage(AnalysisStage.GLOBAL_CODE.value, (), run_global_code_stage))
+register_stage(PipelineStage(AnalysisStage.METHODS.value, (AnalysisStage.DEPENDENT.value,), run_methods_stage,
+                             FileInfoKeys.METHOD_INFOS.value))
+register_stage(PipelineStage(AnalysisStage.CLASSES.value, (AnalysisStage.DEPENDENT.value,), run_classes_stage,
+                             FileInfoKeys.CLASS_INFOS.value))
+register_stage(PipelineStage(AnalysisStage.CALLS.value, (AnalysisStage.METHODS.value, AnalysisStage.CLASSES.value,
+                                                         AnalysisStage.GLOBAL_CODE.value), run_calls_stage))
+register_stage(PipelineStage(AnalysisStage.VARIABLES.value, (AnalysisStage.GLOBAL_CODE.value,), run_variables_stage,
+                             FileInfoKeys.VARIABLE_INFOS.value))
+
+# 分析配置 -> 需要的阶段 依赖的阶段自动加入
+PROFILE_STAGES = {
+    AnalysisProfile.SYMBOLS.value: (AnalysisStage.METHODS.value, AnalysisStage.CLASSES.value),
+    AnalysisProfile.CALLS.value: (AnalysisStage.CALLS.value,),
+    AnalysisProfile.FULL.value: (AnalysisStage.CALLS.value, AnalysisStage.VARIABLES.value),
+}
+
+# 解析结果中各部分的输出顺序 与原有结果保持一致 自定义阶段的输出排在最后
+SECTION_ORDER = [
+    FileInfoKeys.METHOD_INFOS.value,
+    FileInfoKeys.CLASS_INFOS.value,
+    FileInfoKeys.VARIABLE_INFOS.value,
+    FileInfoKeys.DEPEND_INFOS.value,
+]
+
+
+def resolve_stages(profile=AnalysisProfile.FULL.value) -> Tuple[str, ...]:
+    """获取分析配置需要执行的阶段 按执行顺序返回 profile 也可以是阶段名称列表"""
+    if profile is None:
+        profile = AnalysisProfile.FULL.value
+    if isinstance(profile, str):
+        if profile not in PROFILE_STAGES:
+            raise ValueError(f"未知的分析配置:{profile} 可选:{list(PROFILE_STAGES)}")
+        profile = PROFILE_STAGES[profile]
+
+    required = set()
+    pending = list(profile)
+    while pending:
+        name = pending.pop()
+        if name not in PIPELINE_STAGES:
+            raise ValueError(f"未知的分析阶段:{name} 可选:{list(PIPELINE_STAGES)}")
+        if name not in required:
+            required.add(name)
+            pending.extend(PIPELINE_STAGES[name].requires)
+    return tuple(name for name in PIPELINE_STAGES if name in required)
+
+
+def get_stages_sections(stages):
+    """获取阶段输出的解析结果部分 用于只加载缓存中需要的部分 包含全部阶段时返回 None 即加载全部"""
+    if set(stages) >= set(PIPELINE_STAGES):
+        return None
+    return {PIPELINE_STAGES[name].section for name in stages if PIPELINE_STAGES[name].section}
+
+
+def strip_called_methods(method_info: dict):
+    return {**method_info, MethodKeys.CALLED_METHODS.value: []}
+
+
+def project_parsed_info(parsed_info: dict, stages, computed_stages=None) -> dict:
+    """
+    将执行过更多阶段的解析结果(如 full 配置的缓存)裁剪为只执行 stages 时的输出 computed_stages 为 None 表示执行过全部阶段
+    未执行阶段的输出部分已由 get_stages_sections 排除 这里处理写入函数和类信息内部的调用点 及追加的全局代码虚拟函数
+    不修改原解析结果 被裁剪的方法|类信息为浅拷贝
+    """
+    if computed_stages is None:
+        computed_stages = PIPELINE_STAGES
+    if AnalysisStage.CALLS.value in stages or AnalysisStage.CALLS.value not in computed_stages:
+        return parsed_info
+
+    projected_info = dict(parsed_info)
+    method_infos = parsed_info.get(FileInfoKeys.METHOD_INFOS.value)
+    if method_infos is not None:
+        # 全局代码虚拟函数由调用点阶段追加在函数列表末尾
+        if method_infos and method_infos[-1].get(MethodKeys.NAME.value) == OtherName.NOT_IN_METHOD.value:
+            method_infos = method_infos[:-1]
+        projected_info[FileInfoKeys.METHOD_INFOS.value] = [strip_called_methods(info) for info in method_infos]
+    class_infos = parsed_info.get(FileInfoKeys.CLASS_INFOS.value)
+    if class_infos is not None:
+        projected_info[FileInfoKeys.CLASS_INFOS.value] = [
+            {**class_info, ClassKeys.METHODS.value: [strip_called_methods(info)
+                                                     for info in class_info.get(ClassKeys.METHODS.value) or []]}
+            for class_info in class_infos]
+    return projected_info
+
+
+def run_pipeline(parser, language, root_node, stages, file_timer) -> dict:
+    """按顺序执行分析阶段 每个阶段单独计时 返回解析结果"""
+    state = AnalysisState(parser, language, root_node)
+    for name in stages:
+        PIPELINE_STAGES[name].run(state)
+        file_timer.lap(name)
+    parsed_info = {section: state.sections[section] for section in SECTION_ORDER if section in state.sections}
+    parsed_info.update(state.sections)
+    return parsed_info
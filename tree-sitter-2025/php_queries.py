@@ -0,0 +1,139 @@
+# 所有分析器使用的 tree-sitter 查询语句
+# 统一在此定义 便于按 Language 只编译一次, 以及由单次遍历引擎(php_tree_visitor)按节点类型进行等价匹配
+
+# 类和接口定义 php_basic_define_infos.query_classes_define_infos
+CLASS_DEFINE_QUERY = """
+    ;匹配普通|抽象|final类定义信息
+    (class_declaration
+        name: (name) @class.name
+    ) @class.def
+
+    ;匹配接口类定义信息
+    (interface_declaration
+        name: (name) @class.name
+    ) @class.def
+"""
+
+# 全局函数定义 php_basic_define_infos.query_methods_define_infos
+FUNCTION_DEFINE_QUERY = """
+    (function_definition
+        name: (name) @function.name
+    ) @function.def
+"""
+
+# 命名空间定义 php_basic_define_infos.query_namespace_define_infos
+NAMESPACE_DEFINE_QUERY = """
+    ;匹配命名空间定义信息
+    (namespace_definition
+        name: (namespace_name) @namespace_name
+    ) @namespace.def
+"""
+
+# 参数传递的类对象 php_basic_create_object.query_params_named_type_infos
+PARAMS_NAMED_TYPE_QUERY = """
+    ; 查询参数传递 部分情况下类对象走的是参数传递
+    (simple_parameter
+        type: (named_type)
+        name: (variable_name)
+    )@parameters
+"""
+
+# 类对象创建 php_basic_create_object.query_create_object_infos
+CREATE_OBJECT_QUERY = """
+    ; 查询对象方法创建 同时获取返回值
+    (assignment_expression
+        left: (variable_name)
+        right: ((object_creation_expression))
+    ) @assignment_expr
+"""
+
+# use 导入 php_basic_import_infos.get_use_declarations
+USE_DECLARATION_QUERY = "(namespace_use_declaration) @use_declaration"
+
+# include|require 导入 php_basic_import_infos.get_include_require_info
+INCLUDE_REQUIRE_QUERY = """
+    (include_expression) @import_expression
+
+    (include_once_expression) @import_expression
+
+    (require_expression) @import_expression
+
+    (require_once_expression) @import_expression
+"""
+
+# 类定义信息 php_class_info.analyze_class_infos
+CLASS_INFO_QUERY = """
+    ;匹配类定义信息 含abstract类和final类
+    (class_declaration) @class.def
+    ;匹配接口定义
+    (interface_declaration) @class.def
+"""
+
+# 全局函数信息 php_func_utils.query_global_methods_info
+GLOBAL_FUNCTION_QUERY = """
+    ; 全局函数定义
+    (function_definition) @function.def
+"""
+
+# 方法体内调用的方法 php_func_utils.query_method_called_methods
+METHOD_CALLED_QUERY = """
+    ;查询常规函数调用
+    (function_call_expression
+            function: (name)
+            arguments: (arguments)
+    ) @function_call
+
+    ;查询对象方法创建
+    (object_creation_expression) @object_creation
+
+    ;查询对象方法调用
+    (member_call_expression) @member_call
+
+    ;查询静态方法调用
+    (scoped_call_expression) @scoped_call
+"""
+
+# 超全局|全局|静态变量 php_variable_info.analyze_variable_infos
+VARIABLE_DECLARE_QUERY = """
+    ;匹配超全局变量访问 比如 $_SERVER['REQUEST_METHOD']
+    (subscript_expression)@super_global_call
+
+    ;全局变量声明 比如 global $globalVar;
+    (global_declaration)@global_declare
+
+    ;静态变量声明 比如 static $staticVar = 0;
+    (function_static_declaration)@static_declare
+"""
+
+# 常量定义 php_variable_info.parse_constants_node
+CONSTANTS_QUERY = """
+    ;define定义信息提取
+    (expression_statement
+        (function_call_expression)
+    )@define_call
+
+    ;const定义信息提取
+    (const_declaration)@const_declare
+"""
+
+# 函数|类方法|闭包定义 php_variable_info.parse_locale_variable_infos
+LOCALE_FUNCTION_QUERY = """
+    ; 查询全局函数定义
+    (function_definition) @function.def
+    ; 查询类方法定义
+    (method_declaration) @method.def
+    ; 匹配闭包定义
+    (anonymous_function) @anonymous.def
+"""
+
+# 变量赋值 php_variable_utils.parse_variable_node
+ASSIGNMENT_QUERY = """
+    ;常规变量赋值 比如 $localVar = 42;
+    (assignment_expression
+        (variable_name)
+        (_) @var_value
+    )@variables
+"""
+
+# 注释 php_coment.remove_comment_nodes
+COMMENT_QUERY = """(comment) @comment_node"""
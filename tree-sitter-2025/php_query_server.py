@@ -0,0 +1,285 @@
+import json
+import os
+import socketserver
+import sys
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from php_call_graph import CompactCallGraph, iter_parsed_methods, iter_resolved_edges
+from php_enums import MethodKeys
+from php_line_index import LineIndex
+from php_sqlite_index import connect_project_index
+from tree_sitter_uitls import custom_format_path
+
+# 查询结果中的方法摘要字段
+METHOD_SUMMARY_KEYS = [
+    MethodKeys.UNIQ_ID.value,
+    MethodKeys.NAME.value,
+    MethodKeys.FULLNAME.value,
+    MethodKeys.CLASS.value,
+    MethodKeys.NAMESPACE.value,
+    MethodKeys.FILE.value,
+    MethodKeys.START.value,
+    MethodKeys.END.value,
+]
+
+# 单次批量查询的最大数量
+MAX_BATCH_QUERIES = 10000
+
+
+class CallGraphIndex:
+    """
+    常驻内存的调用图索引 构建一次后只读 可在多个线程中并发查询
+    正向邻接: 调用方ID -> [(被调用方ID, 调用行号)]  反向邻接: 被调用方ID -> [(调用方ID, 调用行号)]
+    行号均为 tree-sitter 的0起始行号 与解析结果保持一致
+    """
+
+    def __init__(self):
+        self.methods = {}
+        self.callees_map = defaultdict(list)
+        self.callers_map = defaultdict(list)
+        self.name_ids_map = defaultdict(list)
+        self.fullname_ids_map = defaultdict(list)
+        self.namespace_ids_map = defaultdict(list)
+        self.file_methods = defaultdict(list)
+        self.file_line_indexes = {}
+        self.edges_num = 0
+        self.compact_graph = None
+
+    def add_method(self, method_summary: dict):
+        method_id = method_summary[MethodKeys.UNIQ_ID.value]
+        self.methods[method_id] = method_summary
+        self.name_ids_map[method_summary[MethodKeys.NAME.value]].append(method_id)
+        self.fullname_ids_map[method_summary[MethodKeys.FULLNAME.value]].append(method_id)
+        self.namespace_ids_map[method_summary[MethodKeys.NAMESPACE.value]].append(method_id)
+        self.file_methods[method_summary[MethodKeys.FILE.value]].append(method_summary)
+
+    def add_edge(self, caller_id: str, callee_id: str, call_line: int):
+        self.callees_map[caller_id].append((callee_id, call_line))
+        self.callers_map[callee_id].append((caller_id, call_line))
+        self.edges_num += 1
+
+    def finish(self):
+        """构建完成后建立文件行号索引和压缩调用图 并转换为普通字典 避免查询不存在的键时插入数据"""
+        self.file_line_indexes = {file_path: LineIndex(method_summaries, MethodKeys.START.value, MethodKeys.END.value)
+                                  for file_path, method_summaries in self.file_methods.items()}
+        nodes = ((method_id, method_summary[MethodKeys.FULLNAME.value], method_summary[MethodKeys.FILE.value])
+                 for method_id, method_summary in self.methods.items())
+        edges = ((caller_id, callee_id) for caller_id, callees in self.callees_map.items() for callee_id, _ in callees)
+        self.compact_graph = CompactCallGraph.from_edges(nodes, edges)
+        for attr_name in ["callees_map", "callers_map", "name_ids_map", "fullname_ids_map", "namespace_ids_map",
+                          "file_methods"]:
+            setattr(self, attr_name, dict(getattr(self, attr_name)))
+        return self
+
+    @classmethod
+    def from_parsed_infos(cls, parsed_infos: dict):
+        """从补充函数关系后的解析结果构建索引"""
+        index = cls()
+        for method_info in iter_parsed_methods(parsed_infos):
+            index.add_method({key: method_info.get(key) for key in METHOD_SUMMARY_KEYS})
+        for caller_id, callee_id, call_line in iter_resolved_edges(parsed_infos):
+            index.add_edge(caller_id, callee_id, call_line)
+        return index.finish()
+
+    @classmethod
+    def from_sqlite(cls, db_path: str):
+        """从 SQLite 项目索引加载 无需重新解析项目"""
+        index = cls()
+        with connect_project_index(db_path) as conn:
+            for row in conn.execute("SELECT uniq_id, name, fullname, class_name, namespace, file, start_line, end_line "
+                                    "FROM methods"):
+                index.add_method(dict(zip(METHOD_SUMMARY_KEYS, row)))
+            for row in conn.execute("SELECT edges.caller_id, edges.callee_id, call_sites.start_line FROM edges "
+                                    "JOIN call_sites ON call_sites.caller_id = edges.caller_id "
+                                    "AND call_sites.call_index = edges.call_index "
+                                    "ORDER BY edges.caller_id, edges.call_index"):
+                index.add_edge(*row)
+        return index.finish()
+
+    def get_adjacent(self, adjacency_map: dict, method_id: str, adjacent_key: str):
+        results = []
+        for adjacent_id, call_line in adjacency_map.get(method_id, []):
+            # 被调用方可能不在索引中(如已删除的文件) 仍返回ID
+            method_summary = self.methods.get(adjacent_id) or {MethodKeys.UNIQ_ID.value: adjacent_id}
+            results.append({adjacent_key: method_summary, "LINE": call_line})
+        return results
+
+    def find_callees(self, method_id: str):
+        """查询方法调用了哪些方法"""
+        return self.get_adjacent(self.callees_map, method_id, "CALLEE")
+
+    def find_callers(self, method_id: str):
+        """查询方法被哪些方法调用"""
+        return self.get_adjacent(self.callers_map, method_id, "CALLER")
+
+    def find_symbols(self, name=None, fullname=None, namespace=None):
+        """按方法名|完整方法名|命名空间查询方法 多个条件同时满足"""
+        conditions = [(self.name_ids_map, name), (self.fullname_ids_map, fullname),
+                      (self.namespace_ids_map, custom_format_path(namespace) if namespace else namespace)]
+        method_ids = None
+        for ids_map, value in conditions:
+            if value is None:
+                continue
+            matched_ids = ids_map.get(value, [])
+            if method_ids is None:
+                method_ids = matched_ids
+            else:
+                matched_ids = set(matched_ids)
+                method_ids = [method_id for method_id in method_ids if method_id in matched_ids]
+        return [self.methods[method_id] for method_id in method_ids or []]
+
+    def find_enclosing(self, file_path: str, code_line: int):
+        """查询文件指定行所在的最内层方法 全局代码(GLOBAL_CODE)包含整个文件"""
+        line_index = self.file_line_indexes.get(custom_format_path(file_path))
+        if not line_index:
+            return None
+        method_summaries = line_index.find_all_in_scope(code_line)
+        if not method_summaries:
+            return None
+        return max(method_summaries, key=lambda m: (m[MethodKeys.START.value], -m[MethodKeys.END.value]))
+
+    def find_reachable(self, method_id: str, reverse=False, max_depth=None, order="bfs"):
+        """查询方法可传递到达的所有方法 reverse=True 时查询所有直接和间接调用方 max_depth 限制跳数"""
+        graph = self.compact_graph
+        roots = graph.to_indexes([method_id])
+        if not roots:
+            return []
+        results = []
+        for node, depth in graph.traverse(roots, reverse=reverse, max_depth=max_depth, order=order):
+            method_summary = self.methods.get(graph.node_ids[node]) or graph.describe(node)
+            results.append({"METHOD": method_summary, "DEPTH": depth})
+        return results
+
+    def get_stats(self):
+        return {"methods": len(self.methods), "edges": self.edges_num, "files": len(self.file_line_indexes)}
+
+
+def get_query_value(params: dict, key: str, required=True):
+    value = params.get(key)
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if required and value in (None, ""):
+        raise ValueError(f"缺少参数: {key}")
+    return value
+
+
+def run_query(index: CallGraphIndex, query: str, params: dict):
+    """执行单个查询 params 为参数字典 值可以是字符串或字符串列表(URL查询参数)"""
+    if query == "callees":
+        return index.find_callees(get_query_value(params, "id"))
+    if query == "callers":
+        return index.find_callers(get_query_value(params, "id"))
+    if query == "symbols":
+        name, fullname, namespace = (get_query_value(params, key, required=False)
+                                     for key in ("name", "fullname", "namespace"))
+        if name is None and fullname is None and namespace is None:
+            raise ValueError("缺少参数: name|fullname|namespace")
+        return index.find_symbols(name=name, fullname=fullname, namespace=namespace)
+    if query == "enclosing":
+        return index.find_enclosing(get_query_value(params, "file"), int(get_query_value(params, "line")))
+    if query == "reachable":
+        depth = get_query_value(params, "depth", required=False)
+        reverse = str(get_query_value(params, "reverse", required=False)).lower() in ("1", "true")
+        order = "dfs" if get_query_value(params, "order", required=False) == "dfs" else "bfs"
+        return index.find_reachable(get_query_value(params, "id"), reverse=reverse,
+                                    max_depth=int(depth) if depth not in (None, "") else None, order=order)
+    if query == "stats":
+        return index.get_stats()
+    raise ValueError(f"未知的查询类型: {query}")
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /callees?id=  /callers?id=  /symbols?name=&fullname=&namespace=  /enclosing?file=&line=  /stats
+    GET  /reachable?id=&reverse=1&depth=&order=bfs|dfs
+    POST /batch  请求体为 [{"query": "callers", "id": "..."}, ...] 按顺序返回每个查询的结果
+    """
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体缓冲后一次发送 避免长连接下 Nagle 与延迟确认叠加导致每个请求等待约40ms
+    wbufsize = -1
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            result = run_query(self.server.index, url.path.strip("/"), parse_qs(url.query))
+        except ValueError as error:
+            self.send_json(400, {"error": str(error)})
+            return
+        self.send_json(200, {"result": result})
+
+    def do_POST(self):
+        if urlsplit(self.path).path.strip("/") != "batch":
+            self.send_json(404, {"error": "仅支持 POST /batch"})
+            return
+        try:
+            queries = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"[]")
+            if not isinstance(queries, list) or len(queries) > MAX_BATCH_QUERIES:
+                raise ValueError(f"请求体需要为查询列表 且数量不超过 {MAX_BATCH_QUERIES}")
+        except ValueError as error:
+            self.send_json(400, {"error": str(error)})
+            return
+
+        results = []
+        index = self.server.index
+        for query_params in queries:
+            try:
+                results.append({"result": run_query(index, str(query_params.get("query")), query_params)})
+            except (ValueError, AttributeError) as error:
+                results.append({"error": str(error)})
+        self.send_json(200, {"results": results})
+
+    def log_message(self, format, *args):
+        # 高频查询场景下不输出访问日志
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def create_query_server(index: CallGraphIndex, listen: str):
+    """listen 支持 host:port 或 unix:/path/to/socket"""
+    if listen.startswith("unix:"):
+        socket_path = listen[len("unix:"):]
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, QueryRequestHandler)
+    else:
+        host, _, port = listen.rpartition(":")
+        server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), QueryRequestHandler)
+        server.daemon_threads = True
+    # 重新构建索引后直接替换引用 正在处理的查询继续使用旧索引
+    server.index = index
+    return server
+
+
+def start_query_server(index: CallGraphIndex, listen: str):
+    """在后台线程中启动查询服务 返回服务对象"""
+    server = create_query_server(index, listen)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"\n调用图查询服务已启动: {listen} {index.get_stats()}")
+    return server
+
+
+if __name__ == '__main__':
+    # 从已有的 SQLite 项目索引启动查询服务: python php_query_server.py project.sqlite 127.0.0.1:8765
+    if len(sys.argv) < 3 or not os.path.isfile(sys.argv[1]):
+        print("用法: python php_query_server.py <SQLite索引文件> <host:port|unix:/path/to/socket>")
+        exit()
+    QUERY_SERVER = create_query_server(CallGraphIndex.from_sqlite(sys.argv[1]), sys.argv[2])
+    print(f"调用图查询服务已启动: {sys.argv[2]} {QUERY_SERVER.index.get_stats()}")
+    try:
+        QUERY_SERVER.serve_forever()
+    except KeyboardInterrupt:
+        QUERY_SERVER.server_close()
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+
+# 合并小文件时 单个任务块的源码字节数上限 超过该大小的文件单独作为一个任务
+DEFAULT_BATCH_BYTES = 256 * 1024
+# 内存低于限制的比例时 逐步恢复在途任务窗口
+MEMORY_RECOVER_RATIO = 0.8
+
+
+def get_current_rss():
+    """
+    获取当前进程的常驻内存字节数 仅支持读取 linux 的 /proc 无法获取时返回 None 此时不做内存背压
+    resource 的 ru_maxrss 是进程的峰值内存 超过上限后不会再下降 不能用于恢复在途窗口 因此不作为后备
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def get_peak_rss():
+    """
+    获取当前进程的峰值常驻内存字节数 只用于统计 不能用于调整在途窗口
+    windows 下没有 resource 模块 返回 None
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # linux 下 ru_maxrss 单位为KB macOS 下为字节
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def get_file_size(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+
+def plan_parse_tasks(file_pairs, max_files=64, max_bytes=DEFAULT_BATCH_BYTES):
+    """
+    按文件大小从大到小排列 (LPT 最长任务优先) 再依次切分任务块 避免最大的文件最后才开始 单独拖长尾部耗时
+    大文件单独作为一个任务 小文件合并到同一任务块中 直到文件数或字节数达到上限 分摊每个任务的调度开销
+    返回任务块列表 每个任务块为 [(绝对路径, 相对路径)] 任务块按包含的最大文件降序排列
+    """
+    sized_pairs = sorted(((get_file_size(pair[0]), pair) for pair in file_pairs), key=lambda item: item[0],
+                         reverse=True)
+    tasks = []
+    chunk, chunk_bytes = [], 0
+    for file_size, pair in sized_pairs:
+        chunk.append(pair)
+        chunk_bytes += file_size
+        if len(chunk) >= max_files or chunk_bytes >= max_bytes:
+            tasks.append(chunk)
+            chunk, chunk_bytes = [], 0
+    if chunk:
+        tasks.append(chunk)
+    return tasks
+
+
+def run_bounded_tasks(submit, tasks, on_result, max_in_flight, memory_limit=None, get_memory=get_current_rss):
+    """
+    限制在途任务数量的任务调度 任务完成后立即把结果交给 on_result 不在调度器中积累
+    submit(task) 提交任务返回 Future  max_in_flight 为在途任务数上限 避免一次性创建全部 Future
+    memory_limit 为当前进程内存的字节数上限 超过时在途窗口减半 低于上限的 80% 时窗口逐步恢复
+    get_memory 需要返回当前内存而不是峰值内存 返回 None 时不调整窗口
+    进程池模式下只统计主进程内存 子进程的内存由进程数限制
+    返回调度统计 {tasks, max_in_flight, min_window, throttled, wait}
+    """
+    max_in_flight = max(1, max_in_flight)
+    window = max_in_flight
+    stats = {"tasks": len(tasks), "max_in_flight": max_in_flight, "min_window": window, "throttled": 0, "wait": 0.0}
+
+    pending = set()
+    task_iter = iter(tasks)
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) < window:
+            task = next(task_iter, None)
+            if task is None:
+                exhausted = True
+                break
+            pending.add(submit(task))
+        if not pending:
+            break
+
+        start_wait = time.perf_counter()
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        stats["wait"] += time.perf_counter() - start_wait
+        for future in done:
+            on_result(future.result())
+
+        # 每批任务完成后按当前内存调整窗口 结果交给 on_result 后才测量 反映结果保存后的真实占用
+        memory = get_memory() if memory_limit else None
+        if memory is None:
+            continue
+        if memory > memory_limit:
+            window = max(1, window // 2)
+            stats["throttled"] += 1
+            stats["min_window"] = min(stats["min_window"], window)
+        elif memory < memory_limit * MEMORY_RECOVER_RATIO and window < max_in_flight:
+            window += 1
+    return stats
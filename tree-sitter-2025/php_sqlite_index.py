@@ -0,0 +1,266 @@
+import json
+import os
+import sqlite3
+import sys
+
+from php_enums import FileInfoKeys, ClassKeys, MethodKeys
+from php_map_basic import calc_method_uniq_id, calc_class_uniq_id
+from tree_sitter_uitls import custom_format_path
+
+# 项目索引表结构 行号均为 tree-sitter 的0起始行号 与解析结果保持一致
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    methods_num INTEGER,
+    classes_num INTEGER
+);
+CREATE TABLE IF NOT EXISTS classes (
+    uniq_id TEXT PRIMARY KEY,
+    file TEXT,
+    name TEXT,
+    namespace TEXT,
+    start_line INTEGER,
+    end_line INTEGER,
+    extends TEXT,
+    interfaces TEXT,
+    is_interface INTEGER
+);
+CREATE TABLE IF NOT EXISTS methods (
+    uniq_id TEXT PRIMARY KEY,
+    file TEXT,
+    class_id TEXT,
+    class_name TEXT,
+    name TEXT,
+    fullname TEXT,
+    namespace TEXT,
+    start_line INTEGER,
+    end_line INTEGER,
+    visibility TEXT,
+    method_type TEXT,
+    params_num INTEGER
+);
+CREATE TABLE IF NOT EXISTS call_sites (
+    caller_id TEXT,
+    call_index INTEGER,
+    file TEXT,
+    name TEXT,
+    fullname TEXT,
+    class_name TEXT,
+    object_name TEXT,
+    method_type TEXT,
+    start_line INTEGER,
+    end_line INTEGER,
+    is_native INTEGER,
+    PRIMARY KEY (caller_id, call_index)
+);
+CREATE TABLE IF NOT EXISTS edges (
+    caller_id TEXT,
+    call_index INTEGER,
+    callee_id TEXT,
+    callee_file TEXT,
+    PRIMARY KEY (caller_id, call_index, callee_id)
+);
+CREATE INDEX IF NOT EXISTS idx_classes_name ON classes(name);
+CREATE INDEX IF NOT EXISTS idx_classes_namespace ON classes(namespace);
+CREATE INDEX IF NOT EXISTS idx_classes_file ON classes(file, start_line);
+CREATE INDEX IF NOT EXISTS idx_methods_name ON methods(name);
+CREATE INDEX IF NOT EXISTS idx_methods_fullname ON methods(fullname);
+CREATE INDEX IF NOT EXISTS idx_methods_namespace ON methods(namespace);
+CREATE INDEX IF NOT EXISTS idx_methods_file ON methods(file, start_line);
+CREATE INDEX IF NOT EXISTS idx_call_sites_name ON call_sites(name);
+CREATE INDEX IF NOT EXISTS idx_call_sites_fullname ON call_sites(fullname);
+CREATE INDEX IF NOT EXISTS idx_call_sites_file ON call_sites(file, start_line);
+CREATE INDEX IF NOT EXISTS idx_edges_callee ON edges(callee_id);
+"""
+
+SQLITE_TABLES = ["files", "classes", "methods", "call_sites", "edges"]
+
+SQLITE_INSERTS = {
+    "files": "INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+    "classes": "INSERT OR REPLACE INTO classes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "methods": "INSERT OR REPLACE INTO methods VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "call_sites": "INSERT OR REPLACE INTO call_sites VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "edges": "INSERT OR REPLACE INTO edges VALUES (?, ?, ?, ?)",
+}
+
+
+def to_json_text(value):
+    """复杂字段以JSON文本存储"""
+    return json.dumps(value, ensure_ascii=False) if value else None
+
+
+def get_method_rows(method_info: dict, file_path: str, class_id=None):
+    """生成方法行和方法内的调用点行"""
+    method_id = calc_method_uniq_id(method_info, file_path)
+    method_row = (
+        method_id,
+        file_path,
+        class_id,
+        method_info.get(MethodKeys.CLASS.value),
+        method_info.get(MethodKeys.NAME.value),
+        method_info.get(MethodKeys.FULLNAME.value),
+        method_info.get(MethodKeys.NAMESPACE.value),
+        method_info.get(MethodKeys.START.value),
+        method_info.get(MethodKeys.END.value),
+        method_info.get(MethodKeys.VISIBILITY.value),
+        method_info.get(MethodKeys.METHOD_TYPE.value),
+        len(method_info.get(MethodKeys.PARAMS.value) or []),
+    )
+    call_site_rows = []
+    for call_index, called_info in enumerate(method_info.get(MethodKeys.CALLED_METHODS.value) or []):
+        call_site_rows.append((
+            method_id,
+            call_index,
+            file_path,
+            called_info.get(MethodKeys.NAME.value),
+            called_info.get(MethodKeys.FULLNAME.value),
+            called_info.get(MethodKeys.CLASS.value),
+            called_info.get(MethodKeys.OBJECT.value),
+            called_info.get(MethodKeys.METHOD_TYPE.value),
+            called_info.get(MethodKeys.START.value),
+            called_info.get(MethodKeys.END.value),
+            int(bool(called_info.get(MethodKeys.IS_NATIVE.value))),
+        ))
+    return method_row, call_site_rows
+
+
+def iter_file_methods(parsed_info: dict, file_path: str):
+    """遍历文件中的全局方法和类方法 返回 (类ID, 方法信息)"""
+    for method_info in parsed_info.get(FileInfoKeys.METHOD_INFOS.value) or []:
+        yield None, method_info
+    for class_info in parsed_info.get(FileInfoKeys.CLASS_INFOS.value) or []:
+        class_id = calc_class_uniq_id(class_info, file_path)
+        for method_info in class_info.get(ClassKeys.METHODS.value) or []:
+            yield class_id, method_info
+
+
+class ProjectIndexWriter:
+    """
+    SQLite 项目索引写入器 按批次在事务中写入 避免整个项目结果常驻内存
+    解析阶段写入 files|classes|methods|call_sites 调用关系分析完成后写入 edges
+    """
+
+    def __init__(self, db_path, batch_size=500):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.pending_rows = {table: [] for table in SQLITE_TABLES}
+        self.pending_files = 0
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+        # 每次分析都重建索引内容 保证与本次分析结果一致
+        with self.conn:
+            for table in SQLITE_TABLES:
+                self.conn.execute(f"DELETE FROM {table}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add_parsed_info(self, relative_path: str, parsed_info: dict):
+        """写入单个文件的类|方法|调用点信息 达到批次大小时提交"""
+        file_path = custom_format_path(relative_path)
+        class_infos = parsed_info.get(FileInfoKeys.CLASS_INFOS.value) or []
+        methods_num = 0
+        for class_info in class_infos:
+            self.pending_rows["classes"].append((
+                calc_class_uniq_id(class_info, file_path),
+                file_path,
+                class_info.get(ClassKeys.NAME.value),
+                class_info.get(ClassKeys.NAMESPACE.value),
+                class_info.get(ClassKeys.START.value),
+                class_info.get(ClassKeys.END.value),
+                to_json_text(class_info.get(ClassKeys.EXTENDS.value)),
+                to_json_text(class_info.get(ClassKeys.INTERFACES.value)),
+                int(bool(class_info.get(ClassKeys.IS_INTERFACE.value))),
+            ))
+
+        for class_id, method_info in iter_file_methods(parsed_info, file_path):
+            method_row, call_site_rows = get_method_rows(method_info, file_path, class_id)
+            self.pending_rows["methods"].append(method_row)
+            self.pending_rows["call_sites"].extend(call_site_rows)
+            methods_num += 1
+
+        self.pending_rows["files"].append((file_path, methods_num, len(class_infos)))
+        self.pending_files += 1
+        if self.pending_files >= self.batch_size:
+            self.flush()
+
+    def add_resolved_edges(self, parsed_infos: dict):
+        """写入调用关系分析后的 调用点 -> 可能的源方法 边信息"""
+        for relative_path, parsed_info in parsed_infos.items():
+            file_path = custom_format_path(relative_path)
+            for _, method_info in iter_file_methods(parsed_info, file_path):
+                method_id = calc_method_uniq_id(method_info, file_path)
+                for call_index, called_info in enumerate(method_info.get(MethodKeys.CALLED_METHODS.value) or []):
+                    may_source = called_info.get(MethodKeys.MAY_SOURCE.value) or {}
+                    for callee_id, callee_file in may_source.items():
+                        self.pending_rows["edges"].append((method_id, call_index, callee_id, callee_file))
+            self.pending_files += 1
+            if self.pending_files >= self.batch_size:
+                self.flush()
+        self.flush()
+
+    def flush(self):
+        """在一个事务中提交所有待写入的行"""
+        with self.conn:
+            for table, rows in self.pending_rows.items():
+                if rows:
+                    self.conn.executemany(SQLITE_INSERTS[table], rows)
+                    rows.clear()
+        self.pending_files = 0
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+
+def connect_project_index(db_path):
+    """以只读方式打开项目索引"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def find_callers(conn, method_name: str):
+    """查询调用了指定方法(方法名或完整方法名)的所有调用点 仅包含已解析出源方法的调用"""
+    sql = """
+        SELECT callee.fullname AS callee, callee.file AS callee_file,
+               caller.fullname AS caller, caller.file AS caller_file, call_sites.start_line AS line
+        FROM methods AS callee
+        JOIN edges ON edges.callee_id = callee.uniq_id
+        JOIN call_sites ON call_sites.caller_id = edges.caller_id AND call_sites.call_index = edges.call_index
+        JOIN methods AS caller ON caller.uniq_id = edges.caller_id
+        WHERE callee.name = ? OR callee.fullname = ?
+        ORDER BY caller.file, call_sites.start_line
+    """
+    return [dict(row) for row in conn.execute(sql, (method_name, method_name))]
+
+
+def find_call_sites(conn, method_name: str):
+    """按被调用的方法名或完整方法名查询调用点 包含未解析出源方法的调用"""
+    sql = """
+        SELECT call_sites.fullname AS called, caller.fullname AS caller, call_sites.file AS file,
+               call_sites.start_line AS line
+        FROM call_sites
+        JOIN methods AS caller ON caller.uniq_id = call_sites.caller_id
+        WHERE call_sites.name = ? OR call_sites.fullname = ?
+        ORDER BY call_sites.file, call_sites.start_line
+    """
+    return [dict(row) for row in conn.execute(sql, (method_name, method_name))]
+
+
+if __name__ == '__main__':
+    # 查询调用方: python php_sqlite_index.py project.sqlite back_action [--all]
+    if len(sys.argv) < 3 or not os.path.isfile(sys.argv[1]):
+        print("用法: python php_sqlite_index.py <索引文件> <方法名|完整方法名> [--all 包含未解析的调用点]")
+        exit()
+    with connect_project_index(sys.argv[1]) as CONN:
+        query_func = find_call_sites if "--all" in sys.argv[3:] else find_callers
+        for ROW in query_func(CONN, sys.argv[2]):
+            print(json.dumps(ROW, ensure_ascii=False))
@@ -0,0 +1,25 @@
+import sys
+
+
+def intern_strings(value):
+    """
+    原地将字典和列表中的字符串值替换为驻留字符串 返回原对象
+    语法节点文本每次都会生成新的字符串对象 变量名、节点类型、命名空间、类名等在各文件中大量重复
+    使用解释器的驻留表作为项目级符号表 marshal 会记录驻留标记 从二进制缓存加载时自动复用同一对象
+    字典的键为枚举值 本身已经驻留 不做处理
+    """
+    stack = [value]
+    while stack:
+        container = stack.pop()
+        if isinstance(container, dict):
+            items = container.items()
+        elif isinstance(container, list):
+            items = enumerate(container)
+        else:
+            continue
+        for key, item in items:
+            if type(item) is str:
+                container[key] = sys.intern(item)
+            elif isinstance(item, (dict, list)):
+                stack.append(item)
+    return value
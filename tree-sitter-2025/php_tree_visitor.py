@@ -0,0 +1,277 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from tree_sitter._binding import Node
+
+from php_queries import CLASS_DEFINE_QUERY, FUNCTION_DEFINE_QUERY, NAMESPACE_DEFINE_QUERY, PARAMS_NAMED_TYPE_QUERY, \
+    CREATE_OBJECT_QUERY, USE_DECLARATION_QUERY, INCLUDE_REQUIRE_QUERY, CLASS_INFO_QUERY, GLOBAL_FUNCTION_QUERY, \
+    METHOD_CALLED_QUERY, VARIABLE_DECLARE_QUERY, CONSTANTS_QUERY, LOCALE_FUNCTION_QUERY, ASSIGNMENT_QUERY, COMMENT_QUERY
+from tree_sitter_uitls import get_cached_query
+
+
+def field_is_type(field_name, node_type):
+    """节点的指定字段存在且类型一致 等价于查询语句中的 field: (type)"""
+    def predicate(node: Node):
+        child = node.child_by_field_name(field_name)
+        return child is not None and child.type == node_type
+    return predicate
+
+
+def has_child_type(node_type):
+    """节点存在指定类型的直接子节点 等价于查询语句中的 (parent (type))"""
+    def predicate(node: Node):
+        return any(child.type == node_type for child in node.children)
+    return predicate
+
+
+def all_of(*predicates):
+    def predicate(node: Node):
+        return all(p(node) for p in predicates)
+    return predicate
+
+
+def get_variable_assignment_orders(node: Node, order: int):
+    """
+    等价于 (assignment_expression (variable_name) (_)) 的全部匹配 返回每个匹配的排序序号
+    variable_name 与其后的每个具名子节点各构成一个匹配 (_) 可以匹配注释 不匹配 ERROR 节点
+    tree-sitter 在到达 (_) 节点时完成匹配 匹配顺序为 (_) 节点的先序序号 子节点序号由前面兄弟节点的子树大小推算
+    """
+    orders = []
+    variables_num = 0
+    child_order = order + 1
+    for child in node.children:
+        if child.is_named and child.type != 'ERROR':
+            orders.extend([child_order] * variables_num)
+            if child.type == 'variable_name':
+                variables_num += 1
+        child_order += child.descendant_count
+    return orders
+
+
+# 查询语句 -> [(pattern_index, 捕获名称, 节点类型, 匹配判断函数, 匹配序号函数)]
+# 匹配序号函数 (节点, 先序序号) -> [每个匹配的排序序号] 用于一个节点产生多个匹配的模式 为空时每个节点匹配一次
+# 仅包含分析器实际读取的外层捕获
+QUERY_NODE_SPECS = {
+    CLASS_DEFINE_QUERY: [
+        (0, 'class.def', 'class_declaration', field_is_type('name', 'name'), None),
+        (1, 'class.def', 'interface_declaration', field_is_type('name', 'name'), None),
+    ],
+    FUNCTION_DEFINE_QUERY: [
+        (0, 'function.def', 'function_definition', field_is_type('name', 'name'), None),
+    ],
+    NAMESPACE_DEFINE_QUERY: [
+        (0, 'namespace.def', 'namespace_definition', field_is_type('name', 'namespace_name'), None),
+    ],
+    PARAMS_NAMED_TYPE_QUERY: [
+        (0, 'parameters', 'simple_parameter',
+         all_of(field_is_type('type', 'named_type'), field_is_type('name', 'variable_name')), None),
+    ],
+    CREATE_OBJECT_QUERY: [
+        (0, 'assignment_expr', 'assignment_expression',
+         all_of(field_is_type('left', 'variable_name'), field_is_type('right', 'object_creation_expression')), None),
+    ],
+    USE_DECLARATION_QUERY: [
+        (0, 'use_declaration', 'namespace_use_declaration', None, None),
+    ],
+    INCLUDE_REQUIRE_QUERY: [
+        (0, 'import_expression', 'include_expression', None, None),
+        (1, 'import_expression', 'include_once_expression', None, None),
+        (2, 'import_expression', 'require_expression', None, None),
+        (3, 'import_expression', 'require_once_expression', None, None),
+    ],
+    CLASS_INFO_QUERY: [
+        (0, 'class.def', 'class_declaration', None, None),
+        (1, 'class.def', 'interface_declaration', None, None),
+    ],
+    GLOBAL_FUNCTION_QUERY: [
+        (0, 'function.def', 'function_definition', None, None),
+    ],
+    METHOD_CALLED_QUERY: [
+        (0, 'function_call', 'function_call_expression',
+         all_of(field_is_type('function', 'name'), field_is_type('arguments', 'arguments')), None),
+        (1, 'object_creation', 'object_creation_expression', None, None),
+        (2, 'member_call', 'member_call_expression', None, None),
+        (3, 'scoped_call', 'scoped_call_expression', None, None),
+    ],
+    VARIABLE_DECLARE_QUERY: [
+        (0, 'super_global_call', 'subscript_expression', None, None),
+        (1, 'global_declare', 'global_declaration', None, None),
+        (2, 'static_declare', 'function_static_declaration', None, None),
+    ],
+    CONSTANTS_QUERY: [
+        (0, 'define_call', 'expression_statement', has_child_type('function_call_expression'), None),
+        (1, 'const_declare', 'const_declaration', None, None),
+    ],
+    LOCALE_FUNCTION_QUERY: [
+        (0, 'function.def', 'function_definition', None, None),
+        (1, 'method.def', 'method_declaration', None, None),
+        (2, 'anonymous.def', 'anonymous_function', None, None),
+    ],
+    ASSIGNMENT_QUERY: [
+        (0, 'variables', 'assignment_expression', None, get_variable_assignment_orders),
+    ],
+    COMMENT_QUERY: [
+        (0, 'comment_node', 'comment', None, None),
+    ],
+}
+
+# 单次遍历时需要收集的全部节点类型
+INDEXED_NODE_TYPES = frozenset(spec[2] for specs in QUERY_NODE_SPECS.values() for spec in specs)
+
+
+class TreeVisitor:
+    """基于 TreeCursor 的单次先序遍历引擎 按节点类型分发给注册的处理函数"""
+
+    def __init__(self):
+        self.handlers = defaultdict(list)
+        self.visit_count = 0
+
+    def register(self, node_type, handler):
+        """注册节点类型的处理函数 handler(node, order) order为节点的先序序号"""
+        self.handlers[node_type].append(handler)
+
+    def walk(self, root_node: Node):
+        cursor = root_node.walk()
+        handlers = self.handlers
+        while True:
+            node = cursor.node
+            node_handlers = handlers.get(node.type)
+            if node_handlers:
+                for handler in node_handlers:
+                    handler(node, self.visit_count)
+            self.visit_count += 1
+
+            if cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return
+
+
+class NodeIndex:
+    """单次遍历建立的节点类型索引 用于替代同一棵树上的多次 query.matches 遍历"""
+
+    def __init__(self, root_node: Node, node_types=INDEXED_NODE_TYPES):
+        self.root_node = root_node
+        # 节点类型 -> 先序排列的 [节点] [起始字节] [先序序号]
+        self.type_nodes = defaultdict(list)
+        self.type_starts = defaultdict(list)
+        self.type_orders = defaultdict(list)
+
+        visitor = TreeVisitor()
+        for node_type in node_types:
+            visitor.register(node_type, self.collect_node)
+        visitor.walk(root_node)
+        self.visit_count = visitor.visit_count
+
+    def collect_node(self, node: Node, order: int):
+        self.type_nodes[node.type].append(node)
+        self.type_starts[node.type].append(node.start_byte)
+        self.type_orders[node.type].append(order)
+
+    def contains_tree(self, node: Node):
+        """判断节点是否属于本索引对应的语法树"""
+        top_node = node
+        while top_node.parent is not None:
+            top_node = top_node.parent
+        return top_node == self.root_node
+
+    def find_nodes(self, node_type, scope_node: Node):
+        """获取范围节点(含自身)内指定类型的所有节点 返回 [(先序序号, 节点)]"""
+        starts = self.type_starts.get(node_type)
+        if not starts:
+            return []
+        nodes = self.type_nodes[node_type]
+        orders = self.type_orders[node_type]
+        scope_start, scope_end = scope_node.start_byte, scope_node.end_byte
+
+        found = []
+        index = bisect_left(starts, scope_start)
+        while index < len(starts):
+            node = nodes[index]
+            if node.start_byte > scope_end or (node.start_byte == scope_end and scope_end > scope_start):
+                break
+            if node.end_byte <= scope_end and self.in_scope(node, scope_node):
+                found.append((orders[index], node))
+            index += 1
+        return found
+
+    @staticmethod
+    def in_scope(node: Node, scope_node: Node):
+        """排除与范围节点区间相同的祖先节点"""
+        if node.start_byte != scope_node.start_byte or node.end_byte != scope_node.end_byte:
+            return True
+        while node is not None:
+            if node == scope_node:
+                return True
+            if node.start_byte != scope_node.start_byte or node.end_byte != scope_node.end_byte:
+                return False
+            node = node.parent
+        return False
+
+    def matches(self, query_sql, scope_node: Node):
+        """按 QUERY_NODE_SPECS 等价实现 query.matches 返回相同结构的匹配结果"""
+        found = []
+        for pattern_index, capture_name, node_type, predicate, get_orders in QUERY_NODE_SPECS[query_sql]:
+            for order, node in self.find_nodes(node_type, scope_node):
+                if predicate and not predicate(node):
+                    continue
+                for match_order in (get_orders(node, order) if get_orders else (order,)):
+                    found.append((match_order, pattern_index, node, capture_name))
+        found.sort(key=lambda x: (x[0], x[1]))
+        return [(pattern_index, {capture_name: [node]}) for _, pattern_index, node, capture_name in found]
+
+
+# 当前线程正在分析的文件节点索引 以及查询遍历的节点统计
+ACTIVE_INDEX = threading.local()
+
+
+def get_active_node_index():
+    return getattr(ACTIVE_INDEX, "node_index", None)
+
+
+@contextmanager
+def use_node_index(root_node: Node, enabled=True):
+    """在上下文内为当前线程启用单次遍历节点索引 enabled=False 时保持原有的多次查询路径"""
+    previous_index = get_active_node_index()
+    node_index = NodeIndex(root_node) if enabled else None
+    ACTIVE_INDEX.node_index = node_index
+    if node_index:
+        add_visit_count(node_index.visit_count)
+    try:
+        yield node_index
+    finally:
+        ACTIVE_INDEX.node_index = previous_index
+
+
+def add_visit_count(count):
+    ACTIVE_INDEX.visit_count = getattr(ACTIVE_INDEX, "visit_count", 0) + count
+
+
+def pop_visit_count():
+    """获取并清零当前线程累计的节点遍历数量"""
+    count = getattr(ACTIVE_INDEX, "visit_count", 0)
+    ACTIVE_INDEX.visit_count = 0
+    return count
+
+
+class PHPQuery:
+    """查询对象 存在可用的节点索引时从索引中匹配 否则执行编译后的 tree-sitter 查询"""
+
+    def __init__(self, language, query_sql):
+        self.language = language
+        self.query_sql = query_sql
+
+    def matches(self, node: Node):
+        node_index = get_active_node_index()
+        if node_index is not None and self.query_sql in QUERY_NODE_SPECS and node_index.contains_tree(node):
+            return node_index.matches(self.query_sql, node)
+        add_visit_count(node.descendant_count)
+        return get_cached_query(self.language, self.query_sql).matches(node)
+
+
+def get_php_query(language, query_sql):
+    """分析器统一的查询入口"""
+    return PHPQuery(language, query_sql)
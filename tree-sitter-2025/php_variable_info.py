@@ -1,33 +1,23 @@
 from typing import List, Dict, Any
 
 from tree_sitter._binding import Node
-from php_dependent_utils import get_ranges_names
 from libs_com.utils_json import print_json
-from php_enums import VariableType, OtherName, VariableKeys
-from php_func_utils import get_global_code_info, get_global_code_string
-from tree_sitter_uitls import init_php_parser, read_file_to_root, load_str_to_parse, find_first_child_by_field, \
+from php_enums import VariableType, OtherName, VariableKeys, GlobalCode
+from php_func_utils import get_global_code_info
+from tree_sitter_uitls import init_php_parser, read_file_to_root, find_first_child_by_field, \
     get_node_filed_text
 from php_variable_utils import parse_static_node, parse_variable_node, parse_global_node, parse_super_global_node, \
     parse_define_node, parse_const_node
+from php_queries import VARIABLE_DECLARE_QUERY, CONSTANTS_QUERY, LOCALE_FUNCTION_QUERY
+from php_tree_visitor import get_php_query
 
 
-def analyze_variable_infos(parser, language, root_node: Node, dependent_infos:dict):
-    """分析PHP文件中的所有变量"""
-    gb_methods_names, gb_methods_ranges, gb_classes_names, gb_classes_ranges = get_ranges_names(dependent_infos)
-
+def analyze_variable_infos(parser, language, root_node: Node, analysis_context=None, global_code_info=None):
+    """分析PHP文件中的所有变量 global_code_info 可由调用方预先提取后共享"""
     # 初始化变量字典
     var_infos = {var_type.value: [] for var_type in VariableType}
 
-    query = language.query("""
-        ;匹配超全局变量访问 比如 $_SERVER['REQUEST_METHOD']
-        (subscript_expression)@super_global_call
-
-        ;全局变量声明 比如 global $globalVar;
-        (global_declaration)@global_declare
-
-        ;静态变量声明 比如 static $staticVar = 0;
-        (function_static_declaration)@static_declare
-    """)
+    query = get_php_query(language, VARIABLE_DECLARE_QUERY)
     matches = query.matches(root_node)
 
     # SUPER_GLOBAL = 'superglobal'  超全局变量调用信息
@@ -66,10 +56,12 @@ def analyze_variable_infos(parser, language, root_node: Node, dependent_infos:di
 
     # PROGRAM = 'program'  全局代码内的变量信息
 
-    program_code_info = get_global_code_info(root_node, gb_methods_ranges, gb_classes_ranges)
-    nf_code_tree = load_str_to_parse(parser, get_global_code_string(program_code_info))
-    nf_code_node = nf_code_tree.root_node
-    program_variable_infos = parse_variable_node(language, nf_code_node, OtherName.NOT_IN_METHOD.value)
+    if global_code_info is None:
+        global_code_info = get_global_code_info(language, root_node)
+    program_variable_infos = []
+    if global_code_info:
+        program_code_nodes = global_code_info[GlobalCode.BLOCKS.value]
+        program_variable_infos = parse_variable_node(language, program_code_nodes, OtherName.NOT_IN_METHOD.value)
     var_infos[VariableType.PROGRAM.value] = program_variable_infos
 
     # LOCAL = 'local' 函数内的变量信息
@@ -88,15 +80,7 @@ def analyze_variable_infos(parser, language, root_node: Node, dependent_infos:di
 def parse_constants_node(language, root_node: Node) -> List[Dict[str, Any]]:
     """提取 define 和 const常量定义"""
     # 查询 可能的 define函数语法 还需要过滤
-    query = language.query("""
-        ;define定义信息提取
-        (expression_statement
-            (function_call_expression)
-        )@define_call
-        
-        ;const定义信息提取
-        (const_declaration)@const_declare
-    """)
+    query = get_php_query(language, CONSTANTS_QUERY)
     matches = query.matches(root_node)
 
     constants = []
@@ -125,14 +109,7 @@ def parse_constants_node(language, root_node: Node) -> List[Dict[str, Any]]:
 
 def parse_locale_variable_infos(language, root_node: Node):
     # 先获取所有函数节点，再分别解析其中的每个节点
-    function_query = language.query("""
-        ; 查询全局函数定义
-        (function_definition) @function.def
-        ; 查询类方法定义
-        (method_declaration) @method.def
-        ; 匹配闭包定义
-        (anonymous_function) @anonymous.def
-    """)
+    function_query = get_php_query(language, LOCALE_FUNCTION_QUERY)
     matches = function_query.matches(root_node)
     locale_variable_infos = []
     for match in matches:
@@ -3,6 +3,8 @@ from tree_sitter._binding import Node
 from php_enums import VariableKeys
 from tree_sitter_uitls import get_node_text, find_first_child_by_field, get_node_type, find_children_by_field, \
     get_node_filed_text
+from php_queries import ASSIGNMENT_QUERY
+from php_tree_visitor import get_php_query
 
 
 def create_var_info_result(name_text, name_type, value_text, value_type, start_line, end_line, full_text, function):
@@ -46,7 +48,7 @@ def parse_static_node(static_node: Node):
 
 
 def parse_variable_node(language, any_node: Node, node_name: str):
-    """解析常规的函数体中的变量赋值节点"""
+    """解析常规的函数体中的变量赋值节点 any_node 可以是节点列表(如全局代码块)"""
     def parse_assignment_node(assignment_node, function):
         """解析常规的变量赋值节点"""
         # (assignment_expression left: (variable_name (name)) right: (integer))
@@ -66,14 +68,9 @@ def parse_variable_node(language, any_node: Node, node_name: str):
                                           full_text=variable_text, function=function)
         return var_info
 
-    query = language.query("""
-        ;常规变量赋值 比如 $localVar = 42;
-        (assignment_expression
-            (variable_name)
-            (_) @var_value
-        )@variables
-    """)
-    matches = query.matches(any_node)
+    query = get_php_query(language, ASSIGNMENT_QUERY)
+    any_nodes = any_node if isinstance(any_node, list) else [any_node]
+    matches = [match for node in any_nodes for match in query.matches(node)]
     variable_infos = []
     for match in matches:
         pattern_index, match_dict = match
@@ -0,0 +1,275 @@
+import json
+import os
+import time
+
+from libs_com.file_path import get_relative_path
+from libs_com.files_filter import FileDiscoveryRules, DEFAULT_SKIP_DIRS, scan_discovery_tree
+from php_map_analyze import build_methods_relation
+from php_map_update import update_methods_relation
+from php_parser import PHPParser, OUTPUT_INFO_TYPES, get_output_file_infos, write_output_file
+from php_query_server import CallGraphIndex, start_query_server
+from php_symbols import intern_strings
+
+# inotify_simple 为可选依赖 未安装或非 linux 平台时使用轮询方式
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify, inotify_flags = None, None
+
+
+class PollingWatcher:
+    """轮询方式检测文件变更 每次都需要全量对比文件状态"""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+
+    def watch_dirs(self, dir_paths):
+        pass
+
+    def wait_changes(self):
+        """等待下一次检查 返回 None 表示需要全量对比"""
+        time.sleep(self.interval)
+        return None
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """基于 inotify 检测文件变更 仅返回发生变化的文件路径 目录结构变化时退化为全量对比"""
+
+    def __init__(self, debounce=0.2):
+        self.debounce = debounce
+        self.inotify = INotify()
+        self.watch_mask = (inotify_flags.CREATE | inotify_flags.CLOSE_WRITE | inotify_flags.MODIFY |
+                           inotify_flags.DELETE | inotify_flags.MOVED_FROM | inotify_flags.MOVED_TO |
+                           inotify_flags.DELETE_SELF)
+        self.wd_dir_paths = {}
+        self.dir_path_wds = {}
+
+    def watch_dirs(self, dir_paths):
+        """为新出现的目录添加监听 已消失的目录由内核自动移除监听"""
+        for dir_path in dir_paths:
+            if dir_path in self.dir_path_wds:
+                continue
+            try:
+                wd = self.inotify.add_watch(dir_path, self.watch_mask)
+            except OSError as error:
+                # 超过 max_user_watches 等限制时 该目录的变更只能在下一次全量对比中发现
+                print(f"添加目录监听失败: {dir_path} -> {error}")
+                continue
+            self.wd_dir_paths[wd] = dir_path
+            self.dir_path_wds[dir_path] = wd
+
+    def wait_changes(self):
+        """阻塞等待文件事件 合并 debounce 时间内的连续事件 返回变化的文件路径集合 None 表示需要全量对比"""
+        events = self.inotify.read(read_delay=int(self.debounce * 1000))
+        changed_paths = set()
+        need_rescan = False
+        for event in events:
+            event_flags = inotify_flags.from_mask(event.mask)
+            if inotify_flags.Q_OVERFLOW in event_flags:
+                need_rescan = True
+                continue
+            if inotify_flags.IGNORED in event_flags or inotify_flags.DELETE_SELF in event_flags:
+                # 监听的目录被删除或移动
+                dir_path = self.wd_dir_paths.pop(event.wd, None)
+                self.dir_path_wds.pop(dir_path, None)
+                need_rescan = True
+                continue
+            if inotify_flags.ISDIR in event_flags:
+                # 目录的新增|删除|移动 会影响其下所有文件
+                need_rescan = True
+                continue
+            dir_path = self.wd_dir_paths.get(event.wd)
+            if dir_path and event.name:
+                changed_paths.add(os.path.join(dir_path, event.name))
+        return None if need_rescan else changed_paths
+
+    def close(self):
+        self.inotify.close()
+
+
+def create_watcher(poll_interval=1.0):
+    """优先使用 inotify 不可用时退化为轮询"""
+    if INotify is not None:
+        try:
+            return InotifyWatcher()
+        except OSError as error:
+            print(f"inotify 初始化失败 使用轮询方式监听: {error}")
+    return PollingWatcher(poll_interval)
+
+
+def dumps_output_fragment(relative_path: str, file_infos):
+    """
+    序列化输出文件中单个文件的键值对 与 json.dump(indent=2) 的结果一致
+    JSON字符串中的换行均已转义 因此可以直接为每一行补充一级缩进
+    """
+    key_text = json.dumps(relative_path, ensure_ascii=False)
+    value_text = json.dumps(file_infos, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+    return f"{key_text}: {value_text}"
+
+
+def join_output_fragments(fragments):
+    """拼接键值对片段为完整的 JSON 对象文本"""
+    if not fragments:
+        return "{}"
+    return "{\n  " + ",\n  ".join(fragments) + "\n}"
+
+
+class WatchSession:
+    """
+    监听模式会话 常驻内存保存解析结果和关系映射
+    文件变更后仅重新解析变更的文件 增量更新关系映射 并只重新解析受影响的调用
+    """
+
+    def __init__(self, php_parser: PHPParser, output_prefix: str, imports_filter=True):
+        self.php_parser = php_parser
+        self.output_prefix = output_prefix
+        self.imports_filter = imports_filter
+        self.rules = FileDiscoveryRules(php_parser.project_path, skip_dirs=DEFAULT_SKIP_DIRS,
+                                        exclude_dirs=php_parser.exclude_dirs, exclude_globs=php_parser.exclude_globs,
+                                        extensions=php_parser.extensions, use_gitignore=php_parser.use_gitignore)
+        # 相对路径 -> (绝对路径, 修改时间, 文件大小)
+        self.file_states = {}
+        self.parsed_infos = {}
+        self.method_relation_map = {}
+        # 输出结果按文件缓存序列化片段 增量更新时只重新序列化受影响的文件 {信息类型: {相对路径: 片段}}
+        self.output_fragments = {info_type: {} for info_type in OUTPUT_INFO_TYPES}
+
+    def get_file_state(self, abspath_path):
+        try:
+            stat = os.stat(abspath_path)
+        except OSError:
+            return None
+        return abspath_path, stat.st_mtime_ns, stat.st_size
+
+    def scan_file_states(self):
+        """全量扫描项目文件状态 返回 (文件状态, 未被剪枝的目录列表)"""
+        project_path = self.php_parser.project_path
+        if os.path.isfile(project_path):
+            scanned = {os.path.dirname(os.path.abspath(project_path)): ([project_path], [])}
+        else:
+            # 规则可能因 .gitignore 修改而变化 每次全量扫描都重新加载
+            self.rules.gitignore_chains.clear()
+            scanned = scan_discovery_tree(project_path, self.rules, workers=self.php_parser.scan_workers)
+
+        file_states = {}
+        for files, _ in scanned.values():
+            for abspath_path in files:
+                file_state = self.get_file_state(abspath_path)
+                if file_state:
+                    file_states[get_relative_path(abspath_path, self.php_parser.project_root)] = file_state
+        return file_states, list(scanned)
+
+    def start(self, watcher, save_cache=True, workers=None, executor="thread", chunk_size=None):
+        """首次全量分析 文件状态在解析前记录 解析期间发生的修改会在第一次检查时被发现"""
+        self.file_states, dir_paths = self.scan_file_states()
+        watcher.watch_dirs(dir_paths)
+        parsed_infos = self.php_parser.load_parsed_infos(save_cache=save_cache, workers=workers, executor=executor,
+                                                         chunk_size=chunk_size)
+        start_time = time.time()
+        self.parsed_infos, self.method_relation_map = build_methods_relation(parsed_infos, self.imports_filter, workers,
+                                                                             instrument=self.php_parser.instrument)
+        print(f"\n补充函数调用信息完成 用时: {time.time() - start_time:.1f} 秒")
+        self.update_outputs(self.parsed_infos)
+
+    def update_outputs(self, relative_paths):
+        """刷新指定文件的输出片段 并按解析结果顺序重新写入全部输出文件"""
+        for info_type, type_fragments in self.output_fragments.items():
+            for relative_path in relative_paths:
+                parsed_info = self.parsed_infos.get(relative_path)
+                file_infos = get_output_file_infos(parsed_info, info_type) if parsed_info else None
+                if file_infos:
+                    type_fragments[relative_path] = dumps_output_fragment(relative_path, file_infos)
+                else:
+                    type_fragments.pop(relative_path, None)
+
+            fragments = [type_fragments[path] for path in self.parsed_infos if path in type_fragments]
+            output_text = join_output_fragments(fragments)
+            write_output_file(f"{self.output_prefix}.{info_type}.json", lambda f: f.write(output_text))
+
+    def collect_changes(self, watcher, changed_paths):
+        """对比文件状态 返回 {相对路径: 绝对路径|None(已删除)}"""
+        # .gitignore 变化会影响整棵子树的过滤结果
+        if changed_paths and self.rules.use_gitignore and \
+                any(os.path.basename(path) == ".gitignore" for path in changed_paths):
+            changed_paths = None
+
+        if changed_paths is None:
+            new_states, dir_paths = self.scan_file_states()
+            watcher.watch_dirs(dir_paths)
+        else:
+            new_states = dict(self.file_states)
+            project_root = self.php_parser.project_root
+            for abspath_path in changed_paths:
+                relative_path = get_relative_path(abspath_path, project_root)
+                file_state = self.get_file_state(abspath_path) if self.rules.accept_path(relative_path) else None
+                if file_state:
+                    new_states[relative_path] = file_state
+                else:
+                    new_states.pop(relative_path, None)
+
+        changes = {}
+        for relative_path, file_state in new_states.items():
+            if self.file_states.get(relative_path) != file_state:
+                changes[relative_path] = file_state[0]
+        for relative_path in self.file_states.keys() - new_states.keys():
+            changes[relative_path] = None
+        self.file_states = new_states
+        return changes
+
+    def apply_changes(self, changes: dict):
+        """重新解析变更的文件并增量更新函数关系"""
+        start_time = time.time()
+        changed_infos = {}
+        for relative_path, abspath_path in changes.items():
+            parsed_info = None
+            if abspath_path:
+                try:
+                    _, parsed_info = PHPParser.parse_php_file(abspath_path, self.php_parser.PARSER,
+                                                              self.php_parser.LANGUAGE, relative_path,
+                                                              stages=self.php_parser.stages)
+                    intern_strings(parsed_info)
+                except OSError as error:
+                    print(f"读取文件发生异常: {abspath_path} -> {error}")
+            changed_infos[relative_path] = parsed_info
+
+        resolved_count, affected_files = update_methods_relation(
+            self.parsed_infos, self.method_relation_map, changed_infos, self.imports_filter)
+        self.update_outputs(set(changes) | set(affected_files))
+        print(f"\n增量更新完成 变更文件:{len(changes)} 受影响文件:{len(affected_files)} "
+              f"重新解析调用:{resolved_count} 用时:{time.time() - start_time:.2f} 秒")
+        return affected_files
+
+    def run(self, watcher, on_update=None):
+        """持续监听文件变更 直到 Ctrl+C on_update 在每次增量更新后以解析结果为参数调用"""
+        print(f"\n开始监听项目文件变更: {self.php_parser.project_path} ({type(watcher).__name__})")
+        try:
+            while True:
+                changes = self.collect_changes(watcher, watcher.wait_changes())
+                if changes:
+                    self.apply_changes(changes)
+                    if on_update:
+                        on_update(self.parsed_infos)
+        except KeyboardInterrupt:
+            print("\n停止监听")
+        finally:
+            watcher.close()
+
+
+def run_watch(php_parser: PHPParser, output_prefix: str, save_cache=True, workers=None, imports_filter=True,
+              executor="thread", chunk_size=None, poll_interval=1.0, listen=None):
+    """监听模式入口 listen 不为空时同时启动调用图查询服务 每次增量更新后替换索引"""
+    watcher = create_watcher(poll_interval)
+    session = WatchSession(php_parser, output_prefix, imports_filter=imports_filter)
+    session.start(watcher, save_cache=save_cache, workers=workers, executor=executor, chunk_size=chunk_size)
+    php_parser.instrument.finish()
+
+    on_update = None
+    if listen:
+        query_server = start_query_server(CallGraphIndex.from_parsed_infos(session.parsed_infos), listen)
+
+        def on_update(parsed_infos):
+            query_server.index = CallGraphIndex.from_parsed_infos(parsed_infos)
+    session.run(watcher, on_update=on_update)
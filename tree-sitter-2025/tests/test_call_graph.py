@@ -0,0 +1,55 @@
+"""
+紧凑调用图遍历的回归测试 深度优先与广度优先的可达集合一致 k 跳查询不遗漏以更短路径到达的节点
+用法: python -m pytest tests/test_call_graph.py
+"""
+import os
+import random
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from php_call_graph import CompactCallGraph
+
+
+def build_chain_graph(nodes_num):
+    """链式调用 起点同时直接调用链上的每个节点 深度优先会先沿链到达各节点 再经由起点以更短路径到达"""
+    edges = [(f"m{index}", f"m{index + 1}") for index in range(nodes_num - 1)]
+    edges += [("m0", f"m{index}") for index in range(2, nodes_num)]
+    return CompactCallGraph.from_edges([], edges)
+
+
+def build_random_graph(nodes_num, edges_num, seed):
+    rand = random.Random(seed)
+    edges = [(f"m{rand.randrange(nodes_num)}", f"m{rand.randrange(nodes_num)}") for _ in range(edges_num)]
+    return CompactCallGraph.from_edges([(f"m{index}", None, None) for index in range(nodes_num)], edges)
+
+
+def reached_nodes(call_graph, roots, reverse=False, max_depth=None, order="bfs"):
+    return {node for node, _ in call_graph.traverse(roots, reverse=reverse, max_depth=max_depth, order=order)}
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_depth", [None, 1, 2, 4])
+def test_dfs_matches_bfs(seed, max_depth):
+    call_graph = build_random_graph(200, 400, seed)
+    for reverse in (False, True):
+        for root in range(0, call_graph.nodes_num, 17):
+            bfs_nodes = reached_nodes(call_graph, [root], reverse, max_depth, "bfs")
+            assert reached_nodes(call_graph, [root], reverse, max_depth, "dfs") == bfs_nodes
+            if max_depth is None:
+                assert bfs_nodes == set(call_graph.reachable([root], reverse))
+
+
+def test_unbounded_dfs_is_linear():
+    call_graph = build_chain_graph(5000)
+    root = call_graph.to_indexes(["m0"])
+    start_time = time.perf_counter()
+    dfs_results = call_graph.traverse(root, order="dfs")
+    elapsed = time.perf_counter() - start_time
+    assert len(dfs_results) == call_graph.nodes_num
+    # 每个节点只展开一次 万级边数应在毫秒级完成 重复展开时为秒级
+    assert elapsed < 0.5
+    assert reached_nodes(call_graph, root, max_depth=1, order="dfs") == set(range(call_graph.nodes_num))
@@ -0,0 +1,44 @@
+"""
+并行解析被调用方法的启动方式回归测试 只在 linux 或默认启动方式为 fork 时使用 fork 其他平台串行处理
+用法: python -m pytest tests/test_fork_context.py
+"""
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import php_map_called
+from php_instrument import create_instrumentation
+from php_parser import PHPParser
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "php_demo")
+
+
+@pytest.mark.parametrize("platform, start_method, expected", [
+    ("linux", None, "fork"),
+    ("darwin", None, None),
+    ("darwin", "spawn", None),
+    ("darwin", "fork", "fork"),
+])
+def test_fork_context(monkeypatch, platform, start_method, expected):
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: ["fork", "spawn"])
+    monkeypatch.setattr(multiprocessing, "get_start_method", lambda allow_none=False: start_method)
+    monkeypatch.setattr(sys, "platform", platform)
+    fork_context = php_map_called.get_fork_context()
+    assert (fork_context.get_start_method() if fork_context else None) == expected
+
+
+def test_serial_without_fork(monkeypatch):
+    php_parser = PHPParser(project_name="test_fork", project_path=DEMO_DIR, instrument=create_instrumentation(progress="none"))
+    expected = php_parser.analyse(save_cache=False, workers=1)
+
+    def fail_parallel(*args, **kwargs):
+        raise AssertionError("不支持安全 fork 时不应使用进程池")
+
+    monkeypatch.setattr(php_map_called, "get_fork_context", lambda: None)
+    monkeypatch.setattr(php_map_called, "RESOLVE_PARALLEL_MIN_CALLS", 0)
+    monkeypatch.setattr(php_map_called, "repair_parsed_infos_called_info_parallel", fail_parallel)
+    assert php_parser.analyse(save_cache=False, workers=4) == expected
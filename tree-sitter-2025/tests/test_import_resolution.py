@@ -0,0 +1,54 @@
+"""
+导入文件过滤的回归测试 包含多个点的文件名 和 ../ 相对路径的导入都需要解析到正确的源方法
+用法: python -m pytest tests/test_import_resolution.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from php_enums import FileInfoKeys, MethodKeys
+from php_parser import PHPParser
+
+PROJECT_FILES = {
+    "lib/config.inc.php": "<?php\nfunction cfg($a) { return $a; }\n",
+    "other/config.php": "<?php\nfunction cfg($a) { return $a + 1; }\n",
+    "inc/includes/init.php": "<?php\nfunction init_x() { return 1; }\n",
+    "other/init.php": "<?php\nfunction init_x() { return 2; }\n",
+    "app/main.php": "<?php\nrequire_once 'lib/config.inc.php';\ncfg(1);\n",
+    "app/admin/index.php": "<?php\ninclude \"../inc/includes/init.php\";\ninit_x();\n"
+                           "include dirname(__FILE__) . '/../../lib/config.inc.php';\ncfg(2);\n",
+}
+
+
+def analyse_project(project_dir):
+    for relative_path, content in PROJECT_FILES.items():
+        file_path = os.path.join(project_dir, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+    php_parser = PHPParser(project_name="test_imports", project_path=str(project_dir))
+    return php_parser.analyse(save_cache=False, workers=1)
+
+
+def get_called_sources(parsed_infos, relative_path):
+    """文件全局代码中 被调用方法名 -> 可能的源方法所在文件列表"""
+    called_sources = {}
+    for method_info in parsed_infos[relative_path][FileInfoKeys.METHOD_INFOS.value]:
+        for called_info in method_info.get(MethodKeys.CALLED_METHODS.value) or []:
+            may_source = called_info.get(MethodKeys.MAY_SOURCE.value) or {}
+            called_sources[called_info[MethodKeys.NAME.value]] = sorted(may_source.values())
+    return called_sources
+
+
+def test_multi_dot_include(tmp_path):
+    parsed_infos = analyse_project(tmp_path)
+    assert get_called_sources(parsed_infos, "app/main.php") == {"cfg": ["lib/config.inc.php"]}
+
+
+def test_relative_include(tmp_path):
+    parsed_infos = analyse_project(tmp_path)
+    assert get_called_sources(parsed_infos, "app/admin/index.php") == {
+        "init_x": ["inc/includes/init.php"],
+        "cfg": ["lib/config.inc.php"],
+    }
@@ -0,0 +1,43 @@
+"""
+运行统计的回归测试 文件统计合并后只保留累计值和最慢的 top_files 个文件 报告结果与保留全部统计时一致
+用法: python -m pytest tests/test_instrument.py
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from php_instrument import Instrumentation
+
+
+def create_file_stats(rand):
+    return {"wall": rand.random(), "cpu": rand.random(), "bytes": rand.randrange(10000),
+            "nodes": rand.randrange(1000), "analyzers": {"read_parse": (0.1, 0.2), "method_infos": (0.3, 0.1)},
+            "malloc_peak": None}
+
+
+def test_bounded_file_stats():
+    rand = random.Random(7)
+    instrument = Instrumentation(top_files=5)
+    all_stats = {f"f{index}.php": create_file_stats(rand) for index in range(1000)}
+    for relative_path, file_stats in all_stats.items():
+        instrument.add_file_stats(relative_path, file_stats)
+
+    assert len(instrument.slowest_heap) == 5
+    report = instrument.build_report()
+    assert report["files"]["parsed"] == 1000
+    assert report["files"]["bytes"] == sum(stats["bytes"] for stats in all_stats.values())
+    assert report["files"]["wall"] == round(sum(stats["wall"] for stats in all_stats.values()), 6)
+    assert report["analyzers"]["method_infos"]["count"] == 1000
+
+    expected = sorted(all_stats, key=lambda path: all_stats[path]["wall"], reverse=True)[:5]
+    assert [file_info["path"] for file_info in report["slowest_files"]] == expected
+    assert [file_info["path"] for file_info in instrument.get_slowest_files(2)] == expected[:2]
+
+
+def test_no_top_files():
+    instrument = Instrumentation(top_files=0)
+    instrument.add_file_stats("a.php", create_file_stats(random.Random(1)))
+    assert instrument.slowest_heap == []
+    assert instrument.build_report()["files"]["parsed"] == 1
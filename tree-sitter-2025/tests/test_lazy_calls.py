@@ -0,0 +1,73 @@
+"""
+按需解析调用点的回归测试 调用方|被调用方查询结果需要与全量解析一致 重新提取的文件需要同步更新标识符索引
+用法: python -m pytest tests/test_lazy_calls.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tree_sitter_uitls
+from php_enums import AnalysisProfile
+from php_instrument import create_instrumentation
+from php_lazy_calls import LazyCallResolver
+from php_parser import PHPParser
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "php_demo")
+
+
+def load_resolver(project_path, profile):
+    php_parser = PHPParser(project_name="test_lazy", project_path=str(project_path), profile=profile,
+                           instrument=create_instrumentation(progress="none"))
+    return LazyCallResolver(php_parser).load(save_cache=False, workers=1)
+
+
+def normalize(results):
+    return sorted(repr((sorted(result[key].items(), key=str), result["LINE"])) for result in results
+                  for key in result if key != "LINE")
+
+
+def test_lazy_matches_full():
+    full_resolver = load_resolver(DEMO_DIR, AnalysisProfile.CALLS.value)
+    lazy_resolver = load_resolver(DEMO_DIR, AnalysisProfile.SYMBOLS.value)
+    for method_id in lazy_resolver.method_briefs:
+        assert normalize(lazy_resolver.find_callers(method_id)) == normalize(full_resolver.find_callers(method_id))
+        assert normalize(lazy_resolver.find_callees(method_id)) == normalize(full_resolver.find_callees(method_id))
+
+
+def test_token_index_follows_extracted_file(tmp_path):
+    (tmp_path / "lib.php").write_text("<?php\nfunction target_x() { return 1; }\n", encoding="utf-8")
+    (tmp_path / "main.php").write_text("<?php\nfunction run_x() { return Target_X(); }\n", encoding="utf-8")
+    resolver = load_resolver(tmp_path, AnalysisProfile.SYMBOLS.value)
+    target_id, = resolver.find_methods("target_x")
+    assert resolver.find_candidate_files(target_id) == ["lib.php", "main.php"]
+
+    # 加载后文件被修改 重新提取时按新内容更新索引
+    (tmp_path / "main.php").write_text("<?php\nfunction run_x() { return 2; }\n", encoding="utf-8")
+    run_id, = resolver.find_methods("run_x")
+    assert resolver.find_callees(run_id) == []
+    assert resolver.find_candidate_files(target_id) == ["lib.php"]
+    assert resolver.find_callers(target_id) == []
+
+
+def test_warm_load_reads_no_source(tmp_path, monkeypatch):
+    # 缓存文件写入当前目录
+    monkeypatch.chdir(tmp_path)
+    project_path = tmp_path / "project"
+    project_path.mkdir()
+    (project_path / "lib.php").write_text("<?php\nfunction target_x() { return 1; }\n", encoding="utf-8")
+    (project_path / "main.php").write_text("<?php\n// 调用\nfunction run_x() { return target_x(); }\n", encoding="gbk")
+    php_parser = PHPParser(project_name="test_lazy", project_path=str(project_path),
+                           profile=AnalysisProfile.SYMBOLS.value, instrument=create_instrumentation(progress="none"))
+    LazyCallResolver(php_parser).load(workers=1)
+
+    def read_file_bytes(file_path):
+        raise AssertionError(f"缓存命中时不应读取源码: {file_path}")
+
+    # 缓存命中的文件直接使用缓存中的标识符列表
+    monkeypatch.setattr(tree_sitter_uitls, "read_file_bytes", read_file_bytes)
+    php_parser = PHPParser(project_name="test_lazy", project_path=str(project_path),
+                           profile=AnalysisProfile.SYMBOLS.value, instrument=create_instrumentation(progress="none"))
+    resolver = LazyCallResolver(php_parser).load(workers=1)
+    target_id, = resolver.find_methods("target_x")
+    assert resolver.find_candidate_files(target_id) == ["lib.php", "main.php"]
@@ -0,0 +1,44 @@
+"""
+逐文件缓存的回归测试 解析过程中文件被保存时 缓存记录的状态需要与解析所用的内容一致 下次分析时重新解析
+用法: python -m pytest tests/test_parse_cache.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import php_parser as php_parser_module
+from php_enums import FileInfoKeys, MethodKeys
+from php_instrument import create_instrumentation
+from php_parser import PHPParser
+
+
+def load_method_names(project_path):
+    php_parser = PHPParser(project_name="test_cache", project_path=str(project_path),
+                           instrument=create_instrumentation(progress="none"))
+    parsed_infos = php_parser.load_parsed_infos(save_cache=True, workers=1)
+    return [method_info[MethodKeys.NAME.value] for method_info in parsed_infos["main.php"][FileInfoKeys.METHOD_INFOS.value]]
+
+
+def test_file_saved_during_parse(tmp_path, monkeypatch):
+    # 缓存文件写入当前目录
+    monkeypatch.chdir(tmp_path)
+    project_path = tmp_path / "project"
+    project_path.mkdir()
+    php_file = project_path / "main.php"
+    php_file.write_text("<?php\nfunction old_x() { return 1; }\n", encoding="utf-8")
+    read_file_to_source = php_parser_module.read_file_to_source
+
+    def read_then_save(parser, abspath_path):
+        # 读取后文件立即被保存为新内容 修改时间同时变化
+        result = read_file_to_source(parser, abspath_path)
+        php_file.write_text("<?php\nfunction new_x() { return 22; }\n", encoding="utf-8")
+        os.utime(php_file, ns=(os.stat(php_file).st_atime_ns, os.stat(php_file).st_mtime_ns + 10 ** 9))
+        return result
+
+    monkeypatch.setattr(php_parser_module, "read_file_to_source", read_then_save)
+    assert "old_x" in load_method_names(project_path)
+
+    monkeypatch.setattr(php_parser_module, "read_file_to_source", read_file_to_source)
+    assert "new_x" in load_method_names(project_path)
+    assert "new_x" in load_method_names(project_path)
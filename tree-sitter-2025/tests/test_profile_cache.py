@@ -0,0 +1,35 @@
+"""
+分析配置与逐文件缓存的回归测试 包含更多阶段的缓存命中后 结果需要与直接按当前配置解析一致
+用法: python -m pytest tests/test_profile_cache.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from php_instrument import create_instrumentation
+from php_parser import PHPParser
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "php_demo")
+
+
+def load_parsed_infos(project_name, profile, save_cache):
+    php_parser = PHPParser(project_name=project_name, project_path=DEMO_DIR, profile=profile,
+                           instrument=create_instrumentation(progress="none"))
+    return php_parser.load_parsed_infos(save_cache=save_cache, workers=1)
+
+
+@pytest.mark.parametrize("warm_profile, profile", [("full", "symbols"), ("calls", "symbols"), ("full", "calls")])
+def test_profile_after_warm_cache(tmp_path, monkeypatch, warm_profile, profile):
+    # 缓存文件写入当前目录
+    monkeypatch.chdir(tmp_path)
+    cold_infos = load_parsed_infos("cold", profile, save_cache=False)
+
+    load_parsed_infos("warm", warm_profile, save_cache=True)
+    cached_infos = load_parsed_infos("warm", profile, save_cache=True)
+    assert cached_infos == cold_infos
+
+    # 裁剪不影响缓存中的完整结果
+    assert load_parsed_infos("warm", warm_profile, save_cache=True) == load_parsed_infos("cold", warm_profile, save_cache=False)
@@ -0,0 +1,46 @@
+"""
+在途任务窗口的回归测试 内存超过上限时窗口缩小 内存回落后窗口恢复 无法获取当前内存时不调整窗口
+用法: python -m pytest tests/test_scheduler.py
+"""
+import os
+import sys
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from php_scheduler import run_bounded_tasks
+
+
+def run_tasks(memory_values, memory_limit=100):
+    """返回调度统计和每次提交任务时的在途任务数"""
+    memory_iter = iter(memory_values)
+    results = []
+    in_flights = []
+
+    def submit(task):
+        # 任务立即完成 每轮等待返回全部在途任务 窗口变化可以确定地观察
+        in_flights.append(len(in_flights) - len(results) + 1)
+        future = Future()
+        future.set_result(task)
+        return future
+
+    stats = run_bounded_tasks(submit, list(range(40)), results.append, max_in_flight=4,
+                              memory_limit=memory_limit, get_memory=lambda: next(memory_iter, 10))
+    assert sorted(results) == list(range(40))
+    return stats, in_flights
+
+
+def test_window_recovers_after_memory_drops():
+    stats, in_flights = run_tasks([200, 200])
+    assert stats["throttled"] == 2
+    assert stats["min_window"] == 1
+    # 窗口 4 -> 2 -> 1 后逐步恢复到 4
+    assert in_flights[:12] == [1, 2, 3, 4, 1, 2, 1, 1, 2, 1, 2, 3]
+    assert in_flights[-1] == 4
+
+
+def test_unknown_memory_disables_throttling():
+    stats, in_flights = run_tasks([None] * 40)
+    assert stats["throttled"] == 0
+    assert stats["min_window"] == 4
+    assert max(in_flights) == 4
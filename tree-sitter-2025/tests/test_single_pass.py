@@ -0,0 +1,46 @@
+"""
+单次遍历节点索引与 tree-sitter 查询结果一致性的回归测试 包含存在语法错误(ERROR 节点)的文件
+用法: python -m pytest tests/test_single_pass.py
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs_com.files_filter import get_php_files
+from php_parser import PHPParser
+from tree_sitter_uitls import init_php_parser
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "php_demo")
+
+ERROR_SOURCES = [
+    "<?php $a = foo($b = 1);\n$x = $y = $z = 2 /* c */;\n$r = foo($a, $n = '', $u = null)\n// c\n$m = new X();\n",
+    "<?php $r = /* c */ 5; $q = [$k = 1,, $j = ];\nfunction f( { $v = 1; }\n$w = $$x = 3;\n",
+    "<?php\nclass A { function m() { $s = $t = ; } }\n$p = function() use ($q) { $q = 1 }\n",
+]
+
+
+def parse_both_paths(php_file):
+    parser, language = init_php_parser()
+    outputs = []
+    for single_pass in (False, True):
+        _, parsed_info = PHPParser.parse_php_file(php_file, parser, language, single_pass=single_pass)
+        outputs.append(json.dumps(parsed_info, ensure_ascii=False))
+    return outputs
+
+
+@pytest.mark.parametrize("php_file", get_php_files(DEMO_DIR))
+def test_demo_single_pass(php_file):
+    query_output, single_pass_output = parse_both_paths(php_file)
+    assert single_pass_output == query_output
+
+
+@pytest.mark.parametrize("source", ERROR_SOURCES)
+def test_error_tree_single_pass(tmp_path, source):
+    php_file = tmp_path / "error.php"
+    php_file.write_text(source, encoding="utf-8")
+    query_output, single_pass_output = parse_both_paths(str(php_file))
+    assert single_pass_output == query_output
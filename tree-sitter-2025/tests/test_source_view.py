@@ -0,0 +1,45 @@
+"""
+源码视图编码检测的回归测试 有限片段检测的结果与整个文件检测一致 GBK 源码的节点文本按检测出的编码解码
+用法: python -m pytest tests/test_source_view.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs_com.file_io import string_encoding
+from tree_sitter_uitls import detect_source_encoding, init_php_parser, SourceView
+
+SOURCES = [
+    b"<?php echo 1;",
+    "<?php echo '中文';".encode("utf-8"),
+    b"\xef\xbb\xbf<?php echo '\xe4\xb8\xad';",
+    "<?php echo '中文';".encode("gbk"),
+    "<?php echo '測試';".encode("big5"),
+    # 截断位置落在多字节字符中间
+    ("<?php echo '" + "中" * 30000 + "';").encode("utf-8"),
+    ("<?php echo '" + "中" * 40000 + "';").encode("gbk"),
+]
+
+
+@pytest.mark.parametrize("source_bytes", SOURCES)
+def test_detect_matches_full_detection(source_bytes):
+    expected = string_encoding(source_bytes)
+    expected = "UTF-8" if expected == "UTF-8-SIG" else expected
+    assert detect_source_encoding(source_bytes).upper() == expected
+    assert SourceView(source_bytes).encoding == expected.lower()
+
+
+def test_gbk_span_text():
+    source_bytes = "<?php\n$title = '中文标题';\n".encode("gbk")
+    parser, _ = init_php_parser()
+    root_node = parser.parse(source_bytes).root_node
+    string_node = root_node.named_children[1].named_children[0].child_by_field_name("right")
+    assert SourceView(source_bytes).decode_span(string_node.start_byte, string_node.end_byte) == "'中文标题'"
+
+
+def test_gbk_identifiers():
+    source_bytes = "<?php\nfunction 显示标题($Title) { return $Title; }\n".encode("gbk")
+    assert set(SourceView(source_bytes).get_identifiers()) == {"php", "function", "显示标题", "title", "return"}
@@ -0,0 +1,39 @@
+"""
+SQLite 项目索引的回归测试 重新解析的文件在解析时写入 命中缓存的文件在加载时写入 两者合并后与全量解析一致
+用法: python -m pytest tests/test_sqlite_index.py
+"""
+import os
+import shutil
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from php_instrument import create_instrumentation
+from php_parser import PHPParser
+from php_sqlite_index import SQLITE_TABLES
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "php_demo")
+
+
+def analyse_to_sqlite(project_name, project_path, sqlite_path, save_cache):
+    php_parser = PHPParser(project_name=project_name, project_path=str(project_path),
+                           instrument=create_instrumentation(progress="none"))
+    php_parser.analyse(save_cache=save_cache, workers=2, sqlite_path=str(sqlite_path))
+    with sqlite3.connect(str(sqlite_path)) as conn:
+        return {table: sorted(map(repr, conn.execute(f"SELECT * FROM {table}"))) for table in SQLITE_TABLES}
+
+
+def test_partial_cache_index(tmp_path, monkeypatch):
+    # 缓存文件写入当前目录
+    monkeypatch.chdir(tmp_path)
+    project_path = tmp_path / "project"
+    shutil.copytree(DEMO_DIR, project_path)
+    analyse_to_sqlite("warm", project_path, tmp_path / "first.sqlite", save_cache=True)
+
+    with open(project_path / "func_call_demo" / "functon_call.php", "a", encoding="utf-8") as f:
+        f.write("\nfunction appended_x() { return strlen('x'); }\n")
+    warm_rows = analyse_to_sqlite("warm", project_path, tmp_path / "warm.sqlite", save_cache=True)
+    cold_rows = analyse_to_sqlite("cold", project_path, tmp_path / "cold.sqlite", save_cache=False)
+    assert warm_rows == cold_rows
+    assert any("appended_x" in row for row in warm_rows["methods"])
@@ -1,4 +1,8 @@
+import codecs
 import hashlib
+import re
+import threading
+from contextlib import contextmanager
 from typing import List
 
 import tree_sitter_php
@@ -6,7 +10,8 @@ from tree_sitter import Language, Parser
 
 from tree_sitter._binding import Node
 
-from libs_com.file_io import read_file_bytes
+from libs_com.file_io import read_file_bytes, string_encoding
+from php_line_index import IndexedInfos
 
 
 def custom_format_path(path:str):
@@ -24,6 +29,104 @@ def get_strs_hash(*args):
     hash_object = hashlib.md5(concatenated_string.encode('utf-8'))
     return hash_object.hexdigest()[:8]
 
+# 检测编码时最多解码的字节数 从第一个非 ASCII 字节开始截取
+ENCODING_SAMPLE_SIZE = 64 * 1024
+NON_ASCII_PATTERN = re.compile(rb"[\x80-\xff]")
+
+
+def detect_source_encoding(source_bytes: bytes, sample_size=ENCODING_SAMPLE_SIZE):
+    """
+    检测源码编码 纯 ASCII 内容直接按 UTF-8 处理 不做任何解码
+    其余内容只对从第一个非 ASCII 字节开始的有限片段依次尝试 UTF-8|GB18030|BIG5 片段末尾被截断的字符不视为错误
+    """
+    if source_bytes.isascii():
+        return "utf-8"
+    start = NON_ASCII_PATTERN.search(source_bytes).start()
+    sample = memoryview(source_bytes)[start:start + sample_size]
+    for encoding in ("utf-8", "gb18030", "big5"):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return "utf-8"
+
+
+# PHP 标识符 源码转小写后提取 非 ASCII 字符均可作为标识符的一部分
+IDENTIFIER_PATTERN = re.compile(r"[a-z_\x80-\U0010ffff][a-z0-9_\x80-\U0010ffff]*")
+
+
+class SourceView:
+    """
+    单个文件的源码视图 只保存一份原始字节 按节点的字节范围解码 使用文件检测出的编码 不会把GBK等编码的源码转换为 b'..' 文本
+    较长的片段(方法体|类体等)可能被多个分析器重复获取 解码结果按字节范围缓存 短片段直接解码比查找缓存更快
+    """
+
+    def __init__(self, source_bytes: bytes, encoding=None, cache_size=256, cache_min_length=256):
+        self.buffer = memoryview(source_bytes)
+        self.length = len(source_bytes)
+        encoding = encoding or detect_source_encoding(source_bytes)
+        # 节点范围不会包含 BOM 之外的文件头 按普通 UTF-8 解码即可
+        self.encoding = "utf-8" if encoding.upper() in ("UTF-8", "UTF-8-SIG") else encoding
+        self.cache_size = cache_size
+        self.cache_min_length = cache_min_length
+        self.span_cache = {}
+
+    def decode_span(self, start_byte: int, end_byte: int):
+        if end_byte - start_byte < self.cache_min_length:
+            return str(self.buffer[start_byte:end_byte], self.encoding, "replace")
+
+        span_key = (start_byte, end_byte)
+        text = self.span_cache.get(span_key)
+        if text is None:
+            if len(self.span_cache) >= self.cache_size:
+                self.span_cache.clear()
+            text = str(self.buffer[start_byte:end_byte], self.encoding, "replace")
+            self.span_cache[span_key] = text
+        return text
+
+    def get_identifiers(self):
+        """按检测出的编码解码整个文件 返回去重后的小写标识符列表"""
+        text = str(self.buffer, self.encoding, "replace").lower()
+        return sorted(set(IDENTIFIER_PATTERN.findall(text)))
+
+    def release(self):
+        self.span_cache.clear()
+        self.buffer.release()
+
+
+# 当前线程正在分析的文件源码视图 由 use_source_view 在单个文件的分析期间设置
+ACTIVE_SOURCE = threading.local()
+
+
+@contextmanager
+def use_source_view(source_view: SourceView):
+    """在上下文内为当前线程启用源码视图 节点文本都从该视图中解码 视图必须与正在分析的语法树来自同一份字节"""
+    previous_view = getattr(ACTIVE_SOURCE, "source_view", None)
+    ACTIVE_SOURCE.source_view = source_view
+    try:
+        yield source_view
+    finally:
+        ACTIVE_SOURCE.source_view = previous_view
+        source_view.release()
+
+
+def decode_source_bytes(data: bytes):
+    """解码没有源码视图时的节点字节 优先 UTF-8 失败时按检测出的编码解码"""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode(string_encoding(data), "replace")
+
+
+def decode_node_text(node):
+    """获取节点的原始文本"""
+    source_view = getattr(ACTIVE_SOURCE, "source_view", None)
+    if source_view is not None and node.end_byte <= source_view.length:
+        return source_view.decode_span(node.start_byte, node.end_byte)
+    return decode_source_bytes(node.text)
+
+
 def find_first_child_by_field(node:Node, field_name_or_type:str) -> Node:
     """获取节点指定字段名或字段类型的 第一个值"""
     if node is None:
@@ -39,12 +142,7 @@ def get_node_filed_text(node, field_name_or_type):
     find_node = find_first_child_by_field(node, field_name_or_type)
     if not find_node:
         return None
-
-    try:
-        find_text = find_node.text.decode('utf-8')
-    except Exception:
-        find_text = str(find_node.text)
-    return find_text
+    return decode_node_text(find_node)
 
 
 def get_node_first_valid_child_node(node):
@@ -59,11 +157,7 @@ def get_node_first_valid_child_node_text(node):
     find_node = get_node_first_valid_child_node(node)
     if not find_node:
         return None
-    try:
-        find_text = find_node.text.decode('utf-8')
-    except Exception:
-        find_text = str(find_node.text)
-    return find_text
+    return decode_node_text(find_node)
 
 
 def get_node_text(node):
@@ -81,11 +175,7 @@ def get_node_text(node):
                 array_elements.append(element_value)
         find_text = array_elements
     else:
-        try:
-            find_text = node.text.decode('utf-8')
-        except Exception as e:
-            # print(f"node.text.decode error:{e}")
-            find_text = str(node.text)
+        find_text = decode_node_text(node)
     return find_text
 
 
@@ -104,6 +194,10 @@ def find_node_info_by_line_nearest(code_line:int, infos, start_key):
     if not infos:
         return find_info
 
+    # 带索引的节点信息直接二分查找
+    if isinstance(infos, IndexedInfos):
+        return infos.line_index(start_key).find_nearest(code_line)
+
     # 筛选出所有行号小于等于目标行号的命名空间
     filtered_infos = [x for x in infos if x[start_key] <= code_line]
     if len(filtered_infos) == 1:
@@ -122,6 +216,10 @@ def find_node_info_by_line_in_scope(code_line:int, infos:list[dict], start_key:s
     if not infos:
         return find_info
 
+    # 带索引的节点信息直接二分查找
+    if isinstance(infos, IndexedInfos):
+        return infos.line_index(start_key, end_key).find_in_scope(code_line)
+
     # 筛选出所有行号小于等于目标行号的node信息
     filtered_infos = [x for x in infos if x[start_key] <= code_line <= x[end_key]]
     if len(filtered_infos) == 1:
@@ -133,6 +231,23 @@ def find_node_info_by_line_in_scope(code_line:int, infos:list[dict], start_key:s
     return find_info
 
 
+# 查询语句编译缓存 Query内部持有游标状态 因此按线程隔离, 进程间天然隔离
+QUERY_CACHE = threading.local()
+
+
+def get_cached_query(language, query_sql:str):
+    """获取编译后的查询对象 同一Language下的同一查询语句只编译一次"""
+    query_cache = getattr(QUERY_CACHE, "queries", None)
+    if query_cache is None:
+        query_cache = QUERY_CACHE.queries = {}
+    cache_key = (language, query_sql)
+    query = query_cache.get(cache_key)
+    if query is None:
+        query = language.query(query_sql)
+        query_cache[cache_key] = query
+    return query
+
+
 def init_php_parser():
     """
     初始化 tree-sitter PHP 解析器
@@ -153,6 +268,11 @@ def read_file_to_root(parser, php_file: str):
     php_bytes = read_file_bytes(php_file)
     return parser.parse(php_bytes).root_node
 
+def read_file_to_source(parser, php_file: str):
+    """解析PHP文件 同时返回共享同一份字节的源码视图"""
+    php_bytes = read_file_bytes(php_file)
+    return parser.parse(php_bytes).root_node, SourceView(php_bytes)
+
 def load_str_to_parse(parser, php_code: str):
     """将字符串形式的 PHP 代码解析为语法树"""
     if not isinstance(php_code, str):